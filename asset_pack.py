@@ -0,0 +1,144 @@
+import mmap
+import os
+import pickle
+import struct
+
+import pygame
+from pygame import mixer
+
+# Optional pre-decoded asset pack. build_pack() decodes every asset once and
+# writes the results into one file: image pixels as BGRA (the layout
+# convert_alpha gives on 32 bit displays), sound samples in the mixer's
+# format and font files as they are. AssetPack memory-maps the pack, so
+# images are surfaces made straight over the mapped pages and nothing is
+# decoded at startup; each page is read from disk the first time it's used.
+#
+# assets.pack layout:
+#   header: magic, version, size of the index
+#   index: pickled {"mixer": mixer format the sounds were decoded in,
+#                   "entries": {path: (kind, offset, size, image size or None, file mtime)}}
+#   data: every entry's bytes, offsets counted from the end of the index
+PACK_PATH = "assets.pack"
+
+PACK_MAGIC = b"QDAP"
+PACK_VERSION = 1
+HEADER = struct.Struct(">4sHI")
+# Entries start on multiples of this so pixel rows stay aligned
+ALIGNMENT = 16
+
+
+def decode_entry(kind, path):
+    """ Returns (bytes, image size or None). Images need the display to be set up. """
+    if kind == "image":
+        image = pygame.image.load(path).convert_alpha()
+        return pygame.image.tostring(image, "BGRA"), image.get_size()
+    if kind == "sound":
+        return mixer.Sound(path).get_raw(), None
+    with open(path, "rb") as font_file:
+        return font_file.read(), None
+
+
+def build_pack(manifest, pack_path=PACK_PATH):
+    """ Decodes every (kind, path) in manifest into the pack. Returns the number of entries. """
+    entries = {}
+    blobs = []
+    offset = 0
+    for kind, path in manifest:
+        if kind == "sound" and not mixer.get_init():
+            continue
+        try:
+            data, image_size = decode_entry(kind, path)
+        except Exception as e:
+            print("Error: Couldn't pack " + path + ",", e)
+            continue
+        padding = -offset % ALIGNMENT
+        blobs.append(bytes(padding))
+        offset += padding
+        entries[path] = (kind, offset, len(data), image_size, os.path.getmtime(path))
+        blobs.append(data)
+        offset += len(data)
+
+    index = pickle.dumps({"mixer": mixer.get_init(), "entries": entries}, pickle.HIGHEST_PROTOCOL)
+    temp_path = pack_path + ".tmp"
+    with open(temp_path, "wb") as pack_file:
+        pack_file.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, len(index)))
+        pack_file.write(index)
+        # The data has to start aligned as well
+        pack_file.write(bytes(-(HEADER.size + len(index)) % ALIGNMENT))
+        for blob in blobs:
+            pack_file.write(blob)
+    os.replace(temp_path, pack_path)
+    return len(entries)
+
+
+class AssetPack(object):
+    """
+    Serves assets from a memory-mapped pack. Entries whose source file
+    changed since the pack was built are left out, as are sounds when the
+    mixer isn't in the format they were decoded in; those are loaded from
+    their files as usual.
+    """
+    def __init__(self, pack_path=PACK_PATH):
+        with open(pack_path, "rb") as pack_file:
+            # ACCESS_COPY: surfaces over the map can be drawn on without
+            # changing the file
+            self.data = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, version, index_size = HEADER.unpack_from(self.data)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError("assets.pack is from another version, rebuild it with asset_pack.py")
+        index = pickle.loads(self.data[HEADER.size:HEADER.size + index_size])
+        start = HEADER.size + index_size
+        self.start = start + (-start % ALIGNMENT)
+        self.view = memoryview(self.data)
+
+        sounds_usable = mixer.get_init() is not None and mixer.get_init() == index["mixer"]
+        self.entries = {}
+        for path, entry in index["entries"].items():
+            if entry[0] == "sound" and not sounds_usable:
+                continue
+            try:
+                if os.path.getmtime(path) != entry[4]:
+                    continue
+            except OSError:
+                continue
+            self.entries[path] = entry
+
+        # True if the packed pixels are already in the display's format
+        probe = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha()
+        self.native = probe.get_masks() == (0xff0000, 0xff00, 0xff, 0xff000000)
+
+    def has(self, path, kind=None):
+        entry = self.entries.get(path)
+        return entry is not None and (kind is None or entry[0] == kind)
+
+    def get_bytes(self, path):
+        kind, offset, size, image_size, mtime = self.entries[path]
+        return self.view[self.start + offset:self.start + offset + size]
+
+    def get_image(self, path):
+        image = pygame.image.frombuffer(self.get_bytes(path), self.entries[path][3], "BGRA")
+        if not self.native:
+            image = image.convert_alpha()
+        return image
+
+    def get_sound(self, path):
+        return mixer.Sound(buffer=self.get_bytes(path))
+
+
+def load_pack(pack_path=PACK_PATH):
+    """ Returns an AssetPack if the pack has been built, else None. """
+    if not os.path.exists(pack_path):
+        return None
+    try:
+        pack = AssetPack(pack_path)
+    except Exception as e:
+        print("Error: Couldn't load asset pack,", e)
+        return None
+    return pack
+
+
+if __name__ == "__main__":
+    from sprite_classes import *
+    init_display()
+    manifest = assets.read_manifest(skip=[MENU_MUSIC[0], GAME_MUSIC[0], BOSS_MUSIC[0]])
+    print("Packed", build_pack(manifest), "assets into", PACK_PATH)
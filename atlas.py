@@ -0,0 +1,115 @@
+import json
+import os
+
+import pygame
+
+# Optional sprite atlas. build_atlas() packs the small images in Assets onto
+# a few large pages, so startup opens a few files instead of one per image,
+# and the game draws from the same few surfaces. AssetCache hands out the
+# packed images as subsurfaces of their page; images that weren't packed, or
+# that changed since the atlas was built, are still loaded from their files.
+#
+# atlas.json layout:
+#   {"version": 1, "pages": ["atlas0.png", ...],
+#    "images": {"coin.png": [page number, x, y, width, height, file mtime], ...}}
+ASSET_DIR = "Assets"
+ATLAS_DIR = "atlas"
+MANIFEST_NAME = "atlas.json"
+ATLAS_VERSION = 1
+
+PAGE_SIZE = 512
+# Images bigger than this either way are left in their own files
+MAX_PACKED_SIZE = 256
+
+
+def pack(sizes, page_size=PAGE_SIZE):
+    """
+    Shelf packing: the images go tallest first, left to right along rows
+    ("shelves") as tall as the first image on them. Takes {name: (width, height)},
+    returns {name: [page number, x, y]}.
+    """
+    places = {}
+    page, x, y, shelf_height = 0, 0, 0, 0
+    for name in sorted(sizes, key=lambda name: (-sizes[name][1], -sizes[name][0], name)):
+        width, height = sizes[name]
+        if x + width > page_size:
+            x, y = 0, y + shelf_height
+            shelf_height = 0
+        if y + height > page_size:
+            page, x, y, shelf_height = page + 1, 0, 0, 0
+        places[name] = [page, x, y]
+        x += width
+        shelf_height = max(shelf_height, height)
+    return places
+
+
+def build_atlas(asset_dir=ASSET_DIR, atlas_dir=ATLAS_DIR):
+    """ Packs the images into atlas pages and writes the manifest. Returns the image count. """
+    images = {}
+    for file_name in sorted(os.listdir(asset_dir)):
+        if not file_name.lower().endswith(".png"):
+            continue
+        image = pygame.image.load(os.path.join(asset_dir, file_name))
+        if max(image.get_size()) <= MAX_PACKED_SIZE:
+            images[file_name] = image
+
+    places = pack({name: image.get_size() for name, image in images.items()})
+    page_count = max([place[0] for place in places.values()], default=-1) + 1
+    pages = []
+    for i in range(page_count):
+        page = pygame.Surface((PAGE_SIZE, PAGE_SIZE), pygame.SRCALPHA)
+        page.fill((0, 0, 0, 0))
+        pages.append(page)
+
+    manifest = {"version": ATLAS_VERSION, "pages": [], "images": {}}
+    for name, (page, x, y) in places.items():
+        image = images[name]
+        if image.get_flags() & pygame.SRCALPHA:
+            # Copies the pixels as they are, alpha included
+            pages[page].blit(image, (x, y), special_flags=pygame.BLEND_RGBA_ADD)
+        else:
+            # Opaque, or transparent through a colorkey that's left out
+            pages[page].blit(image, (x, y))
+        width, height = image.get_size()
+        manifest["images"][name] = [page, x, y, width, height,
+                                    os.path.getmtime(os.path.join(asset_dir, name))]
+
+    os.makedirs(atlas_dir, exist_ok=True)
+    for i, page in enumerate(pages):
+        page_name = "atlas" + str(i) + ".png"
+        pygame.image.save(page, os.path.join(atlas_dir, page_name))
+        manifest["pages"].append(page_name)
+    with open(os.path.join(atlas_dir, MANIFEST_NAME), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    return len(places)
+
+
+def read_atlas(asset_dir=ASSET_DIR, atlas_dir=ATLAS_DIR):
+    """
+    Returns {image path: (page path, Rect)} for every packed image that
+    hasn't changed since the atlas was built. Empty if there's no atlas.
+    """
+    try:
+        with open(os.path.join(atlas_dir, MANIFEST_NAME)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != ATLAS_VERSION:
+        print("Error: atlas is from another version, rebuild it with atlas.py")
+        return {}
+
+    pages = [os.path.join(atlas_dir, page_name) for page_name in manifest["pages"]]
+    atlas = {}
+    for name, (page, x, y, width, height, mtime) in manifest["images"].items():
+        path = os.path.join(asset_dir, name)
+        try:
+            if os.path.getmtime(path) != mtime:
+                continue
+        except OSError:
+            continue
+        atlas[path] = (pages[page], pygame.Rect(x, y, width, height))
+    return atlas
+
+
+if __name__ == "__main__":
+    print("Packed", build_atlas(), "images into", ATLAS_DIR)
@@ -4,11 +4,15 @@ from pygame import mixer
 import os
 import random
 import math
+import time
+import io
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from atlas import read_atlas, ATLAS_DIR
+from asset_pack import load_pack
 
 # Tile size refers to the number of pixels per "tile",
 #   both width and height-wise.
 TILE_SIZE = 16
-pygame.init()
 
 
 def exit_game():
@@ -20,10 +24,11 @@ def exit_game():
 
 
 def load_image(fileName):
-    """ Loads image from Assets folder, and returns it."""
-    image = pygame.image.load(
-        os.path.join("Assets", fileName)).convert_alpha()
-    return image
+    """
+    Loads image from Assets folder, and returns it. The image is shared
+    with everything else that loads it, so copy it before drawing on it.
+    """
+    return assets.get_image(os.path.join("Assets", fileName))
 
 
 def load_animation(fileNames):
@@ -37,21 +42,72 @@ def load_animation(fileNames):
     return animation
 
 
-def load_sound(file_name, vol=0.4):
+def load_sound(file_name, vol=0.4, category="world", priority=None):
     """
     Loads a sound from the "Assets" folder based on the file name,
     and sets the volume to 0.4 unless otherwise defined. If the file name
     is incorrect or the file is unavailable, the game loads a silent sound.
+    The sound plays on its category's channels with priority, a name from
+    VoiceManager.PRIORITIES ("normal" by default).
     """
     try:
-        sound = mixer.Sound(os.path.join("Assets", file_name))
-        sound.set_volume(vol)
+        sound = assets.get_sound(os.path.join("Assets", file_name))
     except:
         # Muted sound file to use in case a sound is not available
-        sound = mixer.Sound(
+        sound = assets.get_sound(
             os.path.join("Assets", "scratch_004.ogg"))
-        sound.set_volume(0)
-    return sound
+        vol = 0
+    return ManagedSound(sound, file_name, category, priority, vol)
+
+
+class ManagedSound(object):
+    """
+    A mixer.Sound that's played through the voice manager. Has the parts
+    of the Sound API the game uses. The Sound is shared by everything that
+    loaded the file, so the volume is set on the channel it plays on
+    instead of on the Sound. The channel is remembered, so every sprite
+    needs its own ManagedSound (see copy).
+    """
+    def __init__(self, sound, name, category="world", priority=None, volume=1.0):
+        self.sound = sound
+        self.name = name
+        self.category = category
+        self.priority = VoiceManager.PRIORITIES[priority or "normal"]
+        self.volume = volume
+        self.channel = None
+
+    def copy(self):
+        """ A ManagedSound of the same Sound that isn't playing on any channel. """
+        copy = ManagedSound.__new__(ManagedSound)
+        copy.__dict__.update(self.__dict__)
+        copy.channel = None
+        return copy
+
+    def play(self, loops=0):
+        """ Returns the channel it's playing on, or None if it wasn't played. """
+        channel = voices.play(self, loops)
+        if channel is not None:
+            self.channel = channel
+        return channel
+
+    def is_playing(self):
+        return (self.channel is not None and self.channel.get_busy()
+                and self.channel.get_sound() is self.sound)
+
+    def stop(self):
+        if self.is_playing():
+            self.channel.stop()
+
+    def get_num_channels(self):
+        return 1 if self.is_playing() else 0
+
+    def set_volume(self, vol):
+        self.volume = vol
+        if self.is_playing():
+            self.channel.set_volume(vol)
+
+    def get_volume(self):
+        return self.volume
 
 
 def tile_pos(tile_x, tile_y):
@@ -102,6 +158,27 @@ def did_collide(firstRect, secondRect):
         return False
 
 
+class CollisionIndex(object):
+    """
+    Keeps a group's sprites and a parallel list of their rects, so every
+    sprite hit by a rect is found with one collidelistall() call instead of
+    a did_collide() per sprite. Build it once per frame, after the sprites
+    have moved. Sprites removed from the group since then are skipped, the
+    same as looping over the group would.
+    """
+    def __init__(self, group, condition=None):
+        self.group = group
+        self.sprites = [sprite for sprite in group
+                        if condition is None or condition(sprite)]
+        self.rects = [sprite.rect for sprite in self.sprites]
+
+    def hits(self, rect):
+        """ Returns the sprites colliding with rect, in group order. """
+        sprites = self.sprites
+        return [sprites[i] for i in rect.collidelistall(self.rects)
+                if self.group.has_internal(sprites[i])]
+
+
 def draw_rect_outline(base_screen, rectangle, color_name="white"):
     """ Used as a dev feature, draws white outline around a given rectangle. """
     color = get_color(color_name)
@@ -111,34 +188,83 @@ def draw_rect_outline(base_screen, rectangle, color_name="white"):
         pass
 
 
+class ChangeNotifier(object):
+    """
+    Mixin for objects that other objects need to watch, like the HUD
+    watching the player's health. Anything added with add_listener is
+    called with no arguments whenever notify_change runs.
+    """
+    def add_listener(self, listener):
+        if "listeners" not in self.__dict__:
+            self.listeners = []
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        try:
+            self.listeners.remove(listener)
+        except (AttributeError, ValueError):
+            pass
+
+    def notify_change(self):
+        for listener in self.__dict__.get("listeners", ()):
+            listener()
+
+
+def watched_value(name):
+    """
+    Creates a property for a ChangeNotifier class that calls notify_change
+    whenever the value actually changes. Used as a class member, ex:
+        health = watched_value("health")
+    The value itself is stored as "_" + name.
+    """
+    member = "_" + name
+
+    def get_value(self):
+        return getattr(self, member)
+
+    def set_value(self, value):
+        if getattr(self, member, None) != value:
+            setattr(self, member, value)
+            self.notify_change()
+
+    return property(get_value, set_value)
+
+
+boss_font = None
+
+
 def draw_boss_health(base_screen, enemy_group):
     """
     Specifically used to draw boss health for player convenience.
+    The number is only rendered again when the boss's health changes.
     """
+    global boss_font
+    if boss_font is None:
+        boss_font = assets.get_sys_font("timesnewroman", 10)
     for enemy in enemy_group:
         if enemy.is_boss:
             text_rect = enemy.rect.copy()
             text_rect.centery -= 12
-            font = pygame.font.SysFont("timesnewroman", 10)
-            if enemy.health < round(enemy.max_health/3):
-                color = get_color("red")
-            elif enemy.health < round(enemy.max_health/1.5):
-                color = get_color("gold")
-            else:
-                color = get_color("green")
-            render = font.render(str(enemy.health), 0, color)
-            base_screen.blit(render, text_rect)
+            cached = getattr(enemy, "health_render", None)
+            if cached is None or cached[0] != enemy.health:
+                if enemy.health < round(enemy.max_health/3):
+                    color = get_color("red")
+                elif enemy.health < round(enemy.max_health/1.5):
+                    color = get_color("gold")
+                else:
+                    color = get_color("green")
+                cached = enemy.health_render = (
+                    enemy.health, boss_font.render(str(enemy.health), 0, color))
+            base_screen.blit(cached[1], text_rect)
 
 
 def set_music(file_name, volume=0.2):
     """
     Sets music according to file name given. Several global variables with
     music file names and volumes are used to save time when using function.
+    The track crossfades in from where it was last left off, see MusicManager.
     """
-    mixer.music.load(
-        os.path.join("Assets", file_name))
-    mixer.music.set_volume(volume)
-    mixer.music.play(-1, 0.0)  # first arg sets to play infinitely, 2nd starts @ 0
+    music.play(file_name, volume)
 
 
 class DisplayText(object):
@@ -221,6 +347,612 @@ class DisplayText(object):
             screen.blit(text, textRect)
 
 
+class KeyBindings(object):
+    """
+    Maps keys to named actions for each input context, so handling an event
+    is one dictionary lookup instead of comparing the key against every
+    control. Contexts are "gameplay", "menu" and "dialogue".
+
+    Bindings can be changed with a config file (controls.cfg by default),
+    one binding per line, using pygame's key constant names:
+        gameplay.bow = K_j, K_b
+        menu.select = K_RETURN
+    Lines starting with # are ignored. Any action not in the file keeps
+    its default keys.
+    """
+    DEFAULT_BINDINGS = {
+        "gameplay": {"up": ["K_w"], "down": ["K_s"], "left": ["K_a"], "right": ["K_d"],
+                     "sword": ["K_SPACE"], "bow": ["K_j", "K_b"], "bomb": ["K_k"],
+                     "flame": ["K_f", "K_l"], "hookshot": ["K_z"], "potion": ["K_q"],
+                     "use": ["K_e"], "pause": ["K_p"], "dev_menu": ["K_BACKSPACE"],
+                     "profiler": ["K_F3"], "memory_report": ["K_F4"],
+                     "quick_save": ["K_F5"], "quick_load": ["K_F9"]},
+        "menu": {"down": ["K_s", "K_DOWN"], "up": ["K_w", "K_UP"],
+                 "select": ["K_SPACE", "K_RETURN", "K_e"]},
+        "dialogue": {"next": ["K_RETURN", "K_e"], "skip": ["K_SPACE"]}
+    }
+
+    def __init__(self, config_file="controls.cfg"):
+        self.bindings = {}
+        for context in self.DEFAULT_BINDINGS:
+            self.bindings[context] = {}
+            for action, key_names in self.DEFAULT_BINDINGS[context].items():
+                self.bindings[context][action] = self.key_codes(key_names)
+        if config_file is not None and os.path.isfile(config_file):
+            self.load_config(config_file)
+        self.build_key_map()
+
+    @staticmethod
+    def key_codes(key_names):
+        """ Converts key constant names like "K_w" into pygame key codes. """
+        codes = []
+        for name in key_names:
+            code = getattr(pygame.locals, name.strip(), None)
+            if code is not None:
+                codes.append(code)
+            else:
+                print("Unknown key name in bindings:", name)
+        return codes
+
+    def load_config(self, config_file):
+        with open(config_file) as file:
+            for line in file:
+                line = line.strip()
+                if line == "" or line.startswith("#") or "=" not in line:
+                    continue
+                name, keys = line.split("=", 1)
+                try:
+                    context, action = name.strip().split(".")
+                except ValueError:
+                    print("Bad binding in", config_file + ":", line)
+                    continue
+                self.rebind(context, action, keys.split(","), rebuild=False)
+
+    def rebind(self, context, action, key_names, rebuild=True):
+        """ Replaces the keys of one action, ex: rebind("gameplay", "bow", ["K_j"]) """
+        self.bindings.setdefault(context, {})[action] = self.key_codes(key_names)
+        if rebuild:
+            self.build_key_map()
+
+    def build_key_map(self):
+        """ Inverts the bindings into {context: {key: (actions)}} for lookups. """
+        self.key_map = {}
+        for context, actions in self.bindings.items():
+            context_map = {}
+            for action, keys in actions.items():
+                for key in keys:
+                    context_map[key] = context_map.get(key, ()) + (action,)
+            self.key_map[context] = context_map
+
+    def get_actions(self, context, key):
+        """ Returns every action bound to the key in that context. """
+        return self.key_map[context].get(key, ())
+
+    def get_keys(self, context, action):
+        return self.bindings[context].get(action, [])
+
+    def describe(self, context, action, joiner=" or "):
+        """ The action's keys as shown to the player, ex: "J or B". """
+        names = []
+        for key in self.get_keys(context, action):
+            name = pygame.key.name(key)
+            names.append(name.upper() if len(name) == 1 else name.title())
+        return joiner.join(names)
+
+    def dispatch(self, event, context, handlers):
+        """
+        Calls handlers[action]() for each action the event's key is bound to.
+        handlers is a dictionary of action names to functions; actions without
+        a handler are ignored.
+        """
+        for action in self.key_map[context].get(event.key, ()):
+            handler = handlers.get(action)
+            if handler is not None:
+                handler()
+
+
+key_bindings = KeyBindings()
+
+
+class Profiler(object):
+    """
+    Collects frame times, named timings and counters so slow spots can be
+    found while playing. flip_screen reports each frame; anything else can
+    add timings (in milliseconds) or counters. The overlay is toggled with
+    the "profiler" key (F3 by default).
+    """
+    AVERAGE_FRAMES = 60
+
+    def __init__(self):
+        self.visible = False
+        self.font = None
+        self.counters = {}
+        # name: [last time, average time], both in milliseconds
+        self.timings = {}
+        self.frame_started = time.perf_counter()
+        # [(step name, milliseconds), ...] timed while the game starts
+        self.startup = []
+        self.first_frame_started = None
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def set_counter(self, name, value):
+        self.counters[name] = value
+
+    def add_count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_timing(self, name, milliseconds):
+        """ Stores the newest time and a running average for the name. """
+        timing = self.timings.get(name)
+        if timing is None:
+            self.timings[name] = [milliseconds, milliseconds]
+        else:
+            timing[0] = milliseconds
+            timing[1] += (milliseconds - timing[1]) / self.AVERAGE_FRAMES
+
+    def frame_start(self):
+        self.frame_started = time.perf_counter()
+
+    def frame_done(self):
+        """ Times the work done since frame_start, not counting the wait for FPS. """
+        self.add_timing("frame", (time.perf_counter() - self.frame_started) * 1000)
+        if self.first_frame_started is not None:
+            self.startup_step("first frame", self.first_frame_started)
+            self.first_frame_started = None
+            self.report_startup()
+
+    def startup_step(self, name, started):
+        """ Records a startup step that began at started, a time.perf_counter() time. """
+        self.startup.append((name, (time.perf_counter() - started) * 1000))
+
+    def time_first_frame(self):
+        """ Times until the next frame is done, then prints the startup report. """
+        self.first_frame_started = time.perf_counter()
+
+    def report_startup(self):
+        print("Startup: " + ", ".join("%s %.0f ms" % step for step in self.startup))
+        for name, milliseconds in self.startup:
+            self.set_counter("startup " + name + " ms", round(milliseconds))
+
+    def get_lines(self):
+        lines = []
+        for name in sorted(self.timings):
+            last, average = self.timings[name]
+            lines.append("%s: %.2f ms (avg %.2f)" % (name, last, average))
+        for name in sorted(self.counters):
+            lines.append("%s: %s" % (name, self.counters[name]))
+        return lines
+
+    def draw(self, surface):
+        if self.font is None:
+            self.font = assets.get_sys_font("timesnewroman", 10)
+        y = 40
+        for line in self.get_lines():
+            render = self.font.render(line, True, get_color("white"), get_color("black"))
+            surface.blit(render, (2, y))
+            y += render.get_height()
+
+
+profiler = Profiler()
+
+
+class VoiceManager(object):
+    """
+    Plays every sound effect on channels reserved for its category, so a
+    busy room full of enemies can't take the channels the player's or the
+    menus' sounds need. A sound played again in the same frame (ex: several
+    enemies hit by one bomb) only plays once. When all of a category's
+    channels are busy, its least important sound (oldest first) is cut off
+    if the new sound is at least as important, otherwise the new sound is
+    dropped. Totals are shown on the profiler overlay.
+    """
+    # Category: number of channels reserved for it. The music channels are
+    # used by MusicManager, not by sound effects.
+    POOLS = {"ui": 2, "player": 6, "enemies": 6, "world": 4, "music": 2}
+    # How much a sound matters next to the others in its category:
+    # "background" for incidental noises (rustling, silent placeholders),
+    # "damage" for hits and deaths, "key" for loops and cues that mustn't be
+    # cut off by everyday sounds (ex: the flame loop, the low health alarm)
+    PRIORITIES = {"background": 0, "normal": 1, "damage": 2, "key": 3}
+
+    def __init__(self):
+        # Category: [[channel, ManagedSound playing on it, play order], ...]
+        self.pools = None
+        self.played_this_frame = set()
+        self.play_order = 0
+        self.played = 0
+        self.deduped = 0
+        self.stolen = 0
+        self.dropped = 0
+
+    def setup(self):
+        total = sum(self.POOLS.values())
+        mixer.set_num_channels(total)
+        # Keeps Sound.play() from picking these channels on its own
+        mixer.set_reserved(total)
+        self.pools = {}
+        first = 0
+        for category, size in self.POOLS.items():
+            self.pools[category] = [[mixer.Channel(i), None, 0] for i in range(first, first + size)]
+            first += size
+
+    def get_channels(self, category):
+        if self.pools is None:
+            self.setup()
+        return [entry[0] for entry in self.pools[category]]
+
+    def play(self, sound, loops=0):
+        if not mixer.get_init():
+            return None
+        if self.pools is None:
+            self.setup()
+        if sound.name in self.played_this_frame:
+            self.deduped += 1
+            return None
+
+        pool = self.pools[sound.category]
+        voice = None
+        for entry in pool:
+            if not entry[0].get_busy():
+                voice = entry
+                break
+        if voice is None:
+            voice = min(pool, key=lambda entry: (entry[1].priority, entry[2]))
+            if voice[1].priority > sound.priority:
+                self.dropped += 1
+                return None
+            self.stolen += 1
+
+        self.play_order += 1
+        voice[1] = sound
+        voice[2] = self.play_order
+        voice[0].play(sound.sound, loops)
+        voice[0].set_volume(sound.volume)
+        self.played_this_frame.add(sound.name)
+        self.played += 1
+        return voice[0]
+
+    def next_frame(self):
+        """ Called once a frame by flip_screen. """
+        self.played_this_frame.clear()
+        profiler.set_counter("sounds played", self.played)
+        profiler.set_counter("sounds deduped", self.deduped)
+        profiler.set_counter("sounds stolen", self.stolen)
+        profiler.set_counter("sounds dropped", self.dropped)
+
+
+voices = VoiceManager()
+
+
+class MusicManager(object):
+    """
+    Plays the music tracks as looping Sounds on two channels so one track
+    can fade out while the next fades in. Tracks are decoded on a loader
+    thread (preload() them to have them ready before they're needed), and
+    each track carries on from where it was when it was switched away from.
+    A switch takes effect on the first frame after its track is ready.
+    Missing track files are reported once and play silence.
+    """
+    FADE_MS = 800
+
+    def __init__(self):
+        self.loader = None
+        # File name: Future of the decoded Sound, None if it couldn't load
+        self.tracks = {}
+        # File name: ms into the track when it was last switched away from
+        self.positions = {}
+        # File name: [position, the track rotated to start there], see
+        # from_position
+        self.rotated = {}
+        # File name of the track that's playing, or about to be
+        self.target = None
+        # [file name, volume, position, Future of the Sound to start] of the next switch
+        self.pending = None
+        self.channel = None
+        self.playing = None
+        self.volume = 0
+        self.length = 0
+        self.start_offset = 0
+        self.started = 0
+        self.paused_at = None
+
+    def get_loader(self):
+        if self.loader is None:
+            # One thread, so jobs run in the order they're sent
+            self.loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="music")
+        return self.loader
+
+    def preload(self, file_names):
+        if not mixer.get_init():
+            return
+        for file_name in file_names:
+            if file_name not in self.tracks:
+                self.tracks[file_name] = self.get_loader().submit(self.load, file_name)
+
+    def load(self, file_name):
+        """ Runs on the loader thread. """
+        try:
+            return mixer.Sound(os.path.join("Assets", file_name))
+        except Exception as e:
+            print("Error: Couldn't load music " + file_name + ",", e)
+            return None
+
+    def from_position(self, file_name, track, position):
+        """
+        Runs on the loader thread. Returns the track rotated to start at
+        position ms, so it still loops without a gap. The rotated copy is
+        kept and used again until the track's position changes.
+        """
+        sound = track.result()
+        if sound is None or position <= 0:
+            return sound
+        rotated = self.rotated.get(file_name)
+        if rotated is not None and rotated[0] == position:
+            return rotated[1]
+        # Let go of the old copy before making the new one
+        self.rotated.pop(file_name, None)
+        rotated = None
+        frequency, size, channels = mixer.get_init()
+        frame_size = abs(size) // 8 * channels
+        # Copied from the Sound's samples into one buffer, rather than
+        # through get_raw() and slices of it
+        samples = memoryview(sound).cast("B")
+        start = int(position * frequency / 1000) * frame_size % len(samples)
+        buffer = bytearray(len(samples))
+        buffer[:len(samples) - start] = samples[start:]
+        buffer[len(samples) - start:] = samples[:start]
+        rotated = mixer.Sound(buffer=buffer)
+        self.rotated[file_name] = [position, rotated]
+        return rotated
+
+    def play(self, file_name, volume):
+        if not mixer.get_init() or file_name == self.target:
+            return
+        self.target = file_name
+        if file_name == self.playing:
+            # Switched back before the last switch happened
+            self.pending = None
+            return
+        self.preload([file_name])
+        position = self.positions.get(file_name, 0)
+        future = self.get_loader().submit(self.from_position, file_name, self.tracks[file_name], position)
+        self.pending = [file_name, volume, position, future]
+
+    def get_position(self):
+        """ ms into the playing track. """
+        now = self.paused_at if self.paused_at is not None else pygame.time.get_ticks()
+        return (self.start_offset + now - self.started) % self.length
+
+    def stop_playing(self, fade_ms):
+        if self.playing is None:
+            return
+        self.positions[self.playing] = self.get_position()
+        # Its rotated copy starts somewhere else now
+        self.rotated.pop(self.playing, None)
+        if self.paused_at is not None:
+            self.channel.stop()
+        else:
+            self.channel.fadeout(fade_ms)
+        self.playing = None
+        self.paused_at = None
+
+    def fadeout(self, fade_ms):
+        self.target = None
+        self.pending = None
+        self.stop_playing(fade_ms)
+
+    def pause(self):
+        if self.playing is not None and self.paused_at is None:
+            self.channel.pause()
+            self.paused_at = pygame.time.get_ticks()
+
+    def unpause(self):
+        if self.playing is not None and self.paused_at is not None:
+            self.channel.unpause()
+            self.started += pygame.time.get_ticks() - self.paused_at
+            self.paused_at = None
+
+    def update(self):
+        """ Called once a frame by flip_screen; starts a switch once its track is ready. """
+        if self.pending is None or not self.pending[3].done():
+            return
+        file_name, volume, position, future = self.pending
+        self.pending = None
+        self.stop_playing(self.FADE_MS)
+        sound = future.result()
+        if sound is None:
+            return
+        channels = voices.get_channels("music")
+        # The other channel, so the old track can fade out on its own one
+        self.channel = channels[1] if self.channel is channels[0] else channels[0]
+        sound.set_volume(volume)
+        self.channel.play(sound, -1, fade_ms=self.FADE_MS)
+        self.playing = file_name
+        self.volume = volume
+        self.length = max(1, round(sound.get_length() * 1000))
+        self.start_offset = position
+        self.started = pygame.time.get_ticks()
+
+
+music = MusicManager()
+
+
+class AssetCache(object):
+    """
+    Keeps every decoded image, sound and font file so nothing is read from
+    disk after startup. preload() reads the manifest (every file under
+    DIRECTORIES), decodes the files on a thread pool and converts the
+    images on the main thread, since convert_alpha needs the display.
+    Anything asked for that wasn't preloaded is loaded then and kept.
+    Images packed into the sprite atlas (see atlas.py) are subsurfaces of
+    its pages instead of being loaded from their own files. If the asset
+    pack has been built (see asset_pack.py), whatever's in it is served
+    from the pack when first asked for and isn't preloaded.
+    """
+    DIRECTORIES = ["Assets", "Fonts", "mapFiles", "tiles", ATLAS_DIR]
+    IMAGE_TYPES = (".png", ".jpg", ".bmp")
+    SOUND_TYPES = (".wav", ".ogg")
+    FONT_TYPES = (".ttf",)
+    WORKERS = 4
+    # Seconds between progress bar redraws
+    PROGRESS_INTERVAL = 1 / 60
+
+    def __init__(self):
+        # Path: converted Surface / mixer.Sound / font file contents
+        self.images = {}
+        self.sounds = {}
+        self.font_files = {}
+        # (path or font name, size): Font
+        self.fonts = {}
+        # Image path: (atlas page path, Rect), read when first needed
+        self.atlas = None
+        self.pack = None
+        self.pack_checked = False
+
+    def get_atlas(self):
+        if self.atlas is None:
+            self.atlas = read_atlas()
+        return self.atlas
+
+    def get_pack(self):
+        """ The AssetPack, or None if it hasn't been built. Needs the display and mixer set up. """
+        if not self.pack_checked:
+            self.pack_checked = True
+            self.pack = load_pack()
+        return self.pack
+
+    def in_pack(self, path, kind=None):
+        pack = self.get_pack()
+        return pack is not None and pack.has(path, kind)
+
+    def read_manifest(self, skip=()):
+        """ [(kind, path), ...] for every asset file, except the file names in skip. """
+        manifest = []
+        atlas = self.get_atlas()
+        for directory in self.DIRECTORIES:
+            if not os.path.isdir(directory):
+                continue
+            for file_name in sorted(os.listdir(directory)):
+                path = os.path.join(directory, file_name)
+                if file_name in skip or path in atlas:
+                    continue
+                extension = os.path.splitext(file_name)[1].lower()
+                if extension in self.IMAGE_TYPES:
+                    manifest.append(("image", path))
+                elif extension in self.SOUND_TYPES:
+                    manifest.append(("sound", path))
+                elif extension in self.FONT_TYPES:
+                    manifest.append(("font", path))
+        return manifest
+
+    def decode(self, kind, path):
+        """ Runs on the thread pool. """
+        if kind == "image":
+            return pygame.image.load(path)
+        if kind == "sound":
+            return mixer.Sound(path)
+        with open(path, "rb") as font_file:
+            return font_file.read()
+
+    def store(self, kind, path, data):
+        """ Runs on the main thread. """
+        if kind == "image":
+            self.images[path] = data.convert_alpha()
+        elif kind == "sound":
+            self.sounds[path] = data
+        else:
+            self.font_files[path] = data
+
+    def preload(self, surface, present, skip=()):
+        """
+        Loads everything in the manifest, drawing a progress bar on surface
+        and showing it with present() about once a frame.
+        """
+        manifest = [entry for entry in self.read_manifest(skip)
+                    if (entry[0] != "sound" or mixer.get_init()) and not self.in_pack(entry[1])]
+        done = 0
+        last_drawn = 0
+        with ThreadPoolExecutor(max_workers=self.WORKERS, thread_name_prefix="assets") as pool:
+            pending = {pool.submit(self.decode, kind, path): (kind, path)
+                       for kind, path in manifest}
+            while pending:
+                finished, not_done = wait(pending, timeout=self.PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    kind, path = pending.pop(future)
+                    try:
+                        self.store(kind, path, future.result())
+                    except Exception as e:
+                        print("Error: Couldn't load " + path + ",", e)
+                    done += 1
+                if time.perf_counter() - last_drawn >= self.PROGRESS_INTERVAL or not pending:
+                    pygame.event.pump()
+                    self.draw_progress(surface, done, len(manifest))
+                    present(surface)
+                    last_drawn = time.perf_counter()
+
+    def draw_progress(self, surface, done, total):
+        width, height = surface.get_size()
+        bar = pygame.Rect(0, 0, width // 2, 8)
+        bar.center = (width // 2, height // 2)
+        surface.fill(get_color("black"))
+        pygame.draw.rect(surface, get_color("white"), bar, 1)
+        filled = bar.inflate(-4, -4)
+        filled.width = round(filled.width * done / max(1, total))
+        pygame.draw.rect(surface, get_color("green"), filled)
+
+    def get_image(self, path):
+        image = self.images.get(path)
+        if image is None:
+            packed = self.get_atlas().get(path)
+            if packed is not None:
+                image = self.get_image(packed[0]).subsurface(packed[1])
+            elif self.in_pack(path, "image"):
+                image = self.pack.get_image(path)
+            else:
+                image = pygame.image.load(path).convert_alpha()
+            self.images[path] = image
+        return image
+
+    def unload(self, path):
+        """ Lets go of an image; it's loaded again if it's asked for later. """
+        self.images.pop(path, None)
+
+    def get_sound(self, path):
+        sound = self.sounds.get(path)
+        if sound is None:
+            if self.in_pack(path, "sound"):
+                sound = self.pack.get_sound(path)
+            else:
+                sound = mixer.Sound(path)
+            self.sounds[path] = sound
+        return sound
+
+    def get_font(self, path, size):
+        """ A font from a font file; fonts are kept per size. """
+        font = self.fonts.get((path, size))
+        if font is None:
+            data = self.font_files.get(path)
+            if data is None and self.in_pack(path, "font"):
+                data = self.font_files[path] = bytes(self.pack.get_bytes(path))
+            if data is None:
+                font = pygame.font.Font(path, size)
+            else:
+                font = pygame.font.Font(io.BytesIO(data), size)
+            self.fonts[(path, size)] = font
+        return font
+
+    def get_sys_font(self, name, size):
+        font = self.fonts.get((name, size))
+        if font is None:
+            font = self.fonts[(name, size)] = pygame.font.SysFont(name, size)
+        return font
+
+
+assets = AssetCache()
+
+
 def load_sprite_sheet(image_name):
     """
     Converts specific spritesheet format into images for NPC animations.
@@ -5,7 +5,14 @@ from pygame import mixer
 import os
 import random
 import math
+import inspect
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from sprite_classes import *
+from world_compiler import ensure_compiled, read_index, read_room, WORLD_INDEX_PATH
+from tilemap import load_tilemap
+from room_storage import (get_pixels, compact_pixels, expand_layer, layer_bytes,
+                          pack_layer, compress_layers, compressed_bytes, unpack_layer)
 
 
 class WorldObjects(AnimSprite):
@@ -420,11 +427,13 @@ class GrassBush(BreakableItems):
         animationSpeed = 0
         BreakableItems.__init__(self, position, spriteList, animationSpeed,
                                 damageTypes, health, solid, BushShred)
-        self.hit_sound = load_sound("rustle16.ogg", 0.6)
+        self.hit_sound = load_sound("rustle16.ogg", 0.6, priority="background")
 
 
 class NPCBase(WorldObjects):
     RANDOM_LINES = [None]
+    # False for NPCs that face a set way instead of a random one
+    RANDOM_DIRECTION = True
 
     def __init__(self, position, sprite_name, m_type="stationary"):
         all_lists = load_sprite_sheet_format(sprite_name)
@@ -444,6 +453,13 @@ class NPCBase(WorldObjects):
         self.RANDOM = self.RANDOM_LINES[:]
         self.direction = random.choice("wasd")
 
+    def on_spawn(self, position):
+        super().on_spawn(position)
+        self.start_position = self.true_center[:]
+        self.last_position = self.true_center[:]
+        if self.RANDOM_DIRECTION:
+            self.direction = random.choice("wasd")
+
     def set_animations(self, spriteList):
         self.anim = {"w": spriteList[0],
                      "d": spriteList[1],
@@ -470,8 +486,7 @@ class NPCBase(WorldObjects):
         self.update_image()
 
     def use(self):
-        npc_speech = DialogueText(screen, self.name, self.lines)
-        npc_speech.loop()
+        scene_manager.push(DialogueText(screen, self.name, self.lines))
 
     def randomize_lines(self):
         self.lines = random.choice(self.RANDOM)
@@ -585,6 +600,7 @@ class Mayor(NPCBase):
 
 
 class Shopkeeper(NPCBase):
+    RANDOM_DIRECTION = False
     INTRO_LINES = ["This is the default shopkeeper intro."]
     QUESTION_LINES = ["This is the section where the shopkeeper lists",
                       "their wares or rambles on."]
@@ -611,114 +627,145 @@ class Shopkeeper(NPCBase):
         except:
             pass
 
-    def use(self, rooms, player):
-        inventory = self.INVENTORY[:]
-        for item in inventory[:]:
+    def use(self, rooms, player, on_done=None):
+        """ Opens the shop. on_done is given what was bought (ex: "potion") when it closes. """
+        scene_manager.push(ShopScene(self, rooms, player, on_done))
+
+
+class ShopScene(Scene):
+    """
+    A shopkeeper's intro, item list and buy question, drawn over the
+    frame the shop was opened on. Passes what was bought, or None,
+    to on_done when the shop closes.
+    """
+    overlay = True
+    STATUS_ORDER = ["intro", "which_item", "ask_to_buy", "last_lines"]
+
+    def __init__(self, shopkeeper, rooms, player, on_done=None):
+        self.shopkeeper = shopkeeper
+        self.name = shopkeeper.name
+        self.rooms = rooms
+        self.player = player
+        self.on_done = on_done
+
+        self.inventory = shopkeeper.INVENTORY[:]
+        for item in self.inventory[:]:
             if item[1] in rooms.QUANTITY[self.name].keys():
                 if rooms.QUANTITY[self.name][item[1]] == 0:
-                    inventory.remove(item)
+                    self.inventory.remove(item)
 
-        select_item = GameOptions(inventory)
-        for i in range(0, len(inventory)):
-            select_item.set_option(inventory[i], i+1)
+        self.select_item = GameOptions(self.inventory)
+        for i in range(0, len(self.inventory)):
+            self.select_item.set_option(self.inventory[i], i+1)
 
         buy_options = [["Buy?", True], ["Cancel", False]]
-        buy_question = GameOptions(["Buy?", True])
+        self.buy_question = GameOptions(["Buy?", True])
         for i in range(0, 2):
-            buy_question.set_option(buy_options[i], i+1)
-
-        status = {"intro": False, "which_item": False, "ask_to_buy": False,
-                  "last_lines": False}
-        status_order = ["intro", "which_item", "ask_to_buy", "last_lines"]
-        current_status = 0
-
-        item = {"key": "none", "info_name": "none", "cost": 0}
-        continue_loop = True
-        npc_speech = DialogueText(screen.copy(), self.name, self.lines)
-        background = npc_speech.screen
-        dialogue_screen = background.copy()
-        to_do = None
-
-        while continue_loop:
-            if current_status >= len(status_order):
-                current_status = len(status_order) - 1
-            dialogue_screen.blit(background, (0, 0))
-            npc_speech.draw(dialogue_screen)
-
-            events = pygame.event.get()
-            for event in events:
-                if event.type == pygame.QUIT:
-                    exit_game()
-
-            if not npc_speech.waiting or npc_speech.cont_message:
-                npc_speech.update(events)
-            else:
+            self.buy_question.set_option(buy_options[i], i+1)
+
+        self.status = {"intro": False, "which_item": False, "ask_to_buy": False,
+                       "last_lines": False}
+        self.current_status = 0
+
+        self.item = {"key": "none", "info_name": "none", "cost": 0}
+        self.continue_loop = True
+        self.npc_speech = DialogueText(screen, self.name, shopkeeper.lines)
+        self.to_do = None
 
-                if status_order[current_status] == "intro":
-                    npc_speech.update(events)
-                    if not status["intro"] and not npc_speech.continue_loop:
-                        status["intro"] = True
-                        npc_speech = DialogueText(screen, self.name, self.QUESTION_LINES)
-                        current_status += 1
-
-                elif status_order[current_status] == "which_item":
-                    answer = select_item.update(events)
-                    if answer is not None and answer != "cancel":
-                        npc_speech.waiting = False
-                        for inv in inventory:
-                            if inv[1] == answer:
-                                item["key"] = inv[0]
-                                item["info_name"] = inv[1]
-                        line = [self.BUY_LINE_SPLIT[0] + str(item["key"])+ self.BUY_LINE_SPLIT[1]]
-                        if item["info_name"] in rooms.COSTS.keys():
-                            item["cost"] = rooms.COSTS[item["info_name"]]
-                            line.append(str(item["cost"]))
-                            line[-1] += self.BUY_LINE_SPLIT[2]
-                        npc_speech = DialogueText(dialogue_screen, self.name, line)
-                        status["which_item"] = True
-                        current_status += 1
-                        events = []
-
-                    elif answer == "cancel":
-                        npc_speech = DialogueText(dialogue_screen, self.name, self.CANCEL)
-                        status["which_item"] = True
-                        status["ask_to_buy"] = True
-                        current_status = 3
-                    select_item.draw(dialogue_screen)
-
-                elif status_order[current_status] == "ask_to_buy":
-                    answer = buy_question.update(events)
-                    if answer is not None:
-                        npc_speech.waiting = False
-
-                        if answer:
-                            if player.get_gold() >= item["cost"]:
-                                if rooms.QUANTITY[self.name][item["info_name"]] != 0:
-                                    player.add_gold(-item["cost"])
-                                    npc_speech = DialogueText(screen, self.name, self.BUY_SUCCESS)
-                                    to_do = item["info_name"]
-
-                                    if rooms.QUANTITY[self.name][item["info_name"]] > 0:
-                                        rooms.QUANTITY[self.name][item["info_name"]] -= 1
-                                else:
-                                    npc_speech = DialogueText(screen, self.name,
-                                                              ["Oops, we're all out of that!"])
+    def get_status(self):
+        return self.STATUS_ORDER[self.current_status]
+
+    def say(self, lines):
+        self.npc_speech = DialogueText(screen, self.name, lines)
+
+    def update(self, events):
+        rooms = self.rooms
+        player = self.player
+        status = self.status
+        item = self.item
+        if self.current_status >= len(self.STATUS_ORDER):
+            self.current_status = len(self.STATUS_ORDER) - 1
+
+        if not self.npc_speech.waiting or self.npc_speech.cont_message:
+            self.npc_speech.update(events)
+        else:
+
+            if self.get_status() == "intro":
+                self.npc_speech.update(events)
+                if not status["intro"] and not self.npc_speech.continue_loop:
+                    status["intro"] = True
+                    self.say(self.shopkeeper.QUESTION_LINES)
+                    self.current_status += 1
+
+            elif self.get_status() == "which_item":
+                answer = self.select_item.update(events)
+                if answer is not None and answer != "cancel":
+                    self.npc_speech.waiting = False
+                    for inv in self.inventory:
+                        if inv[1] == answer:
+                            item["key"] = inv[0]
+                            item["info_name"] = inv[1]
+                    split = self.shopkeeper.BUY_LINE_SPLIT
+                    line = [split[0] + str(item["key"]) + split[1]]
+                    if item["info_name"] in rooms.COSTS.keys():
+                        item["cost"] = rooms.COSTS[item["info_name"]]
+                        line.append(str(item["cost"]))
+                        line[-1] += split[2]
+                    self.say(line)
+                    status["which_item"] = True
+                    self.current_status += 1
+                    events = []
+
+                elif answer == "cancel":
+                    self.say(self.shopkeeper.CANCEL)
+                    status["which_item"] = True
+                    status["ask_to_buy"] = True
+                    self.current_status = 3
+
+            elif self.get_status() == "ask_to_buy":
+                answer = self.buy_question.update(events)
+                if answer is not None:
+                    self.npc_speech.waiting = False
+
+                    if answer:
+                        if player.get_gold() >= item["cost"]:
+                            if rooms.QUANTITY[self.name][item["info_name"]] != 0:
+                                player.add_gold(-item["cost"])
+                                self.say(self.shopkeeper.BUY_SUCCESS)
+                                self.to_do = item["info_name"]
+
+                                if rooms.QUANTITY[self.name][item["info_name"]] > 0:
+                                    rooms.QUANTITY[self.name][item["info_name"]] -= 1
                             else:
-                                npc_speech = DialogueText(screen, self.name, self.BUY_FAIL)
-
-                        elif not answer:
-                            npc_speech = DialogueText(screen, self.name, self.CANCEL)
-                        status["ask_to_buy"] = True
-                        current_status += 1
-                    buy_question.draw(dialogue_screen)
-
-            if status_order[current_status] == "last_lines":
-                if not npc_speech.continue_loop:
-                    continue_loop = False
-                else:
-                    npc_speech.update(events)
-            flip_screen(dialogue_screen)
-        return to_do
+                                self.say(["Oops, we're all out of that!"])
+                        else:
+                            self.say(self.shopkeeper.BUY_FAIL)
+
+                    elif not answer:
+                        self.say(self.shopkeeper.CANCEL)
+                    status["ask_to_buy"] = True
+                    self.current_status += 1
+
+        if self.get_status() == "last_lines":
+            if not self.npc_speech.continue_loop:
+                self.continue_loop = False
+            else:
+                self.npc_speech.update(events)
+
+    def draw(self, surface):
+        self.npc_speech.draw(surface)
+        if self.npc_speech.waiting and not self.npc_speech.cont_message:
+            if self.get_status() == "which_item":
+                self.select_item.draw(surface)
+            elif self.get_status() == "ask_to_buy":
+                self.buy_question.draw(surface)
+
+    def is_done(self):
+        return not self.continue_loop
+
+    def exit(self):
+        if self.on_done is not None:
+            self.on_done(self.to_do)
 
 
 class BowNPC(Shopkeeper):
@@ -861,6 +908,387 @@ class OldMan4(OldManBase):
         super().__init__(position, sprite_name)
 
 
+class WorldIndex(object):
+    """
+    Reads rooms from the compiled world index (see world_compiler), one
+    room at a time the first time it's asked for. The index is rebuilt
+    first if the world files have changed since it was compiled.
+    """
+    EMPTY_ROOM = {"items": {}, "objects": {}, "enemies": []}
+    EMPTY_NODE = {"region": None, "hub": False, "boss_region": None, "neighbours": {}}
+
+    def __init__(self, index_path=WORLD_INDEX_PATH):
+        ensure_compiled(index_path=index_path)
+        self.index_path = index_path
+        shared, self.offsets = read_index(index_path)
+        self.class_names = shared["classes"]
+        self.hub_rooms = shared["hub_rooms"]
+        self.regions = shared["regions"]
+        self.graph = shared["graph"]
+        self.classes = None
+        self.records = {}
+
+    def resolve(self, entry):
+        """ Swaps an entry's class number for the class. """
+        return [self.classes[entry[0]]] + entry[1:]
+
+    def get_classes(self):
+        """ Every class used by the world's items, objects and enemies. """
+        if self.classes is None:
+            found = world_classes()
+            self.classes = [found[name] for name in self.class_names]
+        return self.classes
+
+    def get_node(self, room_x, room_y):
+        """ The room's place in the world: region, hub, boss_region and neighbours. """
+        return self.graph.get((room_x, room_y), self.EMPTY_NODE)
+
+    def get_room(self, room_x, room_y):
+        room = (room_x, room_y)
+        record = self.records.get(room)
+        if record is None:
+            if room not in self.offsets:
+                return self.EMPTY_ROOM
+            self.get_classes()
+            record = read_room(self.index_path, *self.offsets[room])
+            record["items"] = {key: self.resolve(entry)
+                               for key, entry in record["items"].items()}
+            record["objects"] = {key: self.resolve(entry)
+                                 for key, entry in record["objects"].items()}
+            record["enemies"] = [self.resolve(entry) for entry in record["enemies"]]
+            self.records[room] = record
+        return record
+
+
+class SpawnFactory(object):
+    """
+    Spawns enemies, objects and items. The first spawn of a class builds
+    a prototype (loading its images and sounds once); every spawn after
+    that is a clone of it, placed with on_spawn(). Whether a class takes
+    a key is read from its constructor's signature once, instead of
+    trying the constructor with and without one.
+    Classes with CLONEABLE = False are always constructed.
+    """
+    def __init__(self):
+        self.prototypes = {}
+        self.takes_key = {}
+
+    def uses_key(self, cls):
+        if cls not in self.takes_key:
+            self.takes_key[cls] = "key" in inspect.signature(cls).parameters
+        return self.takes_key[cls]
+
+    def construct(self, cls, position, key=None):
+        if self.uses_key(cls):
+            return cls(position, key)
+        return cls(position)
+
+    def prepare(self, classes):
+        """ Builds prototypes up front, ex: at the start of gameplay. """
+        for cls in classes:
+            if getattr(cls, "CLONEABLE", False) and cls not in self.prototypes:
+                try:
+                    self.prototypes[cls] = self.construct(cls, [0, 0])
+                except Exception as e:
+                    print("Error: Couldn't build a prototype of", cls.__name__ + ",", e)
+
+    def spawn(self, cls, position, key=None):
+        """ Returns the new sprite, or None if it couldn't be made (ex: missing assets). """
+        try:
+            if not getattr(cls, "CLONEABLE", False):
+                return self.construct(cls, position, key)
+            if cls not in self.prototypes:
+                self.prototypes[cls] = self.construct(cls, [0, 0])
+            sprite = self.prototypes[cls].clone()
+            if self.uses_key(cls):
+                sprite.key = key
+            sprite.on_spawn(position)
+            return sprite
+        except Exception as e:
+            print("Error: Couldn't spawn", cls.__name__ + ",", e)
+            return None
+
+
+spawn_factory = SpawnFactory()
+
+
+class RoomInstance(object):
+    """
+    A room that's already been built: its collision sprites, and the
+    objects, items (and enemies, if they persist) it had when the player
+    last left it. Sprites are kept by the key they were spawned with, see
+    RoomCache. Its layers are kept by RegionBundles.
+    """
+    def __init__(self, rooms, coll_sprites):
+        self.room = tuple(rooms.room_num)
+        self.current_room = rooms.current_room
+        self.coll_sprites = coll_sprites
+        self.objects = {}
+        self.items = {}
+        # None means the room's enemies get spawned again on every entry
+        self.enemies = None
+
+    def restore_layers(self, rooms):
+        rooms.background, rooms.coll_image, rooms.top = rooms.bundles.load(self.room)
+        rooms.current_room = self.current_room
+
+
+class RoomCache(object):
+    """
+    Keeps the most recently visited RoomInstances so walking back into a
+    room reuses its sprites instead of building them all again.
+
+    Objects and items are only reused while their key is still in
+    rooms.room_objects/room_items, anything destroyed or missing gets
+    spawned again, the same as a fresh room. Puzzle objects (statues,
+    switches, locks) are never reused, so puzzles reset on every entry
+    like they did before the cache. enemy_policy is "respawn"
+    (new enemies every entry, like before) or "persist" (enemies keep
+    their health and position, and dead ones stay dead, until the room
+    drops out of the cache).
+    """
+    def __init__(self, size=8, enemy_policy="respawn", bundles=None):
+        self.size = size
+        self.enemy_policy = enemy_policy
+        self.instances = OrderedDict()
+        # Each kept instance holds a reference to its room's RegionBundles bundle
+        self.bundles = bundles
+
+    def get(self, room_num):
+        instance = self.instances.get(tuple(room_num))
+        if instance is not None:
+            self.instances.move_to_end(instance.room)
+        return instance
+
+    def add(self, instance):
+        if instance.room in self.instances:
+            self.drop(self.instances[instance.room])
+        self.instances[instance.room] = instance
+        self.instances.move_to_end(instance.room)
+        if self.bundles is not None:
+            self.bundles.acquire(self.bundles.bundle_of(instance.room))
+        while len(self.instances) > self.size:
+            self.drop(self.instances.popitem(last=False)[1])
+
+    def drop(self, instance):
+        if self.bundles is not None:
+            self.bundles.release(self.bundles.bundle_of(instance.room))
+
+    def leave(self, instance, object_group, item_group, enemy_group):
+        """ Remembers the sprites still alive in the room being left. """
+        instance.objects = {obj.spawn_key: obj for obj in object_group
+                            if hasattr(obj, "spawn_key") and not getattr(obj, "puzzle_item", False)}
+        instance.items = {item.spawn_key: item for item in item_group
+                          if hasattr(item, "spawn_key")}
+        if self.enemy_policy == "persist":
+            instance.enemies = list(enemy_group)
+
+    def clear(self):
+        for instance in self.instances.values():
+            self.drop(instance)
+        self.instances.clear()
+
+
+class RegionBundles(object):
+    """
+    Groups the room layer images by region (rooms outside every region are
+    in the "overworld" bundle) so a region's images can be let go of once
+    nothing is using them. Bundles are reference counted: the player's
+    region holds one reference, and so does every RoomInstance kept in a
+    RoomCache, so walking back into a cached room doesn't load its layers
+    again. When the loaded layers go over memory_limit bytes, bundles
+    without references are unloaded, least recently used first; bundles in
+    use are never unloaded. Entering a region loads its rooms a few per
+    frame (see update).
+
+    With compact_layers, loaded layers are palettized to 8 bit surfaces on
+    a worker thread (see room_storage.py) and only those are kept; the room
+    being played is expanded back to 32 bit when it's entered.
+
+    Rooms of unloaded bundles are kept zlib compressed, on the same worker,
+    up to compressed_limit bytes (most recently unloaded kept), and are
+    decompressed instead of loaded again if they're needed.
+    """
+    # About the overworld and one region with their layers compacted, so
+    # going on to another region unloads the least recent one
+    MEMORY_LIMIT = 16 * 1024 * 1024
+    COMPRESSED_LIMIT = 4 * 1024 * 1024
+    ROOMS_PER_FRAME = 1
+    COMPACT_LAYERS = True
+
+    def __init__(self, rooms, memory_limit=None, compact_layers=None, compressed_limit=None):
+        self.rooms = rooms
+        self.memory_limit = memory_limit if memory_limit is not None else self.MEMORY_LIMIT
+        self.compact_layers = compact_layers if compact_layers is not None else self.COMPACT_LAYERS
+        self.compressed_limit = (compressed_limit if compressed_limit is not None
+                                 else self.COMPRESSED_LIMIT)
+        self.references = {}
+        # Bundle: {room: bytes of its layers}, least recently used first
+        self.loaded = OrderedDict()
+        # Room: its background, coll and top layers as they're stored
+        self.layers = {}
+        self.current = None
+        self.to_load = []
+        self.to_compact = []
+        # Room being compacted: future of its compacted layers
+        self.compacting = {}
+        self.compactor = None
+        # Room: future of its compressed layers, least recently unloaded first
+        self.compressed = OrderedDict()
+        # Rooms whose stored (or compressed) layers have been compacted
+        self.compacted = set()
+
+    def bundle_of(self, room_num):
+        region = self.rooms.world.get_node(*room_num)["region"]
+        return region if region is not None else "overworld"
+
+    def rooms_in(self, bundle):
+        return [room for room in sorted(self.rooms.world.graph)
+                if self.bundle_of(room) == bundle]
+
+    def acquire(self, bundle):
+        self.references[bundle] = self.references.get(bundle, 0) + 1
+
+    def release(self, bundle):
+        self.references[bundle] -= 1
+        self.trim()
+
+    def clear_references(self):
+        """ For a new game, when nothing from the last one is kept. """
+        self.references = {}
+        self.current = None
+        self.to_load = []
+        self.trim()
+
+    def enter_region(self, region):
+        """ Called on room transitions with Player.region. """
+        bundle = region if region is not None else "overworld"
+        if bundle == self.current:
+            return
+        self.acquire(bundle)
+        if self.current is not None:
+            self.release(self.current)
+        self.current = bundle
+        loaded = self.loaded.get(bundle, {})
+        self.to_load = [room for room in self.rooms_in(bundle) if room not in loaded]
+
+    def store(self, room_num):
+        """ Loads the room's layers if they aren't already, returns them as stored. """
+        room = tuple(room_num)
+        bundle = self.bundle_of(room)
+        rooms_loaded = self.loaded.setdefault(bundle, {})
+        if room not in self.layers:
+            compressed = self.compressed.pop(room, None)
+            # Not waited for if it's still being compressed
+            if compressed is not None and compressed.done() and compressed.result() is not None:
+                self.layers[room] = [unpack_layer(layer) for layer in compressed.result()]
+                profiler.add_count("rooms decompressed")
+            else:
+                if compressed is not None:
+                    compressed.cancel()
+                self.layers[room] = self.rooms.load_layers(room)
+                self.compacted.discard(room)
+            # Rooms unloaded before their compaction finished are compacted now
+            if self.compact_layers and room not in self.compacted:
+                self.to_compact.append(room)
+        layers = self.layers[room]
+        rooms_loaded[room] = sum(layer_bytes(layer) for layer in layers)
+        self.loaded.move_to_end(bundle)
+        self.trim()
+        return layers
+
+    def load(self, room_num):
+        """ Returns the background, coll and top layers of the room being entered. """
+        return [expand_layer(layer) for layer in self.store(room_num)]
+
+    def get_compactor(self):
+        if self.compactor is None:
+            self.compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="layers")
+        return self.compactor
+
+    def compact(self, pixels):
+        """ Runs on the compactor thread. Returns the compacted layers, None where one can't be. """
+        try:
+            return [compact_pixels(raw, size) for raw, size in pixels]
+        except Exception as e:
+            print("Error: Couldn't compact room layers,", e)
+            return [None] * len(pixels)
+
+    def compress(self, packed):
+        """ Runs on the compactor thread. Returns None if the layers couldn't be compressed. """
+        try:
+            return compress_layers(packed)
+        except Exception as e:
+            print("Error: Couldn't compress room layers,", e)
+            return None
+
+    def finish_compacting(self, room, compacted):
+        layers = self.layers.get(room)
+        if layers is None:
+            # Unloaded while it was being compacted
+            return
+        layers = [compact if compact is not None else layer
+                  for layer, compact in zip(layers, compacted)]
+        self.layers[room] = layers
+        self.compacted.add(room)
+        self.loaded[self.bundle_of(room)][room] = sum(layer_bytes(layer) for layer in layers)
+        # Only the compacted copies are kept from here
+        self.rooms.unload_layers(room)
+
+    def update(self):
+        """ Called once a frame during gameplay. """
+        for i in range(self.ROOMS_PER_FRAME):
+            if not self.to_load:
+                break
+            self.store(self.to_load.pop(0))
+        for room, future in list(self.compacting.items()):
+            if future.done():
+                del self.compacting[room]
+                self.finish_compacting(room, future.result())
+        # One room at a time, so loading isn't held up behind a queue of them
+        if not self.compacting and self.to_compact:
+            room = self.to_compact.pop(0)
+            if room in self.layers:
+                pixels = [get_pixels(layer) for layer in self.layers[room]]
+                self.compacting[room] = self.get_compactor().submit(self.compact, pixels)
+        self.trim_compressed()
+        profiler.set_counter("bundle memory KB", self.get_memory() // 1024)
+        profiler.set_counter("compressed rooms KB", self.get_compressed_memory() // 1024)
+
+    def get_memory(self):
+        return sum(sum(rooms_loaded.values()) for rooms_loaded in self.loaded.values())
+
+    def get_compressed_memory(self):
+        """ Bytes of the compressed rooms that have finished compressing. """
+        return sum(compressed_bytes(future.result()) for future in self.compressed.values()
+                   if future.done() and future.result() is not None)
+
+    def trim_compressed(self):
+        while self.compressed and self.get_compressed_memory() > self.compressed_limit:
+            room, future = self.compressed.popitem(last=False)
+            self.compacted.discard(room)
+
+    def trim(self):
+        while self.get_memory() > self.memory_limit:
+            unused = [bundle for bundle in self.loaded if self.references.get(bundle, 0) <= 0]
+            if not unused:
+                return
+            self.unload(unused[0])
+
+    def unload(self, bundle):
+        for room in self.loaded.pop(bundle):
+            layers = self.layers.pop(room, None)
+            self.rooms.unload_layers(room)
+            if layers is not None and self.compressed_limit > 0:
+                packed = [pack_layer(layer) for layer in layers]
+                self.compressed[room] = self.get_compactor().submit(self.compress, packed)
+            else:
+                self.compacted.discard(room)
+        self.to_compact = [room for room in self.to_compact if room in self.layers]
+        self.trim_compressed()
+        profiler.add_count("bundles unloaded")
+
+
 class AllRooms(object):
     # Shop cost Constants
     COSTS = {"bow": 500, "potion": 50, "potion_up": 100,
@@ -896,170 +1324,22 @@ class AllRooms(object):
 
     def __init__(self):
         self.extension = ".png"
+        # Rooms are drawn from tiles when they've been built (see tilemap.py)
+        self.tilemap = load_tilemap()
+        # Items, objects and enemies for every room, loaded from world/
+        self.world = WorldIndex()
+        # Room layers, grouped by region so they can be unloaded
+        self.bundles = RegionBundles(self)
         self.room_num = [3, 4]
         self.set_room_num()
         self.reset_room_info()
 
         self.QUANTITY = AllRooms.QUANTITY.copy()
 
-        self.ALL_ITEMS = {
-            3: {4: {0: [SwordUpgrade, 12, 14]}},
-            4: {7: {0: [HeartContainer, 11.5, 5.5]},
-                8: {0: [HeartContainer, 2.5, 2.5]}
-                },
-            6: {11: {0: [KeyItem, 4.5, 4], 1: [HeartContainer, 10, 6.5]}},
-            7: {10: {0: [QueenKeyItem, 10.5, 10.5], 1: [HeartContainer, 9.5, 10.5]},
-                11: {0: [KeyItem, 5, 11]},
-                12: {0: [FlameUpgrade, 4, 15], 1: [KeyItem, 18.5, 3]
-                     }
-                },
-            8: {4: {0: [QueenKeyItem, 10.5, 10.5], 1: [HeartContainer, 9.5, 10.5]},
-                10: {0: [BossKeyItem, 18, 17.5]}},
-            9: {4: {0: [KeyItem, 2, 3], 1: [BossKeyItem, 9.5, 12.5]},
-                5: {0: [BombUpgrade, 3.5, 4.5]}},
-            10: {4: {0: [HeartContainer, 15, 1.5]}},
-            11: {5: {0: [KeyItem, 15.5, 3.5]},
-                 9: {0: [KeyItem, 16.5, 4.5]}},
-            12: {8: {0: [KeyItem, 12, 4]}},
-            13: {8: {0: [KeyItem, 16.5, 4.5]}}
-        }
+        # Items and objects the player hasn't taken/removed, filled per room
         self.room_items = {}
-
-        B = GrassBush  # Used for ease of creating
-        self.ALL_OBJECTS = {
-            3: {4: {1: [B, 11.5, 11.5], 2: [B, 12.5, 11.5], 3: [TutorialWasd, 7.5, 17.5],
-                    4: [TutorialSpace, 12, 12.5]}},
-            4: {7: {0: [BombBlock, 12.5, 11.5]},
-                8: {0: [StatueRed, 7.5, 3.5], 1: [StatueRed, 7.5, 2.5],
-                    2: [StatueBlue, 5.5, 3.5], 3: [StatueBlue, 5.5, 2.5],
-                    4: [ArrowSwitch, 2.5, 3.5], 5: [ArrowSwitch, 16.5, 2.5]}},
-            6: {7: {0: [Soldier, 4.5, 12], 1: [Soldier, 4.5, 7], 2: [OldLady1, 6, 4],
-                    3: [OldLady2, 13, 7], 4: [OldMan2, 14, 12]},
-                8: {0: [Soldier, 8.5, 6], 1: [Soldier, 11.5, 6], 4: [Soldier, 7.5, 16.5],
-                    2: [Soldier, 3.5, 12], 3: [Soldier, 16.5, 12], 5: [Soldier, 12.5, 16.5]},
-                9: {0: [ArrowSwitch, 11, 14.5], 4: [ArrowSwitch, 18, 9.5],
-                    1: [StatueBlue, 4, 12.5], 2: [StatueBlue, 5, 12.5],
-                    6: [StatueRed, 12, 9], 7:[StatueRed, 12, 10], 8:[StatueRed, 12, 11]},
-                10: {0: [ArrowSwitch, 8.1, 13], 1: [StatueBlue, 5.5, 16], 2: [StatueBlue, 5.5, 17],
-                     3: [StatueBlue, 5.5, 18], 4: [StatueRed, 10.5, 16], 5: [StatueRed, 10.5, 17],
-                     6: [StatueRed, 10.5, 18], 7: [StatueRed, 17, 7], 8: [StatueRed, 18, 7],
-                     9: [StatueBlue, 16, 14], 10: [StatueBlue, 17, 14], 11: [StatueBlue, 18, 14],
-                     12: [RockBlock, 8, 15], 13: [RockBlock, 10.5, 12.5], 14: [RockBlock, 10.5, 13.5]},
-                11: {0: [LockBlock, 13.5, 11.5]}
-                },
-            7: {8: {0: [Mayor, 10.5, 5], 1: [OfficeSoldier, 7, 13.5], 2: [OfficeSoldier, 13, 13.5],
-                    3: [OfficeSoldier, 7, 17], 4: [OfficeSoldier, 13, 17]},
-                7: {0: [OfficeSoldier, 7.5, 2.5], 1: [OfficeSoldier, 12.5, 2.5], 2: [OldMan3, 16, 6],
-                    3: [OldMan4, 4, 7], 4: [OldLady2, 6, 15], 5: [OldMan1, 17, 13]},
-                10: {0: [EnemyBlock, 0.5, 11.5], 1: [EnemyBlock, 0.5, 12.5], 2: [EnemyBlock, 0.5, 13.5],
-                     3: [EnemyBlock, 19.5, 10.5], 4: [EnemyBlock, 19.5, 11.5]},
-                11: {0: [ArrowSwitch, 13, 6], 1: [RockBlock, 11.5, 8.5], 2: [RockBlock, 11.5, 9.5],
-                     3: [RockBlock, 13, 4.5], 4: [StatueBlue, 16, 14.5], 5: [StatueBlue, 17, 14.5],
-                     6: [IceBlock, 13, 8.5], 7: [IceBlock, 13, 9.5],
-                     9: [StatueRed, 7.5, 16.5], 10: [StatueRed, 7.5, 17.5], 13: [RockBlock, 13, 14.5],
-                     11: [RockBlock, 18.5, 16.5], 12: [LockBlock, 18.5, 17.5]},
-                12: {0: [IceBlock, 3, 11], 1: [IceBlock, 4, 11], 2: [IceBlock, 5, 11],
-                     3: [IceBlock, 4, 5], 4: [IceBlock, 4, 6], 5: [IceBlock, 10, 14],
-                     6: [IceBlock, 9, 14], 7: [LockBlock, 17, 19.2], 8: [RockBlock, 18, 19.2],
-                     9: [RockBlock, 16, 6], 10: [StatueBlue, 13, 6], 11: [ArrowSwitch, 16, 3]}
-                },
-            8: {4: {0: [EnemyBlock, 8.5, 1.5], 1: [EnemyBlock, 9.5, 1.5], 2: [EnemyBlock, 10.5, 1.5],
-                    3: [EnemyBlock, 11.5, 1.5], 4: [EnemyBlock, 19.5, 8.5], 5: [EnemyBlock, 19.5, 9.5],
-                    6: [EnemyBlock, 19.5, 10.5], 7: [EnemyBlock, 19.5, 11.5]},
-                5: {0: [ArrowSwitch, 14.5, 6.5], 1: [ArrowSwitch, 17, 11.5],
-                    2: [StatueRed, 2, 9], 3: [StatueRed, 3, 9],
-                    4: [StatueBlue, 14, 17.5], 5: [StatueBlue, 14, 18.5], 6: [StatueBlue, 14, 16.5]},
-                6: {0: [Soldier, 7.5, 13.5], 1: [Soldier, 12.5, 13.5], 2: [Soldier, 16.5, 16.5],
-                    3: [Soldier, 13.5, 9.5], 4: [Soldier, 6.5, 9.5], 5: [Soldier,6.5, 6.5],
-                    6: [Soldier, 13.5, 6.5], 7: [Soldier, 15.5, 4.5], 8: [Soldier, 3.5, 5.5]},
-                7: {0: [Witch, 2.5, 5], 1: [BowNPC, 17.5, 5],
-                    2: [Soldier, 8.5, 2], 3: [Soldier, 9.5, 2], 4: [Soldier, 10.5, 2],
-                    5: [Soldier, 11.5, 2], 6: [OldLady2, 5.5, 16.5], 7: [OldMan3, 15.5, 13.5]},
-                8: {0: [Soldier, 16.5, 7.5], 1: [Soldier, 16.5, 13.5], 2: [Soldier, 11.5, 7.5],
-                    3: [Soldier, 5.5, 9.5], 4: [Soldier, 5.5, 13.5], 5: [Soldier, 8.5, 7.5]},
-                10: {0: [GlockBlock, 1, 11], 1: [RockBlock, 6.5, 17], 2: [ArrowSwitch, 10.5, 17.5],
-                     3: [RockBlock, 14.5, 17], 4: [RockBlock, 14.5, 18], 5: [RockBlock, 6.5, 18],
-                     6: [StatueBlue, 13.5, 13], 7: [StatueBlue, 13.5, 14], 14: [StatueRed, 16, 15.5],
-                     8: [ArrowSwitch, 17, 9.5], 9: [StatueBlue, 17, 10.5], 10: [RockBlock, 17, 11.5],
-                     11: [StatueRed, 2, 15.5], 12: [StatueRed, 3, 15.5], 13: [StatueRed, 17, 15.5]}
-                },
-            9: {4: {0: [GlockBlock, 3, 13], 1: [LockBlock, 18.5, 4], 2: [RockBlock, 18.5, 2.5]},
-                5: {0: [BombBlock, 6.5, 15.5], 1: [BombBlock, 6.5, 16.5], 2: [BombBlock, 6.5, 17.5],
-                    3: [BombBlock, 8.2, 10], 4: [BombBlock, 9.8, 10]},
-                8: {0: [Soldier, 8.5, 7.5], 1: [Soldier, 8.5, 13.5], 2: [Soldier, 3.5, 7.5],
-                    3: [Soldier, 3.5, 13.5]}},
-            10: {5: {0: [RockBlock, 10, 10.5], 1: [RockBlock, 11, 10.5], 2: [ArrowSwitch, 10.5, 12.5],
-                     4: [StatueRed, 10, 8.5], 5: [StatueRed, 11, 8.5], 3: [ArrowSwitch, 18.2, 6.5],
-                     6: [StatueRed, 16.5, 2.5], 7: [StatueRed, 16.5, 3.5], 8: [StatueBlue, 14, 6.5],
-                     9: [StatueBlue, 15, 6.5], 10: [StatueBlue, 12.5, 2.5], 11: [StatueBlue, 12.5, 3.5]},
-                 8: {0: [GlockBlock, 9.5, 10], 1: [GlockBlock, 13.5, 10]}},
-            11: {4: {0: [EnemyBlock, 0.5, 16.5], 1: [EnemyBlock, 0.5, 17.5], 2: [EnemyBlock, 0.5, 18.5]},
-                 5: {0: [BombBlock, 9, 13], 1: [BombBlock, 10, 13], 2: [BombBlock, 18, 15], 3: [BombBlock, 17, 15],
-                     4: [BombBlock, 15, 11], 5: [BombBlock, 16, 11], 6: [BombBlock, 18, 7], 7: [BombBlock, 17, 7]},
-                 8: {0: [RockBlock, 18.5, 8.5], 1: [RockBlock, 18.5, 11.5], 2: [LockBlock, 18.5, 10]},
-                 9: {0: [EnemyBlock, 15.5, 9.5], 1: [EnemyBlock, 16.5, 9.5], 2: [EnemyBlock, 17.5, 9.5]}},
-            12: {8: {3: [EnemyBlock, 14.5, 4], 0: [RockBlock, 18.5, 8.5], 1: [RockBlock, 18.5, 11.5],
-                     2: [LockBlock, 18.5, 10]}},
-            13: {8: {0: [ArrowSwitch, 3.2, 17.5], 1: [IceBlock, 3, 15.5], 2: [IceBlock, 4, 15.5],
-                     3: [BombBlock, 3, 12.5], 4: [BombBlock, 4, 12.5], 5: [ArrowSwitch, 11.2, 4.5],
-                     6: [StatueBlue, 5.5, 4], 7: [StatueBlue, 5.5, 5], 8: [StatueRed, 10, 6.5],
-                     9: [StatueBlue, 10, 10.5], 10: [EnemyBlock, 15.5, 6.5], 11: [EnemyBlock, 16.5, 6.5],
-                     12: [EnemyBlock, 17.5, 6.5], 13: [ArrowSwitch, 7.2, 11.5], 14: [LockBlock, 18.5, 10],
-                     15: [RockBlock, 18.5, 8.5], 16: [RockBlock, 18.5, 11.5]}},
-            14: {9: {0: [EnemyBlock, 12.5, 19.5], 1: [EnemyBlock, 13.5, 19.5], 2: [EnemyBlock, 14.5, 19.5],
-                     3: [EnemyBlock, 0.5, 9], 4: [EnemyBlock, 0.5, 10], 5: [EnemyBlock, 0.5, 11]}}
-        }
         self.room_objects = {}
 
-        self.ALL_ENEMIES = {
-            2: {5:[[Log, 3, 5], [Bee, 15, 4], [Slime, 4, 16]],
-                6:[[Bee, 3, 3], [Slime, 4, 10], [Slime, 14, 7]]
-                },
-            3: {4: [[]],
-                5: [[Bee, 18, 18], [Bee, 2, 2], [Bee, 19, 5]],
-                6: [[Slime, 6, 6], [Slime, 8, 6]]
-                },
-            4: {5: [[Log, 5, 5], [Slime, 8, 8]],
-                6: [[Bee, 8, 8], [Bee, 12, 8], [Bee, 8, 12], [Bee, 12, 12]],
-                7: [[Slime, 6, 16], [Log, 12, 14]],
-                8: [[Slime, 10, 8], [Bee, 15, 5]]
-                },
-            6: {9: [[Skeleton, 3, 7], [Skeleton, 8, 4]],
-                10: [[Eyebat, 14, 10], [Eyebat, 2, 9], [Eyebat, 8, 7]],
-                11: [[Eyebat, 4, 4], [Eyebat, 10, 13], [Skeleton, 3, 15],
-                     [Skeleton, 2, 10], [Skeleton, 2, 9], [Slime, 2, 17]]},
-            7: {10: [[EyebossHead, 5, 5]],
-                12: [[Eyebat, 13, 15], [Skeleton, 17, 11], [Skeleton, 13, 3],
-                     [Slime, 15, 12], [Eyebat, 13, 10]]},
-            8: {4: [[EyebossHead, 3, 16]],
-                5: [[Skeleton, 4, 13], [Fang, 9, 15]],
-                10: [[Skeleton, 3, 4], [Eyebat, 3, 8], [Skeleton, 11, 4],
-                     [Eyebat, 11, 5], [Skeleton, 4, 9]],
-                11: [[Slime, 5, 13], [Slime, 3, 11], [Eyebat, 5, 6],
-                     [Eyebat, 6, 4], [Eyebat, 9, 3], [Skeleton, 12, 3],
-                     [Skeleton, 12, 4], [Skeleton, 17, 7], [Slime, 11, 15]]},
-            9: {4: [[Skeleton, 12, 4], [Skeleton, 16, 7], [Slime, 11, 11],
-                    [Log, 6, 3], [Eyebat, 15, 9], [Eyebat, 5, 17], [Eyebat, 8, 17]],
-                5: [[Eyebat, 3.5, 7.5], [Skeleton, 8, 16], [Skeleton, 8, 9],
-                    [Eyebat, 7, 4], [Skeleton, 13, 4], [Fang, 9, 5]]},
-            10: {4: [[Bee, 6, 7], [Eyebat, 9, 8]],
-                 5: [[Slime, 12, 17], [Bee, 8, 16]]},
-            11: {4: [[Eyebat, 7, 7], [Fang, 4, 7], [Skeleton, 8, 9], [Slime, 10, 15],
-                     [Eyebat, 17, 13], [Eyebat, 17, 8], [Fang, 16, 3], [Log, 5, 5],
-                     [Eyebat, 13, 15], [Skeleton, 17, 11], [Skeleton, 13, 3], [Bee, 10, 10]],
-                 5: [[Eyebat, 7, 7], [Fang, 4, 7], [Skeleton, 8, 9], [Slime, 10, 15],
-                     [Eyebat, 17, 13], [Eyebat, 17, 8], [Fang, 16, 3]],
-                 8: [[Skeleton, 12, 4.5], [Eyebat, 8, 7], [Slime, 14, 13]],
-                 9: [[Slime, 4, 5], [Skeleton, 8, 7], [Log, 8, 5], [Eyebat, 12, 5], [Bee, 12, 7],
-                     [Skeleton, 16, 14], [Skeleton, 14, 15]]},
-            12: {8: [[Slime, 5, 5], [Skeleton, 8, 6], [Eyebat, 8, 12], [Eyebat, 4, 16],
-                     [Bee, 6, 16], [Skeleton, 15, 15], [Skeleton, 14, 13], [Log, 16.5, 10.5]]},
-            13: {8: [[Fang, 8, 12], [Skeleton, 10, 14], [Skeleton, 13, 15], [Skeleton, 14, 13],
-                     [Log, 15.5, 15.5], [Log, 15.5, 14.5]],
-                 10: [[DemonQueen, 10, 4.5]]},
-            14: {9: [[EyebossHead, 5, 5]]}
-            }
-
         self.dialogue_status = {"Mayor Madeline": {"intro": False,
                                                    "first": False,
                                                    "second": False,
@@ -1070,6 +1350,8 @@ class AllRooms(object):
                              "mountains": False}
         self.bosses_beaten = {"tundra": False,
                               "mountains": False}
+        # Seconds spent in gameplay, shown on save slots
+        self.play_time = 0
 
     def set_status(self, new_status, boolean=True):
         success = False
@@ -1102,19 +1384,36 @@ class AllRooms(object):
         return self.room_num
 
     def reset_room_info(self):
-        self.background = pygame.image.load(
-            os.path.join("mapFiles", self.room_name+self.extension)).convert_alpha()
-        self.coll_image = pygame.image.load(
-            os.path.join("mapFiles", (self.room_name+"coll"+self.extension))).convert_alpha()
+        self.background, self.coll_image, self.top = self.bundles.load(self.room_num)
+        self.current_room = self.room_call()
+
+    def layer_paths(self, room_num):
+        room_name = "[" + str(room_num[0]) + "," + str(room_num[1]) + "]"
+        return [os.path.join("mapFiles", room_name + ending + self.extension)
+                for ending in ["", "coll", "top"]]
+
+    def load_layers(self, room_num):
+        """ Returns the room's background, coll and top images; use bundles.load instead. """
+        room_x, room_y = room_num
+        if self.tilemap is not None and self.tilemap.has_room(room_x, room_y):
+            return [self.tilemap.get_surface(room_x, room_y, layer)
+                    for layer in ["background", "coll", "top"]]
+        background_path, coll_path, top_path = self.layer_paths(room_num)
+        background = assets.get_image(background_path)
+        coll_image = assets.get_image(coll_path)
         try:
-            self.top = pygame.image.load(
-                os.path.join("mapFiles", (self.room_name+"top"+self.extension))).convert_alpha()
+            top = assets.get_image(top_path)
         except:  # If no top image for the room, replaced with a transparent image
-            fake_top = pygame.Surface(
-                (self.background.get_size()), pygame.SRCALPHA)  # surface w/alpha
-            fake_top.fill((255, 255, 255, 0))
-            self.top = fake_top
-        self.current_room = self.room_call()
+            top = pygame.Surface(
+                (background.get_size()), pygame.SRCALPHA)  # surface w/alpha
+            top.fill((255, 255, 255, 0))
+        return [background, coll_image, top]
+
+    def unload_layers(self, room_num):
+        if self.tilemap is not None:
+            self.tilemap.unload_room(*room_num)
+        for path in self.layer_paths(room_num):
+            assets.unload(path)
 
     def set_room_num(self, x=0, y=0):
         self.room_num[0] += x
@@ -1153,6 +1452,21 @@ class AllRooms(object):
         base_screen.blit(self.top, (0, 0))
         return base_screen
 
+    def get_solid_grid(self):
+        """
+        Rows of True/False for each tile of the room, True where the tile
+        has any collision. Used for tile based collision and pathfinding.
+        """
+        if self.tilemap is not None and self.tilemap.has_room(*self.room_num):
+            return self.tilemap.get_solid_grid(*self.room_num)
+        coll_mask = pygame.mask.from_surface(self.coll_image, 0)
+        tile_mask = pygame.mask.Mask((TILE_SIZE, TILE_SIZE), True)
+        grid = []
+        for tile_y in range(0, self.coll_image.get_height(), TILE_SIZE):
+            grid.append([coll_mask.overlap_area(tile_mask, (tile_x, tile_y)) > 0
+                         for tile_x in range(0, self.coll_image.get_width(), TILE_SIZE)])
+        return grid
+
     def get_room_coll(self):
         coll_mask = pygame.mask.from_surface(self.coll_image)
         masks = coll_mask.connected_components()
@@ -1171,10 +1485,7 @@ class AllRooms(object):
         try:
             items_to_add = self.room_items[room_x][room_y].copy()
         except KeyError:
-            try:
-                items_to_add = self.ALL_ITEMS[room_x][room_y]
-            except KeyError:
-                items_to_add = {}
+            items_to_add = self.world.get_room(room_x, room_y)["items"]
 
             try:
                 self.room_items[room_x][room_y] = items_to_add.copy()
@@ -1210,10 +1521,7 @@ class AllRooms(object):
         try:
             items_to_add = self.room_objects[room_x][room_y].copy()
         except KeyError:
-            try:
-                items_to_add = self.ALL_OBJECTS[room_x][room_y]
-            except KeyError:
-                items_to_add = {}
+            items_to_add = self.world.get_room(room_x, room_y)["objects"]
 
             try:
                 self.room_objects[room_x][room_y] = items_to_add.copy()
@@ -1229,12 +1537,21 @@ class AllRooms(object):
         All enemies are stored in a nested dictionary; it stores the
         name of the enemy's class and the enemy's x and y tile positions.
         """
-        try:
-            enemiesToAdd = self.ALL_ENEMIES[self.room_num[0]][self.room_num[1]]
-        except Exception as e:
-            enemiesToAdd = [[]]
-            # print(e)
-        return enemiesToAdd
+        return self.world.get_room(self.room_num[0], self.room_num[1])["enemies"]
+
+    def get_room_info(self, room_num=None):
+        """
+        The room's node in the world graph (current room by default):
+        "region" (None outside the regions), "hub", "boss_region" (None
+        unless it's a boss room) and "neighbours" (direction: room).
+        """
+        if room_num is None:
+            room_num = self.room_num
+        return self.world.get_node(room_num[0], room_num[1])
+
+    def get_transition(self, direction):
+        """ The room on the given side of the current room, or None if there isn't one. """
+        return self.get_room_info()["neighbours"].get(direction)
 
 
 def room_walls(base_screen):
@@ -1252,5 +1569,19 @@ def room_walls(base_screen):
     return room_walls_dict
 
 
+def world_classes():
+    """
+    Returns a dictionary of class name: class for every sprite class, used
+    to turn the class names in saved room data back into classes.
+    """
+    classes = {}
+    to_check = [pygame.sprite.Sprite]
+    while to_check:
+        cls = to_check.pop()
+        classes[cls.__name__] = cls
+        to_check += cls.__subclasses__()
+    return classes
+
+
 if __name__ == "__main__":
     print("Yeah, don't run this directly. Run the game.")
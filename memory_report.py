@@ -0,0 +1,203 @@
+import time
+
+import pygame
+from pygame import mixer
+
+from extra_functions import assets, music, ManagedSound
+from room_storage import layer_bytes, compressed_bytes
+
+# Memory footprint reports. MemoryReport walks the room layers (AllRooms and
+# RegionBundles), the live sprite groups and the asset caches and adds up
+# bytes per category, per sprite class and per room. Sizes are estimates of
+# the pixel and sample data: surfaces are width * height * bytes per pixel
+# (subsurfaces share their parent's pixels and count as nothing), sounds
+# are their length in the mixer's format, fonts the size of their file.
+# Anything reachable from more than one place is counted once, in the first
+# place the walk reaches it.
+#
+# In game, the "memory_report" key (F4 by default) turns MemoryLog on: a
+# report is written to memory.log then, and again on every room transition.
+LOG_PATH = "memory.log"
+
+
+def surface_bytes(surface):
+    if surface.get_parent() is not None:
+        return 0
+    return layer_bytes(surface)
+
+
+def sound_bytes(sound):
+    if not mixer.get_init():
+        return 0
+    frequency, size, channels = mixer.get_init()
+    return int(sound.get_length() * frequency) * (abs(size) // 8) * channels
+
+
+def find_held(value, depth=3):
+    """ The Surfaces and Sounds in value, looking inside lists, tuples and dicts. """
+    if isinstance(value, (pygame.Surface, ManagedSound, mixer.Sound)):
+        return [value]
+    if depth == 0:
+        return []
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        held = []
+        for item in value:
+            held += find_held(item, depth - 1)
+        return held
+    return []
+
+
+class MemoryReport(object):
+    """
+    One walk over the game's memory, see the top of the file. rooms is the
+    AllRooms, groups {name: sprite group or list of sprites} and room_cache
+    the RoomCache, if there is one.
+    """
+    def __init__(self, rooms, groups=None, room_cache=None):
+        self.seen = set()
+        # Category: [objects, bytes]
+        self.categories = {}
+        # Class name: [instances, surfaces held, sounds held, bytes only they hold]
+        self.classes = {}
+        # Room: [how its layers are kept, bytes]
+        self.rooms = {}
+        # Bytes of the asset pack that's memory-mapped, read from its file
+        # as it's used rather than held in memory
+        self.mapped = 0
+        # The asset cache's images, so sprites' own surfaces (flipped or
+        # rotated frames) can be told apart from the ones they share
+        self.cached = set(id(image) for image in assets.images.values())
+
+        self.walk_rooms(rooms)
+        sprites = []
+        for group in (groups or {}).values():
+            sprites += list(group)
+        if room_cache is not None:
+            for instance in room_cache.instances.values():
+                for kept in [instance.objects, instance.items, instance.enemies or []]:
+                    sprites += list(kept.values()) if isinstance(kept, dict) else list(kept)
+        self.walk_sprites(sprites)
+        self.walk_assets()
+
+    def count(self, category, thing, size):
+        """ Adds thing to category unless it's been counted. Returns the bytes added. """
+        if id(thing) in self.seen:
+            return 0
+        self.seen.add(id(thing))
+        totals = self.categories.setdefault(category, [0, 0])
+        totals[0] += 1
+        totals[1] += size
+        return size
+
+    def walk_rooms(self, rooms):
+        for layer in [rooms.background, rooms.coll_image, rooms.top]:
+            self.count("room layers", layer, surface_bytes(layer))
+        self.rooms[tuple(rooms.room_num)] = ["active", sum(surface_bytes(layer) for layer in
+                                                           [rooms.background, rooms.coll_image, rooms.top])]
+        bundles = rooms.bundles
+        for room, layers in bundles.layers.items():
+            size = sum(self.count("room layers", layer, surface_bytes(layer)) for layer in layers)
+            form = "8 bit" if any(layer.get_bitsize() == 8 for layer in layers) else "32 bit"
+            self.rooms.setdefault(room, [form, 0])[1] += size
+        for room, future in bundles.compressed.items():
+            if future.done() and future.result() is not None:
+                size = self.count("compressed room layers", future, compressed_bytes(future.result()))
+                self.rooms.setdefault(room, ["compressed", 0])[1] += size
+        if rooms.tilemap is not None:
+            for (room_x, room_y, layer_name), layer in rooms.tilemap.surfaces.items():
+                size = self.count("room layers", layer, surface_bytes(layer))
+                self.rooms.setdefault((room_x, room_y), ["tiles", 0])[1] += size
+
+    def walk_sprites(self, sprites):
+        for sprite in sprites:
+            if id(sprite) in self.seen:
+                continue
+            self.seen.add(id(sprite))
+            totals = self.classes.setdefault(type(sprite).__name__, [0, 0, 0, 0])
+            totals[0] += 1
+            # image is also one of the animation frames
+            held_ids = set()
+            for value in sprite.__dict__.values():
+                for held in find_held(value):
+                    if id(held) in held_ids:
+                        continue
+                    held_ids.add(id(held))
+                    if isinstance(held, pygame.Surface):
+                        totals[1] += 1
+                        if id(held) not in self.cached:
+                            totals[3] += self.count("sprite frames (flipped, rotated, drawn)",
+                                                    held, surface_bytes(held))
+                    else:
+                        totals[2] += 1
+
+    def walk_assets(self):
+        for path, image in assets.images.items():
+            category = "asset images"
+            if image.get_parent() is not None:
+                category = "asset images (atlas and pack views)"
+            self.count(category, image, surface_bytes(image))
+        for path, sound in assets.sounds.items():
+            self.count("sounds", sound, sound_bytes(sound))
+        for path, font_file in assets.font_files.items():
+            self.count("fonts", font_file, len(font_file))
+        for key, font in assets.fonts.items():
+            self.count("fonts", font, 0)
+        for name, future in music.tracks.items():
+            if future.done() and future.result() is not None:
+                self.count("music", future, sound_bytes(future.result()))
+        for position, sound in list(music.rotated.values()):
+            self.count("music", sound, sound_bytes(sound))
+        if assets.pack is not None:
+            self.mapped = len(assets.pack.data)
+
+    def get_lines(self):
+        lines = ["category: objects, KB"]
+        for category in sorted(self.categories, key=lambda name: -self.categories[name][1]):
+            objects, size = self.categories[category]
+            lines.append("  %s: %d, %d" % (category, objects, size // 1024))
+        lines.append("class: instances, surfaces / instance, sounds / instance, own KB")
+        for name in sorted(self.classes, key=lambda name: (-self.classes[name][3], name)):
+            instances, surfaces, sounds, size = self.classes[name]
+            lines.append("  %s: %d, %.1f, %.1f, %d" % (name, instances, surfaces / instances,
+                                                       sounds / instances, size // 1024))
+        lines.append("room: layers kept as, KB")
+        for room in sorted(self.rooms):
+            form, size = self.rooms[room]
+            lines.append("  %s: %s, %d" % (list(room), form, size // 1024))
+        total = sum(size for objects, size in self.categories.values())
+        lines.append("total: %d KB, and %d KB of asset pack mapped" % (total // 1024, self.mapped // 1024))
+        return lines
+
+
+class MemoryLog(object):
+    """
+    Appends memory reports to path while it's on; toggled in game with the
+    "memory_report" key. get_report is called for each report and returns a
+    MemoryReport.
+    """
+    def __init__(self, path=LOG_PATH):
+        self.path = path
+        self.enabled = False
+
+    def toggle(self, get_report):
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.write(get_report(), "memory log on")
+            print("Memory reports are being written to " + self.path)
+
+    def room_entered(self, get_report, room_num):
+        if self.enabled:
+            self.write(get_report(), "entered room " + str(list(room_num)))
+
+    def write(self, report, heading):
+        try:
+            with open(self.path, "a") as log_file:
+                log_file.write("== " + time.strftime("%Y-%m-%d %H:%M:%S") + " " + heading + "\n")
+                log_file.write("\n".join(report.get_lines()) + "\n\n")
+        except OSError as e:
+            print("Error: Couldn't write memory report,", e)
+
+
+memory_log = MemoryLog()
@@ -5,6 +5,10 @@ from pygame import mixer
 import os
 import random
 import math
+import time
+
+# For the startup report, see main()
+STARTED = time.perf_counter()
 
 # Some assets are my own design, others are from
 #   kenney.nl, a free asset website, and
@@ -13,8 +17,11 @@ import math
 from sprite_classes import *
 from game_maps import *
 from extra_functions import *
+from save_game import *
+from memory_report import MemoryReport, memory_log
 
-rooms = AllRooms()
+# Set up by init_game()
+rooms = None
 
 def collision_check(sprite, coll_rects, rooms, walls, is_player=False, player=None):
     if is_player:
@@ -39,6 +46,14 @@ def collision_check(sprite, coll_rects, rooms, walls, is_player=False, player=No
     if is_player:
         transition_dict = sprite.check_room_trans(walls)
         if transition_dict[0]:
+            for direction in ["up", "down", "left", "right"]:
+                if transition_dict[direction]:
+                    break
+            if rooms.get_transition(direction) is None:
+                # No room on that side, the edge works like a wall
+                sprite.true_center[0], sprite.true_center[1] = old_true_center
+                sprite.reset_hitbox()
+                return
             general_coll = True
             if transition_dict["up"]:
                 rooms.set_room_num(y=1)
@@ -108,8 +123,8 @@ def collision_check(sprite, coll_rects, rooms, walls, is_player=False, player=No
 class Heart(pygame.sprite.Sprite):
     """ Player's health display. Each instance is one heart. """
     total_hearts = 0
-    heart_images = load_animation(("hp0.png", "hp1.png", "hp2.png",
-                                   "hp3.png", "hp4.png"))
+    # Loaded with the first heart
+    heart_images = None
 
     @staticmethod
     def reset():
@@ -117,6 +132,9 @@ class Heart(pygame.sprite.Sprite):
 
     def __init__(self, player_obj):
         super().__init__()
+        if Heart.heart_images is None:
+            Heart.heart_images = load_animation(("hp0.png", "hp1.png", "hp2.png",
+                                                 "hp3.png", "hp4.png"))
         self.image = self.heart_images[4]
         Heart.total_hearts += 1
         self.which_heart = Heart.total_hearts
@@ -135,6 +153,7 @@ class Heart(pygame.sprite.Sprite):
         self.player = player_obj
 
     def update(self):
+        """ Called by the HUD layer when it redraws. """
         health = int(self.player.health - (4 * (self.which_heart - 1)))
         if health >= 4:
             health = 4
@@ -148,10 +167,10 @@ class UIText(pygame.sprite.Sprite):
     def __init__(self):
         super().__init__()
         try:
-            self.font = pygame.font.Font(
+            self.font = assets.get_font(
                 os.path.join("Fonts", "Kenney Mini Square.ttf"), 10)
         except:
-            self.font = pygame.font.SysFont(
+            self.font = assets.get_sys_font(
                 "timesnewroman", 10)
         self.plate_image = load_image("green_pressed1.png")
         self.text_image = self.font.render("Health", True, get_color("black"))
@@ -209,106 +228,124 @@ class UseRect(pygame.sprite.Sprite):
         self.active = False
 
 
-def pause_menu(rooms, base_screen):
-    set_music(MENU_MUSIC[0], MENU_MUSIC[1])
-    background = base_screen.copy()
-    pause_screen = base_screen.copy()
-    clock = pygame.time.Clock()
+class PauseScene(Scene):
+    """ Pause menu, drawn over the paused frame. """
+    overlay = True
 
-    # Title Settings
-    menuTitle = GameMenu(["Paused"])
+    def __init__(self, rooms):
+        self.rooms = rooms
 
-    menuTitle.center_at(tile_size(6), tile_size(2))
-    menuTitle.set_font(pygame.font.Font(
-        os.path.join("Fonts", "Kenney Mini Square.ttf"), 24))
-    menuTitle.set_back_image()
-    menuTitle.set_highlight(get_color("purple"))
+        # Title Settings
+        self.menuTitle = GameMenu(["Paused"])
 
-    # Menu Settings
-    menuButtons = GameMenu(["Continue", rooms.set_status_gameplay], ["Quit", exit_game])
-    menuButtons.set_font(pygame.font.Font(
-        os.path.join("Fonts", "Kenney Mini Square.ttf"), 16))
-    menuButtons.center_at(tile_size(10), tile_size(7))
-    menuButtons.set_back_image()
-    menuButtons.set_color(get_color("black"))
-    menuButtons.set_highlight(get_color("green"))
+        self.menuTitle.center_at(tile_size(6), tile_size(2))
+        self.menuTitle.set_font(assets.get_font(
+            os.path.join("Fonts", "Kenney Mini Square.ttf"), 24))
+        self.menuTitle.set_back_image()
+        self.menuTitle.set_highlight(get_color("purple"))
 
-    rooms.set_status("pause_menu")
+        # Menu Settings
+        self.menuButtons = GameMenu(["Continue", rooms.set_status_gameplay], ["Quit", exit_game])
+        self.menuButtons.set_font(assets.get_font(
+            os.path.join("Fonts", "Kenney Mini Square.ttf"), 16))
+        self.menuButtons.center_at(tile_size(10), tile_size(7))
+        self.menuButtons.set_back_image()
+        self.menuButtons.set_color(get_color("black"))
+        self.menuButtons.set_highlight(get_color("green"))
 
-    menu_sound = load_sound("sfx_sounds_pause7_in.wav", 0.3)
-    menu_sound.play()
+        self.menu_sound = load_sound("sfx_sounds_pause7_in.wav", 0.3, "ui")
 
-    while rooms.get_status("pause_menu"):
-        pause_screen.blit(background, (0, 0))
-        events = pygame.event.get()
+    def enter(self):
+        set_music(MENU_MUSIC[0], MENU_MUSIC[1])
+        self.rooms.set_status("pause_menu")
+        self.menu_sound.play()
 
-        menuTitle.draw(pause_screen)
+    def update(self, events):
+        self.menuButtons.update(events)
 
-        menuButtons.update(events)
+    def draw(self, surface):
+        self.menuTitle.draw(surface)
+        self.menuButtons.draw(surface)
 
-        menuButtons.draw(pause_screen)
+    def is_done(self):
+        return not self.rooms.get_status("pause_menu")
 
-        flip_screen(pause_screen)
-    set_music(GAME_MUSIC[0], GAME_MUSIC[1])
+    def exit(self):
+        set_music(GAME_MUSIC[0], GAME_MUSIC[1])
+
+
+class SideMenuScene(Scene):
+    """
+    Base for the menus opened from the main menu. Draws one of the room
+    images as the background; open while the "side_menu" status is set.
+    """
+    def __init__(self, room_name):
+        self.menu_back1 = assets.get_image(os.path.join("mapFiles", room_name + ".png")).convert()
+        self.menu_back2 = assets.get_image(os.path.join("mapFiles", room_name + "top.png"))
 
+        # Setting up title for menu
+        self.title = GameMenu([self.TITLE])
+        self.title.set_font(assets.get_font(os.path.join("Fonts", "Kenney Mini Square.ttf"), 16))
+        self.title.set_back_image()
+        self.title.center_at(tile_size(10), tile_size(2))
+        self.title.set_color(get_color("purple"))
+        self.title.set_highlight(get_color("purple"))
 
-def controls_menu():
-    # Setting up title for menu
-    title = GameMenu(["Controls"])
-    title.set_font(pygame.font.Font(os.path.join("Fonts", "Kenney Mini Square.ttf"), 16))
-    title.set_back_image()
-    title.center_at(tile_size(10), tile_size(2))
-    title.set_color(get_color("purple"))
-    title.set_highlight(get_color("purple"))
-
-    control_display = GameMenu(["Movement          W A S D"],
-                               ["Sword Attack       Space Bar"],
-                               ["Shoot Bow           J or B"],
-                               ["Drop Bomb          K"],
-                               ["Throw Fireball     L or F"],
-                               ["Use Potion           Q"],
-                               ["Use/Activate        E"],
-                               ["Pause                  P"],
-                               [""],
-                               ["During dialogue:"],
-                               ["    Space             Skip through message"],
-                               ["    E/Enter          Next message/exit"])
-    control_display.set_back_image()
-    control_display.set_font(pygame.font.SysFont("timesnewroman", 10))
-    control_display.center_at(tile_size(10), tile_size(4))
-    control_display.set_highlight(get_color("black"))
-
-    menu_options = GameMenu(["Back  ", rooms.set_status_side_menu])
-    menu_options.set_back_image()
-    menu_options.center_at(tile_size(4), tile_size(16))
-
-    menu_back1 = pygame.image.load(os.path.join("mapFiles", "[7,7].png")).convert()
-    menu_back2 = pygame.image.load(os.path.join("mapFiles", "[7,7]top.png")).convert_alpha()
-
-    rooms.set_status("side_menu", True)
-
-    while rooms.get_status("side_menu"):
-        screen.blit(menu_back1, (0, 0))
-        screen.blit(menu_back2, (0, 0))
-
-        menu_options.update(pygame.event.get())
-        menu_options.draw(screen)
-
-        title.draw(screen)
-
-        control_display.draw(screen)
-
-        flip_screen()
-
-
-def credits_menu():
-    title = GameMenu(["Credits"])
-    title.set_font(pygame.font.Font(os.path.join("Fonts", "Kenney Mini Square.ttf"), 16))
-    title.set_back_image()
-    title.center_at(tile_size(10), tile_size(2))
-    title.set_color(get_color("purple"))
-    title.set_highlight(get_color("purple"))
-    credits_lines = [[["                 Developed by Zoeyism            "],
+    def enter(self):
+        rooms.set_status("side_menu", True)
+
+    def draw(self, surface):
+        surface.blit(self.menu_back1, (0, 0))
+        surface.blit(self.menu_back2, (0, 0))
+
+    def is_done(self):
+        return not rooms.get_status("side_menu")
+
+
+class ControlsScene(SideMenuScene):
+    TITLE = "Controls"
+
+    def __init__(self):
+        super().__init__("[7,7]")
+        # Shows the keys as they're bound, including changes from controls.cfg
+        keys = key_bindings.describe
+        movement = " ".join(keys("gameplay", action, "/") for action in ["up", "left", "down", "right"])
+        self.control_display = GameMenu(["Movement          " + movement],
+                                        ["Sword Attack       " + keys("gameplay", "sword")],
+                                        ["Shoot Bow           " + keys("gameplay", "bow")],
+                                        ["Drop Bomb          " + keys("gameplay", "bomb")],
+                                        ["Throw Fireball     " + keys("gameplay", "flame")],
+                                        ["Use Potion           " + keys("gameplay", "potion")],
+                                        ["Use/Activate        " + keys("gameplay", "use")],
+                                        ["Pause                  " + keys("gameplay", "pause")],
+                                        [""],
+                                        ["During dialogue:"],
+                                        ["    " + keys("dialogue", "skip") + "             Skip through message"],
+                                        ["    " + keys("dialogue", "next", "/") + "          Next message/exit"])
+        self.control_display.set_back_image()
+        self.control_display.set_font(assets.get_sys_font("timesnewroman", 10))
+        self.control_display.center_at(tile_size(10), tile_size(4))
+        self.control_display.set_highlight(get_color("black"))
+
+        self.menu_options = GameMenu(["Back  ", rooms.set_status_side_menu])
+        self.menu_options.set_back_image()
+        self.menu_options.center_at(tile_size(4), tile_size(16))
+
+    def update(self, events):
+        self.menu_options.update(events)
+
+    def draw(self, surface):
+        super().draw(surface)
+        self.menu_options.draw(surface)
+
+        self.title.draw(surface)
+
+        self.control_display.draw(surface)
+
+
+class CreditsScene(SideMenuScene):
+    TITLE = "Credits"
+    CREDITS_LINES = [[["                 Developed by Zoeyism            "],
                       ["Most art assets, all sound assets from"],
                       ["several free game asset websites."],
                       [""],
@@ -343,51 +380,119 @@ def credits_menu():
                       [""],
                       [" Full attributions and links within 'Attributions.txt' "]]]
 
-    credits_display = GameMenu([""])
-    credits_display.set_options(credits_lines[0])
-
-    credits_display.set_highlight(get_color("black"))
-    credits_display.set_pos(tile_size(3), tile_size(4))
-    credits_display.set_back_image()
-    credits_display.set_font(pygame.font.SysFont("timesnewroman", 10))
-
-    menu_options = GameOptions(["Page 1", 0])
-    choices = [["Page 1", 0], ["Page 2", 1], ["Back  ", 2]]
-    for i in range(3):
-        menu_options.set_option(choices[i], i+1)
-    menu_options.center_at(tile_size(16), tile_size(17.5))
-
-    menu_back1 = pygame.image.load(os.path.join("mapFiles", "[7,8].png")).convert()
-    menu_back2 = pygame.image.load(os.path.join("mapFiles", "[7,8]top.png")).convert_alpha()
-
-    rooms.set_status("side_menu", True)
-
-    while rooms.get_status("side_menu"):
-        screen.blit(menu_back1, (0, 0))
-        screen.blit(menu_back2, (0, 0))
-
-        decision = menu_options.update(pygame.event.get())
+    def __init__(self):
+        super().__init__("[7,8]")
+        self.credits_display = GameMenu([""])
+        self.credits_display.set_options(self.CREDITS_LINES[0])
+
+        self.credits_display.set_highlight(get_color("black"))
+        self.credits_display.set_pos(tile_size(3), tile_size(4))
+        self.credits_display.set_back_image()
+        self.credits_display.set_font(assets.get_sys_font("timesnewroman", 10))
+
+        self.menu_options = GameOptions(["Page 1", 0])
+        choices = [["Page 1", 0], ["Page 2", 1], ["Back  ", 2]]
+        for i in range(3):
+            self.menu_options.set_option(choices[i], i+1)
+        self.menu_options.center_at(tile_size(16), tile_size(17.5))
+
+    def update(self, events):
+        decision = self.menu_options.update(events)
         if decision is not None:
             if decision == 2:
                 rooms.set_status_side_menu()
             else:
                 try:
-                    credits_display.set_options(credits_lines[decision])
+                    self.credits_display.set_options(self.CREDITS_LINES[decision])
                 except:
                     pass
 
-        menu_options.draw(screen)
+    def draw(self, surface):
+        super().draw(surface)
+        self.menu_options.draw(surface)
+
+        self.title.draw(surface)
+
+        self.credits_display.draw(surface)
+
+
+class LoadScene(SideMenuScene):
+    """ Lists the save slots from the slot index, with a thumbnail of the highlighted one. """
+    TITLE = "Load Game"
+
+    def __init__(self):
+        super().__init__("[7,8]")
+        self.slots = slot_index.get_slots()
+        self.thumbnails = [get_thumbnail(info) for path, info in self.slots]
+
+        self.menu_options = GameOptions(["Back  ", "back"])
+        for i in range(len(self.slots)):
+            self.menu_options.set_option([slot_name(self.slots[i][0]), i], i + 1)
+        self.menu_options.set_option(["Back  ", "back"], len(self.slots) + 1)
+        self.menu_options.set_pos(tile_size(3), tile_size(4))
+
+        self.slot_display = GameMenu([""])
+        self.slot_display.set_highlight(get_color("black"))
+        self.slot_display.set_pos(tile_size(10), tile_size(9))
+        self.slot_display.set_back_image()
+        self.slot_display.set_font(assets.get_sys_font("timesnewroman", 10))
+        self.shown_slot = None
+
+    def update(self, events):
+        decision = self.menu_options.update(events)
+        if decision == "back":
+            rooms.set_status_side_menu()
+        elif decision is not None:
+            snapshot = load_game(self.slots[decision][0])
+            if snapshot is not None:
+                rooms.set_status_side_menu()
+                gameplay(snapshot)
+
+    def draw(self, surface):
+        super().draw(surface)
+        self.menu_options.draw(surface)
+        self.title.draw(surface)
+
+        # Slot details only change when the highlighted slot does
+        selected = self.menu_options.opt_num - 1
+        if selected < len(self.slots):
+            if self.shown_slot != selected:
+                self.shown_slot = selected
+                info = self.slots[selected][1]
+                region = info["region"] if info["region"] is not None else "overworld"
+                self.slot_display.set_options([["Region: " + region.title()],
+                                               ["Gold: " + str(info["gold"])],
+                                               ["Hearts: %g/%d" % (info["hearts"], info["max_hearts"])],
+                                               ["Play time: " + format_play_time(info["play_time"])]])
+            if self.thumbnails[selected] is not None:
+                surface.blit(self.thumbnails[selected], (tile_size(10), tile_size(4)))
+            self.slot_display.draw(surface)
+
+
+class GameplayScene(Scene):
+    """ The game itself. gameplay() sets everything up and passes in its update and draw. """
+    def __init__(self, update, draw):
+        self.update_frame = update
+        self.draw_frame = draw
+
+    def update(self, events):
+        self.update_frame(events)
 
-        title.draw(screen)
+    def draw(self, surface):
+        self.draw_frame(surface)
 
-        credits_display.draw(screen)
+    def is_done(self):
+        return not rooms.get_status("gameplay")
 
-        flip_screen()
+    def exit(self):
+        Heart.reset()  # Resets the number of hearts in the UI, allows loading back in without issues
 
-def gameplay():
+
+def gameplay(snapshot=None):
     """
-    Main gameplay loop. Sets up all instances used in gameplay, almost
-    everything happens here.
+    Sets up all instances used in gameplay and pushes the gameplay scene;
+    almost everything happens in its update(). snapshot is a loaded save
+    to continue from.
     """
     rooms.set_status("gameplay")
     rooms.set_status("room_transition")
@@ -410,19 +515,22 @@ def gameplay():
     equipment_group = pygame.sprite.LayeredUpdates()
     item_group = pygame.sprite.LayeredUpdates()
     object_group = pygame.sprite.LayeredUpdates()
-    ui_group = pygame.sprite.LayeredUpdates()
+    # HUD sprites are drawn on a cached layer, see HUDLayer
+    ui_group = HUDLayer()
+    # Icons that follow enemies around, redrawn every frame
+    icon_group = pygame.sprite.LayeredUpdates()
 
     # enemy group is... self-explanatory, hopefully
-    enemy_group = pygame.sprite.LayeredUpdates()
+    enemy_group = TaggedGroup()
 
     # Death group is used to remove enemies from screen after HP goes <= 0.
     # Forces dead enemies to launch away for a brief time while exploding,
     #   and then .kill() the instance when appropriate
-    death_group = pygame.sprite.LayeredUpdates()
+    death_group = TaggedGroup()
 
     # Projectiles separated by team
     enemy_projectiles = pygame.sprite.LayeredUpdates()
-    player_projectiles = pygame.sprite.LayeredUpdates()
+    player_projectiles = TaggedGroup()
 
     player_group.add(player, sword, bow, bomb_bag, glove)
     equipment_group.add(sword, bow, bomb_bag, glove)
@@ -439,13 +547,19 @@ def gameplay():
     ui_group.add(health_text, gold_count, potion_count)
     for i in range(3):
         ui_group.add(Heart(player))
+    ui_group.watch(player, bow, bomb_bag, glove, *player.region_keys.values())
 
     walls = {}
     coll_rects = pygame.sprite.LayeredUpdates()
+    # Nothing from a previous game is kept
+    rooms.bundles.clear_references()
+    room_cache = RoomCache(bundles=rooms.bundles)
+    current_instance = None
+    spawn_factory.prepare(rooms.world.get_classes())
+    spawn_factory.prepare([HeartItem, BombItem, ArrowItem, FlameItem])
     ending_timer = -1
 
     # Used during testing of game and as dev menu
-    testing = False
     cheat_allowed = True
     ui_added = False
     testing_options = [["Tundra", [6, 9]],
@@ -453,13 +567,156 @@ def gameplay():
                        ["Boss Dungeon", [11, 8]],
                        ["Final Bosses", [14, 9]],
                        ["Cancel", "cancel"]]
-    testing_room = None
     test_choices = GameOptions(["Mountains", "blah"])
     for i in range(len(testing_options)):
         test_choices.set_option(testing_options[i], i + 1)
 
-    death_scene = DeathCutscene(player, ui_group)
-    while rooms.get_status("gameplay"):
+    death_scene = DeathCutscene(player, ui_group, rooms)
+
+    def memory_report():
+        groups = {"player": player_group, "items": item_group, "objects": object_group,
+                  "enemies": enemy_group, "dying": death_group, "icons": icon_group,
+                  "hud": ui_group, "collision": coll_rects,
+                  "player projectiles": player_projectiles, "enemy projectiles": enemy_projectiles,
+                  "spawn prototypes": [prototype for prototype in spawn_factory.prototypes.values()
+                                       if prototype is not None]}
+        return MemoryReport(rooms, groups, room_cache)
+
+    # Key handlers, looked up by action name through key_bindings
+    def pause_game():
+        scene_manager.push(PauseScene(rooms))
+
+    def drink_potion():
+        if player.get_potions() > 0 and player.health != player.max_health:
+            player.add_potion(-1)
+            player.health = player.max_health
+            player.play_heal_noise()
+
+    def dev_menu_choice(testing_room):
+        nonlocal ui_added
+        if testing_room == "cancel":
+            return
+        rooms.set_status("room_transition")
+        if isinstance(testing_room, list) and len(testing_room) == 2:
+            rooms.room_num = testing_room[:]
+            rooms.set_room_num()
+            bow.equip_item()
+            bomb_bag.equip_item()
+            sword.equip_item()
+            glove.equip_item()
+
+            if not ui_added:
+                ui_group.add(arrow_count, bomb_count, flame_count)
+                ui_added = False
+
+            player.set_region(rooms.get_room_info()["region"])
+            ui_group.remove(ui_group.get_tagged("key_counter"))
+            if player.region in player.region_keys.keys():
+                ui_group.add(player.region_keys[player.region])
+            else:
+                print("Error: Region =", player.region)
+            for i in range(2):
+                player.region_keys[player.region].add_boss_key()
+
+            player.add_gold(2000)
+            player.max_health = 40
+            player.health = player.max_health
+
+    def use_result(to_do):
+        """ Acts on what using an NPC gave back, ex: "gold" or something bought from a shop. """
+        item_to_add = None
+        if to_do == "gold":
+            player.add_gold(1000)
+        elif to_do == "remove_soldiers":
+            # Removes 2 soldiers blocking path to queen's tower
+            rooms.room_objects[8][7].pop(3)
+            rooms.room_objects[8][7].pop(4)
+        elif to_do == "heart_up":
+            item_to_add = HeartContainer
+        elif to_do == "potion":
+            player.add_potion()
+        elif to_do == "potion_up":
+            player.max_potions += 1
+            player.add_potion()
+        elif to_do == "arrow":
+            item_to_add = ArrowItem
+        elif to_do == "bomb":
+            item_to_add = BombItem
+        elif to_do == "flame":
+            item_to_add = FlameItem
+        elif to_do == "bow":
+            item_to_add = BowUpgrade
+        if item_to_add is not None:
+            player_pos = list(player.rect.center[:])
+            for i in range(len(player_pos)):
+                player_pos[i] /= tile_size(1)
+            item_group.add(item_to_add(player_pos, 17))
+
+    def open_dev_menu():
+        if cheat_allowed:
+            scene_manager.push(OptionsScene(test_choices, dev_menu_choice))
+
+    # Counters shown once their equipment has been picked up
+    equipment_counters = [[bow, arrow_count], [bomb_bag, bomb_count], [glove, flame_count]]
+
+    def restore_snapshot(snapshot):
+        """ Applies a saved snapshot, fixes up the HUD and reloads the room. """
+        nonlocal current_instance
+        apply_snapshot(snapshot, rooms, player)
+        # Cached rooms hold sprites from before the load
+        room_cache.clear()
+        current_instance = None
+        for heart in [s for s in ui_group if isinstance(s, Heart)]:
+            if heart.which_heart * 4 > player.max_health:
+                ui_group.remove(heart)
+                Heart.total_hearts -= 1
+        ui_group.remove(ui_group.get_tagged("key_counter"))
+        if player.region is not None:
+            ui_group.add(player.region_keys[player.region])
+        for equip, counter in equipment_counters:
+            if equip.is_equipped:
+                ui_group.add(counter)
+            else:
+                ui_group.remove(counter)
+        ui_group.mark_dirty()
+        rooms.set_status("room_transition")
+
+    def quick_load():
+        snapshot = load_game()
+        if snapshot is not None:
+            restore_snapshot(snapshot)
+
+    press_handlers = {"up": lambda: player.set_move("w"),
+                      "down": lambda: player.set_move("s"),
+                      "left": lambda: player.set_move("a"),
+                      "right": lambda: player.set_move("d")}
+    release_handlers = {"up": lambda: player.stop_move("w"),
+                        "down": lambda: player.stop_move("s"),
+                        "left": lambda: player.stop_move("a"),
+                        "right": lambda: player.stop_move("d"),
+                        "pause": pause_game,
+                        "use": p_use.use_active,
+                        "potion": drink_potion,
+                        "dev_menu": open_dev_menu,
+                        "profiler": profiler.toggle,
+                        "memory_report": lambda: memory_log.toggle(memory_report),
+                        "quick_save": lambda: save_game(rooms, player, surface=screen),
+                        "quick_load": quick_load}
+    for equip in equipment_group:
+        press_handlers[equip.ACTION] = equip.press
+        release_handlers[equip.ACTION] = equip.end_use
+
+    if snapshot is not None:
+        restore_snapshot(snapshot)
+    # Autosaves wait for the new room to be drawn, for the slot thumbnail
+    autosave_due = False
+    room_info = rooms.get_room_info()
+
+    def update(events):
+        """ One frame of gameplay, everything but drawing. """
+        nonlocal current_instance, room_info, walls, ending_timer, autosave_due
+        rooms.play_time += clock.get_time() / 1000
+        rooms.bundles.update()
         if ending_timer > 0:
             ending_timer -= 1
 
@@ -472,62 +729,17 @@ def gameplay():
             for dir in "wasd":
                 player.stop_move(dir)
             rooms.set_status("cutscene", True)
-            death_scene.loop(rooms)
-
-        # Only activates when cheat_allowed
-        if testing:
-            background = screen.copy()
-        while testing:
-            events = pygame.event.get()
-            testing_room = test_choices.update(events)
-
-            if testing_room is not None and "cancel" not in testing_room:
-                rooms.set_status("room_transition")
-                if isinstance(testing_room, list) and len(testing_room) == 2:
-                    rooms.room_num = testing_room
-                    rooms.set_room_num()
-                    bow.equip_item()
-                    bomb_bag.equip_item()
-                    sword.equip_item()
-                    glove.equip_item()
-
-                    if not ui_added:
-                        ui_group.add(arrow_count, bomb_count, flame_count)
-                        ui_added = False
-
-                    if testing_room in [[11, 8], [14, 9]]:
-                        player.set_region("tower")
-                    elif testing_room in [[6, 9]]:
-                        player.set_region("tundra")
-                    elif testing_room in [[9, 5]]:
-                        player.set_region("mountains")
-                    for ui in ui_group:
-                        if ui.__class__.__name__ == "KeyCount":
-                            ui_group.remove(ui)
-                    if player.region in player.region_keys.keys():
-                        ui_group.add(player.region_keys[player.region])
-                    else:
-                        print("Error: Region =", player.region)
-                    for i in range(2):
-                        player.region_keys[player.region].add_boss_key()
-
-                    player.add_gold(2000)
-                    player.max_health = 40
-                    player.health = player.max_health
-                testing = False
-                testing_room = None
-            elif testing_room is not None and testing_room == "cancel":
-                testing = False
-                testing_room = None
-
-            screen.blit(background, (0, 0))
-            test_choices.draw(screen)
-            flip_screen(screen)
+            scene_manager.push(death_scene)
+            return
 
         # Transitions rooms
         if rooms.get_status("room_transition"):
+            transition_start = time.perf_counter()
+            if current_instance is not None:
+                room_cache.leave(current_instance, object_group, item_group, enemy_group)
 
             # Clear out groups for next room
+            icon_group.empty()
             enemy_group.empty()
             item_group.empty()
             object_group.empty()
@@ -535,79 +747,74 @@ def gameplay():
             player_projectiles.empty()
             enemy_projectiles.empty()
 
-            # removes key display based on room change
-            room_num = rooms.get_room_num()
-            if room_num in [[6, 8], [8, 6], [9, 8]]:
-                player.set_region(None)
-                for ui in ui_group:
-                    if ui.__class__.__name__ == "KeyCount":
-                        # Removes all KeyCount items from
-                        # ui_group when changing regions
-                        ui_group.remove(ui)
-
-            elif room_num == [6, 9]:
-                # Adds specific keycount for tundra region
-                ui_group.add(player.region_keys["tundra"])
-                player.set_region("tundra")
-
-            elif room_num == [8, 5]:
-                ui_group.add(player.region_keys["mountains"])
-                player.set_region("mountains")
-
-            elif room_num == [10, 8]:
-                ui_group.add(player.region_keys["tower"])
-                player.set_region("tower")
-
-
-            rooms.reset_room_info()
-            rooms.build_room_initial()
+            # Swaps the key display when moving between regions
+            room_info = rooms.get_room_info()
+            if room_info["region"] != player.region:
+                ui_group.remove(ui_group.get_tagged("key_counter"))
+                player.set_region(room_info["region"])
+                if player.region is not None:
+                    ui_group.add(player.region_keys[player.region])
+            rooms.bundles.enter_region(player.region)
+
+            # Rooms visited recently are reused from room_cache
+            instance = room_cache.get(rooms.room_num)
+            if instance is None:
+                rooms.reset_room_info()
+                rooms.build_room_initial()
+                instance = RoomInstance(rooms, [LoadedObjects(coll) for coll in rooms.get_room_coll()])
+                room_cache.add(instance)
+            else:
+                instance.restore_layers(rooms)
+            current_instance = instance
 
             walls = room_walls(screen)
-            for coll in rooms.get_room_coll():
-                coll_rects.add(LoadedObjects(coll))
+            coll_rects.add(instance.coll_sprites)
 
             skip_enemies = False
             skip_items = False
-            if room_num in [[7, 10], [8, 4]]:
-                if rooms.bosses_beaten[player.region]:
+            if room_info["boss_region"] is not None:
+                if rooms.bosses_beaten[room_info["boss_region"]]:
                     skip_enemies = True
                 skip_items = True
 
-            if not skip_enemies:
-                enemies = rooms.get_room_enemies()
-                for enemy in enemies:
-                    try:
-                        enemy_group.add(enemy[0](tile_pos(enemy[1], enemy[2])))
-                    except Exception as e:
-                        # print(e)
-                        pass
+            if skip_enemies:
+                pass
+            elif instance.enemies is not None and room_info["boss_region"] is None:
+                enemy_group.add(instance.enemies)
+            else:
+                for enemy in rooms.get_room_enemies():
+                    new_enemy = spawn_factory.spawn(enemy[0], tile_pos(enemy[1], enemy[2]))
+                    if new_enemy is not None:
+                        enemy_group.add(new_enemy)
             room_objects = rooms.get_room_objects()
             for key in room_objects.keys():
-                try:
-                    obj = room_objects[key]
-                    try:
-                        object_group.add(obj[0](tile_pos(obj[1], obj[2]), key))
-                    except Exception as e2:
-                        # print(e2)
-                        object_group.add(obj[0](tile_pos(obj[1], obj[2])))
-                except Exception as e:
-                    # print(e)
-                    pass
+                if key in instance.objects:
+                    object_group.add(instance.objects[key])
+                    continue
+                obj = room_objects[key]
+                new_obj = spawn_factory.spawn(obj[0], tile_pos(obj[1], obj[2]), key)
+                if new_obj is not None:
+                    new_obj.spawn_key = key
+                    object_group.add(new_obj)
             for obj in object_group:
                 coll_rects.add(obj)
 
             if not skip_items:
                 items = rooms.get_room_items()
                 for key in items.keys():
-                    try:
-                        item = items[key]
-                        item_group.add(item[0]([item[1], item[2]], key))
-                    except Exception as e:
-                        # print(e)
-                        pass
-
+                    if key in instance.items:
+                        item_group.add(instance.items[key])
+                        continue
+                    item = items[key]
+                    new_item = spawn_factory.spawn(item[0], [item[1], item[2]], key)
+                    if new_item is not None:
+                        new_item.spawn_key = key
+                        item_group.add(new_item)
+            profiler.add_timing("room transition", (time.perf_counter() - transition_start) * 1000)
+            memory_log.room_entered(memory_report, rooms.room_num)
 
             rooms.set_status("room_transition", False)
+            autosave_due = True
 
         ################# CHECKING PLAYER INPUT ##################################
         any_left = False
@@ -615,10 +822,11 @@ def gameplay():
             any_left = True
             break
 
-        if room_num in [[7, 10], [8, 4]]:
+        boss_region = room_info["boss_region"]
+        if boss_region is not None:
             if not any_left:
-                rooms.bosses_beaten[player.region] = True
-                if not rooms.pieces_given[player.region] and rooms.bosses_beaten[player.region]:
+                rooms.bosses_beaten[boss_region] = True
+                if not rooms.pieces_given[boss_region] and rooms.bosses_beaten[boss_region]:
                     items = rooms.get_room_items()
                     #no_items = True
                     for key in items.keys():
@@ -642,14 +850,10 @@ def gameplay():
 
         if not pygame.display.get_active():
             # Pauses game if screen is minimized
-            rooms.set_status("pause_menu")
-            pause_menu(rooms, screen)
+            pause_game()
 
         movement_allowed = True
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                exit_game()
-
+        for event in events:
             for equip in equipment_group:
                 if equip.is_using():
                     movement_allowed = False
@@ -660,45 +864,10 @@ def gameplay():
                     player.stop_move(letter)
 
             if event.type == pygame.KEYDOWN and movement_allowed:
-                if event.key == K_w:  # UP
-                    player.set_move("w")
-                if event.key == K_s:  # DOWN
-                    player.set_move("s")
-                if event.key == K_a:  # LEFT
-                    player.set_move("a")
-                if event.key == K_d:  # RIGHT
-                    player.set_move("d")
-                for equip in equipment_group:
-                    if event.key in equip.use_key and not equip.is_pressed:  # use equipment
-                        equip.animate()
-                        equip.start_use()
+                key_bindings.dispatch(event, "gameplay", press_handlers)
 
             if event.type == pygame.KEYUP:
-                if event.key == K_a:
-                    player.stop_move("a")
-                if event.key == K_w:
-                    player.stop_move("w")
-                if event.key == K_s:
-                    player.stop_move("s")
-                if event.key == K_d:
-                    player.stop_move("d")
-                if event.key == K_p:
-                    rooms.set_status("pause_menu")
-                    pause_menu(rooms, screen)
-                if event.key == K_e:
-                    p_use.use_active()
-                if event.key == K_q:
-                    if player.get_potions() > 0 and player.health != player.max_health:
-                        player.add_potion(-1)
-                        player.health = player.max_health
-                        player.play_heal_noise()
-
-                for equip in equipment_group:
-                    if event.key in equip.use_key:
-                        equip.end_use()
-
-                if cheat_allowed and event.key == K_BACKSPACE:
-                    testing = True
+                key_bindings.dispatch(event, "gameplay", release_handlers)
 
 
         ################# CHECKING AND HANDLING COLLISIONS ##################################
@@ -715,39 +884,45 @@ def gameplay():
         if glove.is_used():
             player_projectiles.add(FlameThrow(glove))
 
+        collision_start = time.perf_counter()
+        object_index = CollisionIndex(object_group)
+        coll_index = CollisionIndex(coll_rects, lambda coll: coll.solid or coll.damage != 0)
         for proj in player_projectiles:
             proj.move()
-            for obj in object_group:
-                if did_collide(obj.rect, proj.rect):
-                    obj.hit_by(proj)
-            for coll in coll_rects:
-                if did_collide(coll.rect, proj.rect):
-                    if coll.solid or coll.damage != 0:
-                        coll.hit_by(proj)
-            if proj.__class__.__name__ == "BombPlaced":
-                if sword.is_using() and did_collide(sword.rect, proj.rect):
-                    proj.bomb_timer = 1
+            for obj in object_index.hits(proj.rect):
+                obj.hit_by(proj)
+            for coll in coll_index.hits(proj.rect):
+                coll.hit_by(proj)
+
+        if sword.is_using():
+            for bomb in player_projectiles.get_tagged("detonatable"):
+                if did_collide(sword.rect, bomb.rect):
+                    bomb.bomb_timer = 1
 
         for proj in enemy_projectiles:
             proj.move()
             if did_collide(player.hitbox, proj.rect):
                 player.hit_by(proj)
 
+        # Reflected energy blasts damage the boss they hit
+        bosses = enemy_group.get_tagged("boss")
+        for blast in enemy_group.get_tagged("reflectable"):
+            if not blast.get_invincible():
+                for boss in bosses:
+                    if did_collide(boss.rect, blast.rect):
+                        blast.hit_by(boss)
+
         any_left = False
 
+        projectile_index = CollisionIndex(player_projectiles)
         for enemy in enemy_group:
             any_left = True
             if not enemy.get_invincible():
                 if sword.is_using():
                     if did_collide(sword.rect, enemy.rect):
                         enemy.hit_by(sword)
-                for proj in player_projectiles:
-                    if did_collide(proj.rect, enemy.rect):
-                        enemy.hit_by(proj)
-                if enemy.__class__.__name__ == "EnergyBlast":
-                    for maybe_boss in enemy_group:
-                        if maybe_boss.is_boss and did_collide(maybe_boss.rect, enemy.rect):
-                            enemy.hit_by(maybe_boss)
+                for proj in projectile_index.hits(enemy.rect):
+                    enemy.hit_by(proj)
 
             if enemy.health <= 0:
                 enemy_group.remove(enemy)
@@ -761,7 +936,9 @@ def gameplay():
 
             if enemy.get_alert() and not enemy.surprise_icon:
                 enemy.surprise_icon = True
-                ui_group.add(SurpriseIcon(enemy))
+                icon_group.add(SurpriseIcon(enemy))
+
+        profiler.add_timing("collisions", (time.perf_counter() - collision_start) * 1000)
 
         for item in item_group:
             if item.rect.colliderect(player.hitbox) or (
@@ -825,7 +1002,7 @@ def gameplay():
                     for dir in "wasd":
                         player.stop_move(dir)
                 if text is not None:
-                    text.loop()
+                    scene_manager.push(text)
                 rooms.remove_item(item)
                 item_group.remove(item)
                 item.destruct()
@@ -838,41 +1015,19 @@ def gameplay():
             if obj.rect.colliderect(sword.rect) and sword.is_using():
                 obj.hit_by(sword)
             if (p_use.is_active() and did_collide(p_use.rect, obj.rect)):
-                try:
-                    obj.use()
-                except Exception as e:
-                    to_do = "nothing"
-                    item_to_add = None
+                if isinstance(obj, Shopkeeper):
+                    # The shop is its own scene, and reports back when it closes
+                    obj.use(rooms, player, use_result)
+                else:
                     try:
-                        to_do = obj.use(rooms, player)
-                    except:
-                        pass
-                    if to_do == "gold":
-                        player.add_gold(1000)
-                    elif to_do == "remove_soldiers":
-                        # Removes 2 soldiers blocking path to queen's tower
-                        rooms.room_objects[8][7].pop(3)
-                        rooms.room_objects[8][7].pop(4)
-                    elif to_do == "heart_up":
-                        item_to_add = HeartContainer
-                    elif to_do == "potion":
-                        player.add_potion()
-                    elif to_do == "potion_up":
-                        player.max_potions += 1
-                        player.add_potion()
-                    elif to_do == "arrow":
-                        item_to_add = ArrowItem
-                    elif to_do == "bomb":
-                        item_to_add = BombItem
-                    elif to_do == "flame":
-                        item_to_add = FlameItem
-                    elif to_do == "bow":
-                        item_to_add = BowUpgrade
-                    if item_to_add is not None:
-                        player_pos = list(player.rect.center[:])
-                        for i in range(len(player_pos)):
-                            player_pos[i] /= tile_size(1)
-                        item_group.add(item_to_add(player_pos, 17))
+                        obj.use()
+                    except Exception as e:
+                        to_do = "nothing"
+                        try:
+                            to_do = obj.use(rooms, player)
+                        except:
+                            pass
+                        use_result(to_do)
 
                 if obj.is_puzzle:
                     if player.region in Player.ALL_REGIONS:
@@ -899,12 +1054,11 @@ def gameplay():
                     else:
                         obj.set_sprite(0)
 
+        if death_group.get_tagged("final_boss"):
+            ending_timer = 1.5 * FPS
         for enemy in death_group:
             # enemy.launch_away()
             enemy.update()
-            if enemy.is_boss:
-                if enemy.__class__.__name__ == "DemonQueen":
-                    ending_timer = 1.5 * FPS
             maybe_dead = enemy.death_check()
             if maybe_dead == "delete":
                 death_group.remove(enemy)
@@ -923,61 +1077,31 @@ def gameplay():
                         for num in range(3):
                             item_list.append(HeartItem)
                     item_to_add = random.choice(item_list)
-                    item_group.add(item_to_add(death_spot))
-
-        ################# CLEARING AND REDRAWING SCREEN ##################################
-        # Drawing floor of screen
-        rooms.redraw_room(screen)
+                    new_item = spawn_factory.spawn(item_to_add, death_spot)
+                    if new_item is not None:
+                        item_group.add(new_item)
 
         object_group.update()
-        object_group.draw(screen)
-
-        # Drawing player and enemies
-        player_group.draw(screen)
-        enemy_group.draw(screen)
-
-        # Drawing anything above player/enemies
-        rooms.redraw_room_top(screen)
-
-        # Drawing UI and items, then any exploding enemies.
         item_group.update()
-        item_group.draw(screen)
-
         player_projectiles.update()
-        player_projectiles.draw(screen)
-
         enemy_projectiles.update()
-        enemy_projectiles.draw(screen)
-
-        ui_group.update()
-        ui_group.draw(screen)
-        for ui in ui_group:
-            if ui.__class__.__name__ in ["UIIcon", "KeyCount"]:
-                ui.draw(screen)  # Draws ammo count for several equipment pieces
+        icon_group.update()
 
-        death_group.draw(screen)
-
-        draw_boss_health(screen, enemy_group)
-
-
-        # Scaling up game screen due to low resolution
-        if not rooms.get_status("room_transition"):
-            flip_screen()
+        profiler.set_counter("player projectiles", len(player_projectiles))
+        profiler.set_counter("enemy projectiles", len(enemy_projectiles))
+        profiler.set_counter("energy blasts", len(enemy_group.get_tagged("reflectable")))
 
         if rooms.get_status("intro") and rooms.room_num == [3, 4]:
-            intro_dialogue = DialogueText(screen, "", AllRooms.INTRO_LINES)
-            intro_dialogue.loop()
+            scene_manager.push(DialogueText(screen, "", AllRooms.INTRO_LINES))
             rooms.set_status("intro", False)
 
         if not rooms.get_status("room_transition") and rooms.get_status("village_scene") and rooms.room_num == [6, 7]:
-            village_dialogue = DialogueText(screen, "Soldier", AllRooms.VILLAGE_LINES)
-            village_dialogue.loop()
+            scene_manager.push(DialogueText(screen, "Soldier", AllRooms.VILLAGE_LINES))
             rooms.set_status("village_scene", False)
 
         if not rooms.get_status("room_transition") and rooms.get_status("queen_dialogue") and rooms.room_num == [13, 10]:
-            queen_dialogue = DialogueText(screen, "The Demon Queen Velverosa",
-                                          AllRooms.QUEEN_LINES)
-            queen_dialogue.loop()
+            scene_manager.push(DialogueText(screen, "The Demon Queen Velverosa",
+                                            AllRooms.QUEEN_LINES))
             rooms.set_status("queen_dialogue", False)
 
         if ending_timer == 0:
@@ -986,8 +1110,7 @@ def gameplay():
         if rooms.get_status("ending"):
             # This is the ending cutscene for the game. Was intended to be far more complex,
             # but it's 1AM and I had forgotten to do it until the last minute.
-            background = screen.copy()
-
+            rooms.set_status("ending", False)
             set_music(MENU_MUSIC[0], MENU_MUSIC[1])
 
             ending_dialogue = DialogueText(screen, "",
@@ -996,66 +1119,132 @@ def gameplay():
                                             "that you have faced were well worth it.",
                                             None,
                                             "For now, though, you head back to the village",
-                                            "to get some well-earned rest."])
-            ending_dialogue.loop()
+                                            "to get some well-earned rest."],
+                                           on_done=show_ending_menu)
+            scene_manager.push(ending_dialogue)
+
+        # The frame a room transition starts on isn't shown
+        if rooms.get_status("room_transition"):
+            scene_manager.hold_frame()
+
+    def show_ending_menu():
+        ending_title = GameMenu(["        Queen's Demise        "],
+                                ["Developed by Zoeyism"])
+        ending_title.set_back_image()
+        ending_title.set_highlight(get_color("purple"))
+        ending_title.set_font(assets.get_font(os.path.join("Fonts", "Kenney Pixel Square.ttf"), 16))
+        ending_title.set_pos(tile_size(3), tile_size(3))
+
+        option = GameOptions(["End Game", "end"])
+        option.set_option(["End Game", "end"], 1)
+
+        def end_game(final_action):
+            if final_action == "end":
+                exit_game()
+
+        scene_manager.push(OptionsScene(option, end_game, ending_title))
+
+    def draw(surface):
+        """ Draws the current frame of gameplay. """
+        nonlocal autosave_due
+        # Drawing floor of screen
+        rooms.redraw_room(surface)
 
-            final_action = None
-            ending_title = GameMenu(["        Queen's Demise        "],
-                                    ["Developed by Zoeyism"])
-            ending_title.set_back_image()
-            ending_title.set_highlight(get_color("purple"))
-            ending_title.set_font(pygame.font.Font(os.path.join("Fonts", "Kenney Pixel Square.ttf"), 16))
-            ending_title.set_pos(tile_size(3), tile_size(3))
+        object_group.draw(surface)
 
-            option = GameOptions(["End Game", "end"])
-            option.set_option(["End Game", "end"], 1)
+        # Drawing player and enemies
+        player_group.draw(surface)
+        enemy_group.draw(surface)
+
+        # Drawing anything above player/enemies
+        rooms.redraw_room_top(surface)
+
+        # Drawing UI and items, then any exploding enemies.
+        item_group.draw(surface)
+
+        player_projectiles.draw(surface)
+
+        enemy_projectiles.draw(surface)
 
-            while final_action is None:
-                final_action = option.update(pygame.event.get())
-                if final_action is not None and final_action == "end":
-                    exit_game()
+        icon_group.draw(surface)
+        ui_group.draw(surface)
 
-                screen.blit(background, (0, 0))
-                ending_title.draw(screen)
-                option.draw(screen)
+        death_group.draw(surface)
 
-                flip_screen()
-    Heart.reset()  # Resets the number of hearts in the UI, allows loading back in without issues
+        draw_boss_health(surface, enemy_group.get_tagged("boss"))
+
+        # Written on the autosave thread, see AutosaveService
+        if autosave_due:
+            autosave.request(rooms, player, surface)
+            autosave_due = False
+
+    scene_manager.push(GameplayScene(update, draw))
+
+
+class MainMenuScene(Scene):
+    def __init__(self):
+        # Setting main menu title
+        self.title = GameMenu(["Queen's Demise"])
+        self.title.set_font(assets.get_font(
+            os.path.join("Fonts", "Kenney Mini Square.ttf"), 16))
+        self.title.set_back_image()
+        self.title.center_at(tile_size(10), tile_size(2))
+        self.title.set_color(get_color("purple"))
+        self.title.set_highlight(get_color("purple"))
+
+        # Setting up actual menu options
+        self.menu = GameMenu(["Start Game", gameplay],
+                             ["Load Game", lambda: scene_manager.push(LoadScene())],
+                             ["Controls", lambda: scene_manager.push(ControlsScene())],
+                             ["Credits", lambda: scene_manager.push(CreditsScene())],
+                             ["Quit Game", exit_game])
+
+        self.menu.set_back_image()
+        self.menu.center_at(tile_size(9.5), tile_size(13.5))
+        self.menu_back1 = assets.get_image(os.path.join("mapFiles", "[6,7].png")).convert()
+        self.menu_back2 = assets.get_image(os.path.join("mapFiles", "[6,7]top.png"))
+
+    def enter(self):
+        rooms.set_status("start_menu")
+
+    def update(self, events):
+        self.menu.update(events)
+
+    def draw(self, surface):
+        surface.blit(self.menu_back1, (0, 0))
+        surface.blit(self.menu_back2, (0, 0))
+        self.menu.draw(surface)
+
+        self.title.draw(surface)
+
+    def is_done(self):
+        return not rooms.get_status("start_menu")
+
+
+def init_game():
+    """ Opens the window, loads every asset up front and sets up the rooms. """
+    global rooms
+    init_display()
+    music_tracks = [MENU_MUSIC[0], GAME_MUSIC[0], BOSS_MUSIC[0]]
+    music.preload(music_tracks)
+    # The music manager decodes the tracks itself
+    assets.preload(screen, flip_screen, skip=music_tracks)
+    rooms = AllRooms()
 
 
 def main():
+    profiler.startup_step("import", STARTED)
+    init_started = time.perf_counter()
+    init_game()
+    profiler.startup_step("init", init_started)
+
     # Setting music and how often to repeat key presses
     set_music(MENU_MUSIC[0], MENU_MUSIC[1])
     pygame.key.set_repeat(round(100 / FPS))
 
-    # Setting main menu title
-    title = GameMenu(["Queen's Demise"])
-    title.set_font(pygame.font.Font(
-        os.path.join("Fonts", "Kenney Mini Square.ttf"), 16))
-    title.set_back_image()
-    title.center_at(tile_size(10), tile_size(2))
-    title.set_color(get_color("purple"))
-    title.set_highlight(get_color("purple"))
-
-    # Setting up actual menu options
-    menu = GameMenu(["Start Game", gameplay], ["Controls", controls_menu],
-                    ["Credits", credits_menu], ["Quit Game", exit_game])
-
-    menu.set_back_image()
-    menu.center_at(tile_size(9.5), tile_size(13.5))
-    rooms.set_status("start_menu")
-    menu_back1 = pygame.image.load(os.path.join("mapFiles", "[6,7].png")).convert()
-    menu_back2 = pygame.image.load(os.path.join("mapFiles", "[6,7]top.png")).convert_alpha()
-
-    while rooms.get_status("start_menu"):
-        screen.blit(menu_back1, (0, 0))
-        screen.blit(menu_back2, (0, 0))
-        menu.update(pygame.event.get())
-        menu.draw(screen)
-
-        title.draw(screen)
-
-        flip_screen()
+    scene_manager.push(MainMenuScene())
+    profiler.time_first_frame()
+    scene_manager.run()
 
     pygame.quit()
 
@@ -0,0 +1,210 @@
+import array
+import os
+import sys
+import time
+import zlib
+
+import pygame
+
+# Compact storage for the layers of rooms that aren't being played. Room
+# layers are pixel art with a handful of colors, so an 8 bit copy with its
+# own palette holds the same picture in a quarter of the memory. Fully
+# transparent pixels become an RLE accelerated colorkey. Layers with
+# partly transparent pixels (the coll layers) or more than 256 colors
+# can't be stored that way and are kept as they are. The room being played
+# is expanded back to 32 bit surfaces, see RegionBundles.
+#
+# Rooms whose layers were let go of can be kept compressed in memory
+# instead (pack_layer, compress_layers and unpack_layer), which is quicker
+# to get back than decoding the room's PNGs again.
+#
+# Running this file prints every room's memory and blit time both ways,
+# and how long getting a room's layers back takes from each.
+
+# Palette color of the colorkey, changed if the layer already has it
+KEY_COLOR = (255, 0, 255)
+# Bytes in the runs of pixels get_colors dedupes
+RUN_BYTES = 64
+# zlib level for compressed layers; 1 is several times quicker than the
+# default and the layers compress almost as well
+COMPRESS_LEVEL = 1
+
+
+def layer_bytes(layer):
+    return layer.get_width() * layer.get_height() * layer.get_bytesize()
+
+
+def map_pixels(raw, lookup):
+    """ Palette index bytes for raw BGRA pixels, lookup being {pixel value: index}. """
+    return bytes(map(lookup.__getitem__, array.array("I", raw)))
+
+
+def get_colors(raw):
+    """ The distinct pixel values in raw pixels. """
+    # Rooms are built from tiles, so most runs of pixels repeat; only the
+    # distinct runs are looked at pixel by pixel
+    runs = set(raw[start:start + RUN_BYTES] for start in range(0, len(raw), RUN_BYTES))
+    return set(array.array("I", b"".join(runs)))
+
+
+def get_pixels(layer):
+    """ The layer's pixels for compact_pixels, copied so they can be compacted on another thread. """
+    # BGRA is how convert_alpha lays out pixels, so it's a straight copy
+    return pygame.image.tostring(layer, "BGRA"), layer.get_size()
+
+
+def compact_pixels(raw, size):
+    """ An 8 bit surface of BGRA pixels, or None if they can't be stored in one. """
+    if raw[3::4].translate(None, b"\x00\xff"):
+        # Partly transparent pixels
+        return None
+    palette = []
+    lookup = {}
+    transparent = []
+    for value in sorted(get_colors(raw)):
+        blue, green, red, alpha = value.to_bytes(4, sys.byteorder)
+        if alpha == 255:
+            lookup[value] = len(palette)
+            palette.append((red, green, blue))
+        else:
+            transparent.append(value)
+    key = None
+    if transparent:
+        key = len(palette)
+        key_color = KEY_COLOR
+        # Keeps the key findable by its color (see pack_layer)
+        while key_color in palette:
+            key_color = (key_color[0], key_color[1] + 1, key_color[2])
+        palette.append(key_color)
+        for value in transparent:
+            lookup[value] = key
+    if len(palette) > 256:
+        return None
+
+    compact = pygame.image.fromstring(map_pixels(raw, lookup), size, "P")
+    compact.set_palette(palette)
+    if key is not None:
+        compact.set_colorkey(key, pygame.RLEACCEL)
+    return compact
+
+
+def compact_layer(layer):
+    """ Returns an 8 bit copy of the layer, or the layer itself if it can't be stored in one. """
+    if layer.get_bitsize() == 8:
+        return layer
+    compact = compact_pixels(*get_pixels(layer))
+    return compact if compact is not None else layer
+
+
+def expand_layer(layer):
+    """ The layer as a 32 bit surface with per pixel alpha, for the room being played. """
+    if layer.get_bitsize() == 8:
+        return layer.convert_alpha()
+    return layer
+
+
+def pack_layer(layer):
+    """ A copy of the layer's pixels, (size, format, pixels, palette, colorkey), for compress_layers. """
+    if layer.get_bitsize() == 8:
+        colorkey = layer.get_colorkey()
+        if colorkey is not None:
+            colorkey = layer.map_rgb(colorkey)
+        return layer.get_size(), "P", pygame.image.tostring(layer, "P"), layer.get_palette(), colorkey
+    return layer.get_size(), "BGRA", pygame.image.tostring(layer, "BGRA"), None, None
+
+
+def compress_layers(packed):
+    """ Compresses pack_layer copies; doesn't need the main thread. """
+    return [(size, pixel_format, zlib.compress(pixels, COMPRESS_LEVEL), palette, colorkey)
+            for size, pixel_format, pixels, palette, colorkey in packed]
+
+
+def compressed_bytes(compressed):
+    return sum(len(layer[2]) for layer in compressed)
+
+
+def unpack_layer(compressed_layer):
+    """ The layer back from one of compress_layers' entries, as it was packed. """
+    size, pixel_format, pixels, palette, colorkey = compressed_layer
+    layer = pygame.image.fromstring(zlib.decompress(pixels), size, pixel_format)
+    if palette is not None:
+        layer.set_palette(palette)
+    if colorkey is not None:
+        layer.set_colorkey(colorkey, pygame.RLEACCEL)
+    return layer
+
+
+def time_blit(layer, target, repeats=100):
+    """ Average milliseconds to blit the layer onto target. """
+    started = time.perf_counter()
+    for i in range(repeats):
+        target.blit(layer, (0, 0))
+    return (time.perf_counter() - started) * 1000 / repeats
+
+
+def measure_rooms(rooms, room_list):
+    """
+    Prints every room's layer memory and blit time, as loaded and compacted,
+    and how long compacting took. rooms is an AllRooms. Returns the total
+    bytes (loaded, compacted).
+    """
+    target = pygame.Surface((rooms.background.get_width(), rooms.background.get_height())).convert()
+    totals = [0, 0]
+    print("room       loaded KB  compact KB  compact ms  blit ms  compact blit ms")
+    for room in room_list:
+        layers = rooms.load_layers(room)
+        started = time.perf_counter()
+        compacts = [compact_layer(layer) for layer in layers]
+        compact_time = (time.perf_counter() - started) * 1000
+        loaded_size = sum(layer_bytes(layer) for layer in layers)
+        compact_size = sum(layer_bytes(layer) for layer in compacts)
+        # Only the background and top layers are drawn
+        loaded_blit = time_blit(layers[0], target) + time_blit(layers[2], target)
+        compact_blit = time_blit(compacts[0], target) + time_blit(compacts[2], target)
+        print("%-10s %9d %11d %11.1f %8.3f %16.3f" % (str(list(room)), loaded_size // 1024,
+                                                      compact_size // 1024, compact_time,
+                                                      loaded_blit, compact_blit))
+        totals[0] += loaded_size
+        totals[1] += compact_size
+    print("total      %9d %11d" % (totals[0] // 1024, totals[1] // 1024))
+    return totals
+
+
+def time_call(function, repeats=10):
+    """ Average milliseconds function takes. """
+    started = time.perf_counter()
+    for i in range(repeats):
+        function()
+    return (time.perf_counter() - started) * 1000 / repeats
+
+
+def measure_reloads(rooms, room_list):
+    """
+    Prints how long getting every room's layers back for drawing takes:
+    decoding its PNGs, from compressed layers and from compact layers kept
+    as they are, with the memory each takes while the room isn't played.
+    """
+    print("room       PNG ms  compressed ms  compressed KB  kept ms  kept KB")
+    totals = [0, 0, 0, 0, 0]
+    for room in room_list:
+        paths = [path for path in rooms.layer_paths(room) if os.path.exists(path)]
+        compacts = [compact_layer(layer) for layer in rooms.load_layers(room)]
+        compressed = compress_layers([pack_layer(layer) for layer in compacts])
+        png_time = time_call(lambda: [pygame.image.load(path).convert_alpha() for path in paths])
+        compressed_time = time_call(lambda: [expand_layer(unpack_layer(layer)) for layer in compressed])
+        kept_time = time_call(lambda: [expand_layer(layer) for layer in compacts])
+        row = [png_time, compressed_time, compressed_bytes(compressed) // 1024,
+               kept_time, sum(layer_bytes(layer) for layer in compacts) // 1024]
+        print("%-10s %6.2f %14.2f %14d %8.2f %8d" % tuple([str(list(room))] + row))
+        totals = [total + value for total, value in zip(totals, row)]
+    print("total      %6.1f %14.1f %14d %8.1f %8d" % tuple(totals))
+
+
+if __name__ == "__main__":
+    from game_maps import *
+    init_display()
+    all_rooms = AllRooms()
+    room_list = sorted(all_rooms.world.graph)
+    measure_rooms(all_rooms, room_list)
+    print()
+    measure_reloads(all_rooms, room_list)
@@ -0,0 +1,362 @@
+import pygame
+import atexit
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+
+from game_maps import *
+
+# Save files are a small header followed by the zlib compressed pickle of a
+# snapshot. The snapshot only holds plain data (numbers, strings, lists,
+# dicts), class references are stored by name and looked up on load.
+SAVE_MAGIC = b"QDSV"
+SAVE_VERSION = 1
+# magic, version, crc32 of the compressed data
+HEADER = struct.Struct(">4sHI")
+SAVE_DIR = "saves"
+AUTOSAVE_PATH = os.path.join(SAVE_DIR, "autosave.sav")
+
+# The slot index keeps what the load menu shows for every save file, so the
+# menu never has to open the saves themselves.
+INDEX_MAGIC = b"QDIX"
+INDEX_PATH = os.path.join(SAVE_DIR, "index.dat")
+THUMBNAIL_SIZE = (80, 80)
+# Names shown in the load menu, by save file name
+SLOT_NAMES = {"autosave.sav": "Autosave", "slot0.sav": "Quick Save"}
+
+# rooms.status entries that are story progress, not menu/loop states
+STORY_STATUS = ["intro", "village_scene", "queen_dialogue"]
+
+
+def save_path(slot=0):
+    return os.path.join(SAVE_DIR, "slot" + str(slot) + ".sav")
+
+
+def encode_room_entries(room_dict):
+    """
+    Copies room_items/room_objects, swapping each entry's class for its
+    name: {x: {y: {key: [class, tile_x, tile_y]}}}
+    """
+    encoded = {}
+    for room_x, column in room_dict.items():
+        encoded[room_x] = {}
+        for room_y, entries in column.items():
+            encoded[room_x][room_y] = {
+                key: [entry[0].__name__] + list(entry[1:])
+                for key, entry in entries.items()}
+    return encoded
+
+
+def decode_room_entries(room_dict, classes):
+    decoded = {}
+    for room_x, column in room_dict.items():
+        decoded[room_x] = {}
+        for room_y, entries in column.items():
+            decoded[room_x][room_y] = {
+                key: [classes[entry[0]]] + list(entry[1:])
+                for key, entry in entries.items()}
+    return decoded
+
+
+def capture_snapshot(rooms, player):
+    """ Copies everything needed to restore the game into plain data. """
+    equipment = {}
+    for action, equip in player.equipment.items():
+        equipment[action] = {"equipped": equip.is_equipped,
+                             "ammo": equip.ammo,
+                             "max_ammo": equip.max_ammo}
+
+    player_data = {"health": player.health,
+                   "max_health": player.max_health,
+                   "potions": player.potions,
+                   "max_potions": player.max_potions,
+                   "gold": player.gold,
+                   "region": player.region,
+                   "position": list(player.true_center),
+                   "direction": player.direction,
+                   "region_keys": {region: [keys.keys, keys.boss_key]
+                                   for region, keys in player.region_keys.items()},
+                   "equipment": equipment}
+
+    return {"room_num": list(rooms.room_num),
+            "status": {name: rooms.get_status(name) for name in STORY_STATUS},
+            "room_items": encode_room_entries(rooms.room_items),
+            "room_objects": encode_room_entries(rooms.room_objects),
+            "quantity": {shop: dict(stock) for shop, stock in rooms.QUANTITY.items()},
+            "dialogue_status": {name: dict(flags)
+                                for name, flags in rooms.dialogue_status.items()},
+            "key_pieces": rooms.key_pieces,
+            "pieces_given": dict(rooms.pieces_given),
+            "bosses_beaten": dict(rooms.bosses_beaten),
+            "play_time": rooms.play_time,
+            "player": player_data}
+
+
+def apply_snapshot(snapshot, rooms, player):
+    """
+    Restores a snapshot into rooms and player. The caller still needs
+    to start a room transition so the saved room gets built.
+    """
+    classes = world_classes()
+    rooms.room_num = list(snapshot["room_num"])
+    rooms.set_room_num()
+    for name, value in snapshot["status"].items():
+        rooms.set_status(name, value)
+    rooms.room_items = decode_room_entries(snapshot["room_items"], classes)
+    rooms.room_objects = decode_room_entries(snapshot["room_objects"], classes)
+    rooms.QUANTITY = {shop: dict(stock) for shop, stock in snapshot["quantity"].items()}
+    rooms.dialogue_status = {name: dict(flags)
+                             for name, flags in snapshot["dialogue_status"].items()}
+    rooms.key_pieces = snapshot["key_pieces"]
+    rooms.pieces_given = dict(snapshot["pieces_given"])
+    rooms.bosses_beaten = dict(snapshot["bosses_beaten"])
+    rooms.play_time = snapshot.get("play_time", 0)
+
+    player_data = snapshot["player"]
+    player.max_health = player_data["max_health"]
+    player.health = player_data["health"]
+    player.max_potions = player_data["max_potions"]
+    player.potions = player_data["potions"]
+    player.gold = player_data["gold"]
+    player.set_region(player_data["region"])
+    player.true_center = list(player_data["position"])
+    player.rect.center = player.true_center[:]
+    player.last_position = player.true_center[:]
+    player.direction = player_data["direction"]
+    for region, (keys, boss_keys) in player_data["region_keys"].items():
+        player.region_keys[region].keys = keys
+        player.region_keys[region].boss_key = boss_keys
+    for action, equip_data in player_data["equipment"].items():
+        if action in player.equipment:
+            equip = player.equipment[action]
+            equip.is_equipped = equip_data["equipped"]
+            equip.max_ammo = equip_data["max_ammo"]
+            equip.ammo = equip_data["ammo"]
+
+
+def pack_snapshot(pickled):
+    """ Compresses a pickled snapshot and puts the header in front of it. """
+    data = zlib.compress(pickled, 1)
+    return HEADER.pack(SAVE_MAGIC, SAVE_VERSION, zlib.crc32(data)) + data
+
+
+def encode_snapshot(snapshot):
+    return pack_snapshot(pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL))
+
+
+def decode_snapshot(data):
+    """ Returns the snapshot stored in data, or None if it can't be read. """
+    if len(data) < HEADER.size:
+        return None
+    magic, version, checksum = HEADER.unpack_from(data)
+    body = data[HEADER.size:]
+    if magic != SAVE_MAGIC or version > SAVE_VERSION or zlib.crc32(body) != checksum:
+        return None
+    try:
+        return pickle.loads(zlib.decompress(body))
+    except Exception as e:
+        print("Error: Unreadable save data,", e)
+        return None
+
+
+def write_save_file(path, data):
+    """ Writes to a temporary file first, so a crash never leaves half a save. """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as save_file:
+        save_file.write(data)
+    os.replace(temp_path, path)
+
+
+def capture_slot_info(rooms, player, surface=None):
+    """
+    Returns the load menu's summary of a save. surface (usually the screen)
+    is shrunk into the thumbnail, stored as raw RGB bytes.
+    """
+    info = {"region": player.region,
+            "gold": player.gold,
+            "hearts": player.health / 4,
+            "max_hearts": player.max_health // 4,
+            "play_time": rooms.play_time,
+            "room": list(rooms.room_num),
+            "saved_at": time.time(),
+            "thumbnail": None}
+    if surface is not None:
+        thumbnail = pygame.transform.smoothscale(surface.convert(), THUMBNAIL_SIZE)
+        info["thumbnail"] = pygame.image.tostring(thumbnail, "RGB")
+    return info
+
+
+def format_play_time(seconds):
+    minutes = int(seconds) // 60
+    return str(minutes // 60) + ":" + str(minutes % 60).zfill(2)
+
+
+class SaveSlotIndex(object):
+    """
+    Small file next to the saves holding capture_slot_info() for each save
+    file. It's read once, then changed one slot at a time as saves are
+    written (from the main thread or the autosave thread).
+    """
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.slots = None
+
+    def read(self):
+        slots = {}
+        try:
+            with open(self.path, "rb") as index_file:
+                data = index_file.read()
+            magic, version, checksum = HEADER.unpack_from(data)
+            body = data[HEADER.size:]
+            if magic == INDEX_MAGIC and version <= SAVE_VERSION and zlib.crc32(body) == checksum:
+                slots = pickle.loads(body)
+        except Exception:
+            pass
+        return slots
+
+    def get_slots(self):
+        """ Returns [save file path, info] pairs, newest save first. """
+        with self.lock:
+            if self.slots is None:
+                self.slots = self.read()
+            slots = list(self.slots.items())
+        slots.sort(key=lambda slot: slot[1]["saved_at"], reverse=True)
+        return [[os.path.join(SAVE_DIR, name), info] for name, info in slots
+                if os.path.exists(os.path.join(SAVE_DIR, name))]
+
+    def update(self, save_file, info):
+        with self.lock:
+            if self.slots is None:
+                self.slots = self.read()
+            self.slots[os.path.basename(save_file)] = info
+            body = pickle.dumps(self.slots, pickle.HIGHEST_PROTOCOL)
+            write_save_file(self.path, HEADER.pack(INDEX_MAGIC, SAVE_VERSION,
+                                                   zlib.crc32(body)) + body)
+
+
+slot_index = SaveSlotIndex()
+
+
+def slot_name(save_file):
+    name = os.path.basename(save_file)
+    return SLOT_NAMES.get(name, name)
+
+
+def get_thumbnail(info):
+    if info["thumbnail"] is None:
+        return None
+    return pygame.image.fromstring(info["thumbnail"], THUMBNAIL_SIZE, "RGB")
+
+
+def save_game(rooms, player, path=None, surface=None):
+    if path is None:
+        path = save_path()
+    start = time.perf_counter()
+    write_save_file(path, encode_snapshot(capture_snapshot(rooms, player)))
+    slot_index.update(path, capture_slot_info(rooms, player, surface))
+    profiler.add_timing("save", (time.perf_counter() - start) * 1000)
+    return path
+
+
+def load_game(path=None):
+    """ Returns the saved snapshot, or None if there isn't a readable save. """
+    if path is None:
+        path = save_path()
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as save_file:
+            data = save_file.read()
+    except OSError:
+        return None
+    snapshot = decode_snapshot(data)
+    if snapshot is None:
+        print("Error: Save file is damaged or from a newer version,", path)
+    profiler.add_timing("load", (time.perf_counter() - start) * 1000)
+    return snapshot
+
+
+class AutosaveService(object):
+    """
+    Writes autosaves on a background thread so gameplay never waits on the
+    disk. request() pickles the snapshot on the main thread, so the writer
+    only ever sees bytes that can't change under it. Only the newest
+    request is kept: if the disk is slower than the player, older pending
+    snapshots are dropped (counted in dropped).
+    """
+    def __init__(self, path=AUTOSAVE_PATH):
+        self.path = path
+        self.condition = threading.Condition()
+        # [pickled snapshot, slot info, time requested] waiting to be written
+        self.pending = None
+        self.writing = False
+        self.running = True
+        self.thread = None
+        self.dropped = 0
+        self.written = 0
+        # Milliseconds from request() until the file was on disk
+        self.last_latency = 0
+        atexit.register(self.close)
+
+    def request(self, rooms, player, surface=None):
+        pickled = pickle.dumps(capture_snapshot(rooms, player), pickle.HIGHEST_PROTOCOL)
+        info = capture_slot_info(rooms, player, surface)
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+                self.thread.start()
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = [pickled, info, time.perf_counter()]
+            self.condition.notify()
+        profiler.set_counter("autosaves dropped", self.dropped)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and self.running:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                pickled, info, requested = self.pending
+                self.pending = None
+                self.writing = True
+            try:
+                write_save_file(self.path, pack_snapshot(pickled))
+                slot_index.update(self.path, info)
+                self.written += 1
+                self.last_latency = (time.perf_counter() - requested) * 1000
+                profiler.add_timing("autosave", self.last_latency)
+            except OSError as e:
+                print("Error: Autosave failed,", e)
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """ Waits until every requested autosave has been written. """
+        with self.condition:
+            self.condition.wait_for(lambda: self.pending is None and not self.writing
+                                    or self.thread is None or not self.thread.is_alive(),
+                                    timeout)
+
+    def close(self):
+        """ Writes anything still pending, then stops the writer thread. """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+
+autosave = AutosaveService()
+
+
+if __name__ == "__main__":
+    print("Yeah, don't run this directly. Run the game.")
@@ -5,10 +5,10 @@ from pygame import mixer
 import os
 import random
 import math
+import time
 from extra_functions import *
 
-# Initializing pygame and setting several constants + screens #
-pygame.init()
+# Setting several constants + screens; pygame is started by init_display() #
 
 # Technically, the game uses a 320x320 resolution; however, it is scaled up
 #   to 2x the resolution, at 640x640, for ease of visibility and use on
@@ -27,30 +27,180 @@ os.environ['SDL_VIDEO_CENTERED'] = "1"
 
 # Everything is drawn onto the screen, and then upscaled 2x onto display.
 screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-display = pygame.display.set_mode((SCREEN_WIDTH * 2, SCREEN_HEIGHT * 2))
-
-# Icon, caption, mouse visibility settings
-pygame.display.set_icon(load_image("sword_icon.png"))
-pygame.display.set_caption("Queen's Demise")
-pygame.mouse.set_visible(False)
+display = None
 
 # Frames per second and game's clock
 FPS = 60
 clock = pygame.time.Clock()
 
+# Anything leaving this rect has left the room
+ROOM_RECT = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+
+def init_display():
+    """
+    Starts pygame and opens the game window. Importing the game's modules
+    doesn't open a window or load anything; this has to be called first.
+    """
+    global display
+    pygame.init()
+    display = pygame.display.set_mode((SCREEN_WIDTH * 2, SCREEN_HEIGHT * 2))
+
+    # Icon, caption, mouse visibility settings
+    pygame.display.set_icon(load_image("sword_icon.png"))
+    pygame.display.set_caption("Queen's Demise")
+    pygame.mouse.set_visible(False)
+
 
 def flip_screen(surface=screen):
     """
     Automatically scales the surface (typically the global screen)
     to the display, flips it, and ticks the clock.
+    Also reports the frame to the profiler, and draws its overlay if shown.
     """
+    voices.next_frame()
+    music.update()
+    profiler.frame_done()
+    if profiler.visible:
+        profiler.draw(surface)
     pygame.transform.scale2x(surface, display)
     pygame.display.flip()
     clock.tick(FPS)
+    profiler.frame_start()
+
+
+class Scene(object):
+    """
+    One part of the game run by the SceneManager: gameplay, a menu, a
+    dialogue box, etc. Only the top scene gets input and is updated.
+    Overlay scenes are drawn over the frame of the scenes under them.
+    """
+    overlay = False
+
+    def enter(self):
+        """ Called when the scene is pushed onto the stack. """
+        pass
+
+    def exit(self):
+        """ Called when the scene is taken off the stack. """
+        pass
+
+    def update(self, events):
+        pass
+
+    def draw(self, surface):
+        pass
+
+    def is_done(self):
+        """ Done scenes are taken off the stack at the end of the frame. """
+        return False
+
+
+class SceneManager(object):
+    """
+    Stack of scenes, and the game's only main loop: each frame gets one
+    event pump, one update of the top scene, one draw and one flip_screen.
+    The frame under an overlay is drawn once when the overlay opens, and
+    reused until the stack changes.
+    """
+    def __init__(self):
+        self.scenes = []
+        self.under_frame = None
+        self.holding = False
+
+    def push(self, scene):
+        self.scenes.append(scene)
+        self.under_frame = None
+        scene.enter()
+
+    def hold_frame(self):
+        """ Skips showing this frame, ex: the frame a room transition starts on. """
+        self.holding = True
+
+    def remove_done(self):
+        for scene in [s for s in self.scenes if s.is_done()]:
+            self.scenes.remove(scene)
+            self.under_frame = None
+            scene.exit()
+
+    def draw(self, surface):
+        top = self.scenes[-1]
+        if top.overlay:
+            if self.under_frame is None:
+                # Drawn from the last scene that covers the whole screen
+                start = 0
+                for i, scene in enumerate(self.scenes[:-1]):
+                    if not scene.overlay:
+                        start = i
+                for scene in self.scenes[start:-1]:
+                    scene.draw(surface)
+                self.under_frame = surface.copy()
+            else:
+                surface.blit(self.under_frame, (0, 0))
+        top.draw(surface)
+
+    def run(self):
+        """ Runs until there are no scenes left. """
+        while self.scenes:
+            events = pygame.event.get()
+            for event in events:
+                if event.type == pygame.QUIT:
+                    exit_game()
+
+            scene = self.scenes[-1]
+            scene_start = time.perf_counter()
+            scene.update(events)
+            self.remove_done()
+            if self.scenes and not self.holding:
+                self.draw(screen)
+                profiler.add_timing(type(scene).__name__,
+                                    (time.perf_counter() - scene_start) * 1000)
+                profiler.set_counter("scenes", len(self.scenes))
+                flip_screen()
+            self.holding = False
+
+
+scene_manager = SceneManager()
+
+
+class TaggedGroup(pygame.sprite.LayeredUpdates):
+    """
+    LayeredUpdates group that also sorts its sprites by the tags in each
+    sprite's TAGS tuple, so loops can go through only the sprites with a
+    certain capability (ex: get_tagged("boss")) instead of checking every
+    sprite's class. The tag lists are kept up to date on add/remove/kill.
+    """
+    def __init__(self, *sprites, **kwargs):
+        self.tagged = {}
+        super().__init__(*sprites, **kwargs)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        for tag in getattr(sprite, "TAGS", ()):
+            # dictionary used as an ordered set for quick removal
+            self.tagged.setdefault(tag, {})[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        for tag in getattr(sprite, "TAGS", ()):
+            self.tagged[tag].pop(sprite, None)
+
+    def get_tagged(self, tag):
+        """ Returns a list of the group's sprites that have the tag. """
+        return list(self.tagged.get(tag, ()))
 
 
 class AnimSprite(pygame.sprite.Sprite):
     """ Creates animated characters. Used for almost everything. """
+    # Tags used by TaggedGroup; derived classes add their own.
+    TAGS = ()
+    # False for classes that can't be spawned by copying a prototype (see
+    # SpawnFactory), ex: ones that pick random values or count instances.
+    CLONEABLE = True
+    # Channels the sprite's sounds play on, and the priority of its hit,
+    # death and explosion sounds (see VoiceManager)
+    SOUND_CATEGORY = "world"
+    SOUND_PRIORITY = "damage"
 
     def __init__(self, position, spriteList, animationSpeed, maxSpeed,
                  animating=True, solid=False, repeat_animations = True):
@@ -81,13 +231,14 @@ class AnimSprite(pygame.sprite.Sprite):
         self.inv_time_start = round(0.3 * FPS)
 
         # Muted sound file to use in case a sound is not available
-        self.fake_sound = load_sound("scratch_004.ogg", 0)
+        self.fake_sound = load_sound("scratch_004.ogg", 0, self.SOUND_CATEGORY, "background")
 
         # Arbitrarily large health pool to keep random things from dying.
         self.health = 500
 
         # Load noise that plays when hit
-        self.damage_sound = load_sound("sfx_damage_hit10.ogg", 0.15)
+        self.damage_sound = load_sound("sfx_damage_hit10.ogg", 0.15,
+                                       self.SOUND_CATEGORY, self.SOUND_PRIORITY)
 
         # boolean that determines whether to animate the image or not.
         self.is_animating = animating
@@ -125,6 +276,25 @@ class AnimSprite(pygame.sprite.Sprite):
         for image in self.anim["d"]:
             self.anim["a"] += [pygame.transform.flip(image, True, False)]
 
+    def clone(self):
+        """
+        Returns a copy that shares this sprite's images, frame lists and
+        sounds. Lists, dicts, rects and ManagedSounds (which remember their
+        channel) are copied so the two can change independently. The copy
+        isn't in any groups; call on_spawn to place it.
+        """
+        copy = self.__class__.__new__(self.__class__)
+        for name, value in self.__dict__.items():
+            if isinstance(value, (list, dict, set, pygame.Rect, ManagedSound)):
+                value = value.copy()
+            copy.__dict__[name] = value
+        pygame.sprite.Sprite.__init__(copy)  # fresh group membership
+        return copy
+
+    def on_spawn(self, position):
+        """ Places a clone where the constructor would have put it. """
+        self.rect.center = self.true_center = list(position)
+
     def use(self):
         """ Used later as player's use ability. """
         pass
@@ -388,7 +558,7 @@ class GameMenu(object):
 
         self.x = 0
         self.y = 0
-        self.font = pygame.font.Font(
+        self.font = assets.get_font(
             os.path.join("Fonts", "Kenney Mini Square.ttf"), 10)
         self.width = 1
 
@@ -398,8 +568,8 @@ class GameMenu(object):
         self.highlight = get_color("green")
         self.color = get_color("black")
 
-        self.move_sound = load_sound("sfx_menu_move2.wav", 0.3)
-        self.select_sound = load_sound("sfx_menu_select2.wav", 0.3)
+        self.move_sound = load_sound("sfx_menu_move2.wav", 0.3, "ui")
+        self.select_sound = load_sound("sfx_menu_select2.wav", 0.3, "ui")
 
         i = 1
 
@@ -440,16 +610,17 @@ class GameMenu(object):
             if e.type == pygame.QUIT:
                 exit_game()
             if e.type == pygame.KEYUP:
-                if e.key == K_s or e.key == K_DOWN:
-                    self.opt_num += 1
-                    self.move_sound.play()
-                if e.key == K_w or e.key == K_UP:
-                    self.opt_num -= 1
-                    self.move_sound.play()
-                if e.key == K_SPACE or e.key == K_RETURN or e.key == K_e:
-                    if self.options[self.opt_num] is not None:
-                        self.select_sound.play()
-                        self.options[self.opt_num]()  # Run selected option
+                for action in key_bindings.get_actions("menu", e.key):
+                    if action == "down":
+                        self.opt_num += 1
+                        self.move_sound.play()
+                    elif action == "up":
+                        self.opt_num -= 1
+                        self.move_sound.play()
+                    elif action == "select":
+                        if self.options[self.opt_num] is not None:
+                            self.select_sound.play()
+                            self.options[self.opt_num]()  # Run selected option
             if self.opt_num > len(self.options):
                 self.opt_num = 1
             if self.opt_num < 1:
@@ -518,7 +689,7 @@ class GameOptions(GameMenu):
 
         self.set_pos(tile_size(14.05), tile_size(11.25))
 
-        self.font = pygame.font.SysFont("timesnewroman", 10)
+        self.font = assets.get_sys_font("timesnewroman", 10)
 
         self.width = tile_size(2.5)
 
@@ -527,16 +698,17 @@ class GameOptions(GameMenu):
             if e.type == pygame.QUIT:
                 exit_game()
             if e.type == pygame.KEYUP:
-                if e.key == K_s or e.key == K_DOWN:
-                    self.opt_num += 1
-                    self.move_sound.play()
-                if e.key == K_w or e.key == K_UP:
-                    self.opt_num -= 1
-                    self.move_sound.play()
-                if e.key == K_SPACE or e.key == K_RETURN or e.key == K_e:
-                    if self.options[self.opt_num] is not None:
-                        self.select_sound.play()
-                        return self.options[self.opt_num]  # return selected option info
+                for action in key_bindings.get_actions("menu", e.key):
+                    if action == "down":
+                        self.opt_num += 1
+                        self.move_sound.play()
+                    elif action == "up":
+                        self.opt_num -= 1
+                        self.move_sound.play()
+                    elif action == "select":
+                        if self.options[self.opt_num] is not None:
+                            self.select_sound.play()
+                            return self.options[self.opt_num]  # return selected option info
             if self.opt_num > len(self.options):
                 self.opt_num = 1
             if self.opt_num < 1:
@@ -569,17 +741,26 @@ class GameOptions(GameMenu):
         self.text[num] = str(option[0])
 
 
-class DialogueText(object):
+class DialogueText(Scene):
     """
-    Creates a separate loop for updates, events, drawing, etc.
-    Takes the drawn screen, draws a text bubble near the bottom, and then
-    draws the overall text one letter per frame.
+    Dialogue scene, drawn over the frame it was opened on.
+    Draws a text bubble near the bottom, and then draws the overall text
+    one letter per frame. Also used as the text box of the shop scene.
+    Each line of text is kept as its own surface, rendered again only when
+    a letter is added to it, so drawing a dialogue frame is just a few blits.
     """
-    def __init__(self, surface, name="", lines=[]):
+    overlay = True
+    # Shared by every dialogue, loaded by the first one
+    textbox_image = None
+    dialogue_font = None
+
+    def __init__(self, surface, name="", lines=[], on_done=None):
         """ Takes the base screen, the character's name, and the lines to display.
         The lines need to be in a list format, each element being one line to draw.
         Use None as an element in the list to separate each section of text.
-        The max length of each line is about 52 chars, give or take."""
+        The max length of each line is about 52 chars, give or take.
+        on_done is called once the dialogue is closed, if given."""
+        self.on_done = on_done
         self.name = name
         self.lines = lines
 
@@ -587,13 +768,15 @@ class DialogueText(object):
         self.current_line = 0
         self.current_letter = 0
         self.line_number = 0
-        # self.screen is drawing surface; current_text is the text to render
+        # self.screen is the surface the dialogue was opened on
         self.screen = surface
-        self.current_text = ["", "", ""]
 
-        # originally used kenney font for dialogue, but was too illegible;
-        # times new roman works well for size and readability
-        self.font = pygame.font.SysFont("timesnewroman", 12)
+        if DialogueText.textbox_image is None:
+            DialogueText.textbox_image = load_image("textbox.png")
+            # originally used kenney font for dialogue, but was too illegible;
+            # times new roman works well for size and readability
+            DialogueText.dialogue_font = assets.get_sys_font("timesnewroman", 12)
+        self.font = DialogueText.dialogue_font
         # Text colors; color used for main text, highlight for character name
         self.color = get_color("black")
         self.highlight = get_color("green")
@@ -603,20 +786,35 @@ class DialogueText(object):
         self.waiting = False
         self.continue_loop = True
 
-        # Text box image loading and positioning
-        self.textbox = load_image("textbox.png")
+        # Text box image positioning
+        self.textbox = DialogueText.textbox_image
         # yes, textbox_box isn't descriptive; no, it's not getting changed. :P
         self.textbox_box = self.textbox.get_rect()
         self.textbox_box.centerx = SCREEN_WIDTH / 2
         self.textbox_box.bottom = SCREEN_HEIGHT - 4
 
+        # current_text is the text shown, line_renders the drawn lines of it
+        self.name_render = self.font.render(self.name, 1, self.highlight)
+        self.clear_lines()
+
+    def clear_lines(self):
+        self.current_text = ["", "", ""]
+        self.line_renders = [None, None, None]
+
+    def set_line(self, line_number, text):
+        """ Changes one line of current_text, and renders only that line again. """
+        self.current_text[line_number] = text
+        # Whole line rendered so kerning matches, letters rendered alone don't line up
+        self.line_renders[line_number] = self.font.render(text, 1, self.color)
+
     def add_to_line(self):
         """ Adds one letter to the current_text list automatically. """
         if self.cont_message:  # If the message should continue, adds a letter.
             lines = self.lines
             line = lines[self.current_line]
             if line is not None:  # None used as way to separate each section
-                self.current_text[self.line_number] += line[self.current_letter]
+                self.set_line(self.line_number,
+                              self.current_text[self.line_number] + line[self.current_letter])
                 self.current_letter += 1
                 if self.current_letter > len(line)-1:
                     self.current_letter = 0
@@ -632,40 +830,37 @@ class DialogueText(object):
         """ Draws the textbox to the surface given, along with the name,
          and the text currently available. """
         surface.blit(self.textbox, self.textbox_box)
-        surface.blit(self.font.render(self.name, 1, self.highlight),
-                     (self.textbox_box.left+4, self.textbox_box.top+2))
-        for num, line in enumerate(self.current_text):
-            # for each line in current_text, render it in the adjusted position.
-            render = self.font.render(line, 1, self.color)
-            ren_rect = render.get_rect()
-            ren_rect.topleft = [self.textbox_box.left+8,
-                                self.textbox_box.top+20+(num*12)]
-            surface.blit(render, ren_rect)
+        surface.blit(self.name_render, (self.textbox_box.left+4, self.textbox_box.top+2))
+        for num, render in enumerate(self.line_renders):
+            if render is not None:
+                surface.blit(render, (self.textbox_box.left+8, self.textbox_box.top+20+(num*12)))
 
     def update(self, all_events):
         """ Updates the text, and then checks input for commands.
-        e or enter key: advance to next section if current one is done.
-            if text is done, the key ends the dialogue loop.
-        space key: display all text instead of waiting for it to add. """
+        next key (e or enter by default): advance to next section if current
+            one is done. If text is done, the key ends the dialogue loop.
+        skip key (space by default): display all text instead of waiting
+            for it to add. """
         self.add_to_line()
         for event in all_events:
             if event.type == pygame.QUIT:
                 exit_game()
             if event.type == KEYUP:
-                if event.key == K_RETURN or event.key == K_e:
+                actions = key_bindings.get_actions("dialogue", event.key)
+                if "next" in actions:
                     if self.waiting:
                         self.current_line += 1
                         self.current_letter = 0
                         self.line_number = 0
-                        self.current_text = ["", "", ""]
+                        self.clear_lines()
                         self.waiting = False
                     if not self.cont_message:
                         self.continue_loop = not self.continue_loop
 
-                if event.key == K_SPACE:
+                if "skip" in actions:
                     if not self.waiting and self.cont_message:
                         while self.lines[self.current_line] is not None:
-                            self.current_text[self.line_number] = self.lines[self.current_line]
+                            self.set_line(self.line_number, self.lines[self.current_line])
                             self.current_line += 1
                             self.line_number += 1
                             if self.current_line >= len(self.lines):
@@ -673,32 +868,51 @@ class DialogueText(object):
                                 break
                         self.waiting = True
 
-    def loop(self):
-        """ Main loop of Dialogue class. Runs updates and event checking,
-        draws text, flips screen, etcetera. """
-        # two copies of screen used to avoid blitting screen itself, and
-        # to properly draw over prior frame.
-        background = self.screen.copy()
-        dialogue_screen = background.copy()
-
-        while self.continue_loop:
-            dialogue_screen.blit(background, (0, 0))
-            self.update(pygame.event.get())
-            self.draw(dialogue_screen)
-
-            flip_screen(dialogue_screen)
-        if not self.continue_loop:
-            pass
+    def is_done(self):
+        return not self.continue_loop
 
+    def exit(self):
+        if self.on_done is not None:
+            self.on_done()
 
-class DeathCutscene(object):
-    def __init__(self, player, ui_group):
+
+class OptionsScene(Scene):
+    """
+    Shows a GameOptions menu (and a title menu, if given) over the current
+    frame until an option is picked, then passes the choice to on_done.
+    """
+    overlay = True
+
+    def __init__(self, options, on_done, title=None):
+        self.options = options
+        self.on_done = on_done
+        self.title = title
+        self.choice = None
+
+    def update(self, events):
+        self.choice = self.options.update(events)
+
+    def draw(self, surface):
+        if self.title is not None:
+            self.title.draw(surface)
+        self.options.draw(surface)
+
+    def is_done(self):
+        return self.choice is not None
+
+    def exit(self):
+        self.on_done(self.choice)
+
+
+class DeathCutscene(Scene):
+    def __init__(self, player, ui_group, rooms):
         self.player = player
-        self.heal_sound1 = load_sound("Menu2A.wav")
-        self.heal_sound2 = load_sound("Item2A.wav")
-        self.death_sound1 = load_sound("sfx_sounds_impact7.wav")
-        self.death_sound2 = load_sound("sfx_sounds_impact3.wav")
+        self.heal_sound1 = load_sound("Menu2A.wav", category="player")
+        self.heal_sound2 = load_sound("Item2A.wav", category="player")
+        self.death_sound1 = load_sound("sfx_sounds_impact7.wav", category="player")
+        self.death_sound2 = load_sound("sfx_sounds_impact3.wav", category="player")
         self.ui_group = ui_group
+        self.rooms = rooms
 
     def play_heal(self):
         self.heal_sound2.play()
@@ -708,111 +922,110 @@ class DeathCutscene(object):
         self.death_sound1.play()
         self.death_sound2.play()
 
-    def loop(self, rooms):
-        background_color = [255, 250, 250]
-        cutscene_timer = 300
-        potion_checked = False
-        potion_succeed = False
-        music_set = False
-        mixer.music.pause()
-
-        title = GameMenu(["You are dead"],
-                         [""],
-                         ["Continue?"])
-        title.set_highlight(get_color("red"))
-        title.set_back_image()
-        title.set_pos(tile_size(8), tile_size(8))
+    def enter(self):
+        self.background_color = [255, 250, 250]
+        self.cutscene_timer = 300
+        self.potion_checked = False
+        self.potion_succeed = False
+        self.music_set = False
+        music.pause()
+
+        self.title = GameMenu(["You are dead"],
+                              [""],
+                              ["Continue?"])
+        self.title.set_highlight(get_color("red"))
+        self.title.set_back_image()
+        self.title.set_pos(tile_size(8), tile_size(8))
 
         decision_options = [["Continue", "continue"], ["Exit (END GAME)", "end_game"]]
 
-        death_decision = GameOptions(decision_options)
+        self.death_decision = GameOptions(decision_options)
         for i in range(len(decision_options)):
-            death_decision.set_option(decision_options[i], i+1)
-        choice = None
+            self.death_decision.set_option(decision_options[i], i+1)
 
-        while rooms.get_status("cutscene"):
-            if cutscene_timer > -20:
-                cutscene_timer -= 1
-            screen.fill(background_color)
-
-            events = pygame.event.get()
+    def update(self, events):
+        rooms = self.rooms
+        background_color = self.background_color
+        choice = None
+        if self.cutscene_timer > -20:
+            self.cutscene_timer -= 1
+
+        if self.cutscene_timer <= 250 and background_color[1] > 0:
+            background_color[1] -= 10
+            background_color[2] -= 10
+            if background_color[1] <= 0:
+                background_color[1], background_color[2] = 0, 0
+
+        if self.cutscene_timer <= 200 and not self.potion_checked:
+            self.potion_checked = True
+            if self.player.get_potions() > 0:
+                self.potion_succeed = True
+                self.player.potions -= 1
+                self.player.health = self.player.max_health
+                self.play_heal()
+        if self.cutscene_timer == 100 and not self.potion_succeed:
+            self.player.image = load_image("player_ded.png")
+            self.player.rect.bottom += 12
+            self.play_death()
+        if self.cutscene_timer <= 0 and self.potion_succeed:
+            rooms.set_status("cutscene", False)
+
+            music.unpause()
+        elif self.cutscene_timer <= 0 and not self.potion_succeed and not self.music_set:
+            self.music_set = True
+            set_music(MENU_MUSIC[0], MENU_MUSIC[1])
+
+        if self.cutscene_timer < -15:
+            choice = self.death_decision.update(events)
+
+        if choice is not None:
+            if choice == "continue":
+                if rooms.get_status("village_scene"):
+                    self.player.true_center = tile_pos(4, 17)
+                    rooms.room_num = [3, 4]
+                else:
+                    self.player.true_center = tile_pos(10, 15.5)
+                    rooms.room_num = [6, 7]
+                self.player.health = 12
+                self.player.set_invincible(False)
 
-            self.ui_group.update()
-
-            if cutscene_timer <= 250 and background_color[1] > 0:
-                background_color[1] -= 10
-                background_color[2] -= 10
-                if background_color[1] <= 0:
-                    background_color[1], background_color[2] = 0, 0
-
-            if cutscene_timer <= 200 and not potion_checked:
-                potion_checked = True
-                if self.player.get_potions() > 0:
-                    potion_succeed = True
-                    self.player.potions -= 1
-                    self.player.health = self.player.max_health
-                    self.play_heal()
-            if cutscene_timer == 100 and not potion_succeed:
-                self.player.image = load_image("player_ded.png")
-                self.player.rect.bottom += 12
-                self.play_death()
-            if cutscene_timer <= 0 and potion_succeed:
+                rooms.set_room_num()
                 rooms.set_status("cutscene", False)
+                rooms.set_status("room_transition", True)
 
-                mixer.music.unpause()
-            elif cutscene_timer <= 0 and not potion_succeed and not music_set:
-                music_set = True
-                set_music(MENU_MUSIC[0], MENU_MUSIC[1])
+                set_music(GAME_MUSIC[0], GAME_MUSIC[1])
 
-            if cutscene_timer < -15:
-                choice = death_decision.update(events)
+                self.ui_group.remove(self.ui_group.get_tagged("key_counter"))
 
-            if choice is not None:
-                if choice == "continue":
-                    if rooms.get_status("village_scene"):
-                        self.player.true_center = tile_pos(4, 17)
-                        rooms.room_num = [3, 4]
-                    else:
-                        self.player.true_center = tile_pos(10, 15.5)
-                        rooms.room_num = [6, 7]
-                    self.player.health = 12
-                    self.player.set_invincible(False)
-
-                    rooms.set_room_num()
-                    rooms.set_status("cutscene", False)
-                    rooms.set_status("room_transition", True)
-
-                    set_music(GAME_MUSIC[0], GAME_MUSIC[1])
-
-                    for ui in self.ui_group:
-                        if ui.__class__.__name__ == "KeyCount":
-                            self.ui_group.remove(ui)
-
-                elif choice == "end_game":
-                    exit_game()
+            elif choice == "end_game":
+                exit_game()
 
-            self.ui_group.draw(screen)
+    def draw(self, surface):
+        surface.fill(self.background_color)
+        self.ui_group.draw(surface)
 
-            for ui in self.ui_group:
-                if ui.__class__.__name__ in ["UIIcon", "KeyCount"]:
-                    ui.draw(screen)  # Draws ammo count for several equipment pieces
-            screen.blit(self.player.image, self.player.rect)
-            if music_set:
-                title.draw(screen)
-                death_decision.draw(screen)
+        surface.blit(self.player.image, self.player.rect)
+        if self.music_set:
+            self.title.draw(surface)
+            self.death_decision.draw(surface)
 
-            flip_screen()
+    def is_done(self):
+        return not self.rooms.get_status("cutscene")
 
 
 class Enemy(AnimSprite):
+    SOUND_CATEGORY = "enemies"
+
     def __init__(self, position, animationSpeed, maxSpeed, damage, health, alert_status,
                  spritesR, spritesL=None, spritesU=None, spritesD=None):
 
         self.explode = load_animation(["explosion0.png", "explosion1.png", "explosion2.png",
                                       "explosion3.png", "explosion4.png", "explosion5.png",
                                       "explosion6.png", "explosion7.png", "explosion8.png"])
-        self.explode_sound = load_sound("sfx_exp_short_hard5.wav", 0.2)
-        self.death_sound = load_sound("sfx_deathscream_robot1.wav", 0.3)
+        self.explode_sound = load_sound("sfx_exp_short_hard5.wav", 0.2,
+                                        self.SOUND_CATEGORY, self.SOUND_PRIORITY)
+        self.death_sound = load_sound("sfx_deathscream_robot1.wav", 0.3,
+                                      self.SOUND_CATEGORY, self.SOUND_PRIORITY)
 
         self.animationSpeed = animationSpeed
         animating = True
@@ -833,6 +1046,10 @@ class Enemy(AnimSprite):
 
         self.animation_copy = self.anim.copy()
 
+    def on_spawn(self, position):
+        super().on_spawn(position)
+        self.start_position = position[:]
+
     def load_animation_original(self, spritesL, spritesD, spritesU):
         if spritesL is not None:
             self.anim["a"] = load_animation(spritesL)
@@ -1017,7 +1234,7 @@ class Slime(Enemy):
                            "d": [load_image("slimeRightSquish.png")]}
         self.squishAnim["a"] = [pygame.transform.flip(self.squishAnim["d"][0], True, False)]
         self.fly = False
-        self.leap_sound = load_sound("power_up_02.ogg")
+        self.leap_sound = load_sound("power_up_02.ogg", category=self.SOUND_CATEGORY, priority="key")
 
     def movement(self, target_object):
         self.leap_at(target_object)
@@ -1039,8 +1256,10 @@ class Log(Enemy):
         self.animation_copy = self.anim.copy()
         self.anim["d"] = load_animation(["logSleep1.png", "logSleep1.png", "logSleep2.png", "logSleep3.png"])
         self.wakeAnim = load_animation(["logWake0.png", "logWake0.png", "logWake1.png", "logDown0.png", "logDown0.png"])
-        self.damage_sound = load_sound("painb.wav")
-        self.death_sound = load_sound("deathb.wav")
+        self.damage_sound = load_sound("painb.wav", category=self.SOUND_CATEGORY,
+                                       priority=self.SOUND_PRIORITY)
+        self.death_sound = load_sound("deathb.wav", category=self.SOUND_CATEGORY,
+                                      priority=self.SOUND_PRIORITY)
 
     def movement(self, target_object):
         WAKE_UP_TIME = 60
@@ -1140,8 +1359,10 @@ class Skeleton(Enemy):
         alert_status = False
         super().__init__(position, animation_speed, max_speed, damage, health, alert_status,
                          sprites_r, sprites_l, sprites_u, sprites_d)
-        self.damage_sound = load_sound("synth_laser_02.ogg")
-        self.death_sound = load_sound("deathb.wav")
+        self.damage_sound = load_sound("synth_laser_02.ogg", category=self.SOUND_CATEGORY,
+                                       priority=self.SOUND_PRIORITY)
+        self.death_sound = load_sound("deathb.wav", category=self.SOUND_CATEGORY,
+                                      priority=self.SOUND_PRIORITY)
 
     def set_animations(self, spriteList):
         self.anim = {"d": spriteList}
@@ -1158,6 +1379,7 @@ class Skeleton(Enemy):
 class EnergyBlast(Enemy):
     """ Technically a projectile, but easiest way to get it into
     a group in the gameplay loop was to throw it in the Enemy group."""
+    TAGS = ("reflectable",)
     def __init__(self, position, boss_obj):
         max_speed = 1.75
         animation_speed = 8/60
@@ -1204,6 +1426,10 @@ class EnergyBlast(Enemy):
 
 
 class BossBase(Enemy):
+    TAGS = ("boss",)
+    CLONEABLE = False
+    # Boss hits and deaths aren't cut off by regular enemies
+    SOUND_PRIORITY = "key"
     music_started = False
 
     def __init__(self, position, animation_speed, max_speed, damage, health,
@@ -1392,6 +1618,8 @@ class EyebossBody(EyebossHead):
 
 
 class DemonQueen(BossBase):
+    TAGS = BossBase.TAGS + ("final_boss",)
+
     def __init__(self, position):
         sprite_list = ["queen0.png", "queen1.png", "queen2.png", "queen1.png"]
         animation_speed = 6/FPS
@@ -1415,7 +1643,7 @@ class DemonQueen(BossBase):
         self.max_health = self.health
 
     def destruct(self):
-        mixer.music.fadeout(2000)
+        music.fadeout(2000)
         BossBase.music_started = False
         self.kill()
 
@@ -1481,6 +1709,8 @@ class DemonQueen(BossBase):
 
 
 class SurpriseIcon(AnimSprite):
+    SOUND_CATEGORY = "enemies"
+
     def __init__(self, enemy):
         position = (0, 0)
         animationSpeed = 0
@@ -1490,7 +1720,7 @@ class SurpriseIcon(AnimSprite):
         super(SurpriseIcon, self).__init__(position, sprite_list, animationSpeed, maxSpeed)
         self.bound_to = enemy
         self.update()
-        self.sound = load_sound("sfx_sounds_error14.wav", 0.6)
+        self.sound = load_sound("sfx_sounds_error14.wav", 0.6, self.SOUND_CATEGORY)
         self.sound.play()
 
     def update(self):
@@ -1501,6 +1731,8 @@ class SurpriseIcon(AnimSprite):
 
 
 class NormalItem(AnimSprite):
+    SOUND_CATEGORY = "player"
+
     def __init__(self, position, spriteList, animationSpeed, key=None, animating=True):
         maxSpeed = 0
         self.name = None
@@ -1510,7 +1742,7 @@ class NormalItem(AnimSprite):
         self.direction = "d"
         self.key = key
 
-        self.item_noise = load_sound("sfx_sounds_interaction17.wav", 0.2)
+        self.item_noise = load_sound("sfx_sounds_interaction17.wav", 0.2, self.SOUND_CATEGORY)
 
         if not hasattr(self, "is_puzzle"):
             self.is_puzzle = False
@@ -1519,6 +1751,11 @@ class NormalItem(AnimSprite):
         super(NormalItem, self).update()
         self.animate()
 
+    def on_spawn(self, position):
+        """ Items are placed by tile, like their constructors. """
+        self.original_position = position[:]
+        super().on_spawn(tile_pos(position[0], position[1]))
+
     def get_x(self):
         return self.original_position[0]
 
@@ -1584,6 +1821,8 @@ class FlameItem(NormalItem):
 
 
 class GoldItem(NormalItem):
+    CLONEABLE = False
+
     def __init__(self, position, key=None):
         """Creates a gold instance with a random chance of being worth
         1, 5, 20, 50, or 100 gold."""
@@ -1657,7 +1896,7 @@ class KeyItem(NormalItem):
         animating = False
         super().__init__(position, sprite_list, animation_speed, key, animating)
         self.name = "key"
-        self.item_noise = load_sound("sfx_sounds_pause7_in.wav")
+        self.item_noise = load_sound("sfx_sounds_pause7_in.wav", category=self.SOUND_CATEGORY)
 
 
 class BossKeyItem(NormalItem):
@@ -1667,7 +1906,7 @@ class BossKeyItem(NormalItem):
         animating = False
         super().__init__(position, sprite_list, animation_speed, key, animating)
         self.name = "boss_key"
-        self.item_noise = load_sound("sfx_sounds_pause7_in.wav")
+        self.item_noise = load_sound("sfx_sounds_pause7_in.wav", category=self.SOUND_CATEGORY)
 
 
 class QueenKeyItem(NormalItem):
@@ -1677,15 +1916,18 @@ class QueenKeyItem(NormalItem):
         animating = False
         super().__init__(position, sprite_list, animation_speed, key, animating)
         self.name = "queen_key"
-        self.item_noise = load_sound("sfx_sounds_pause7_in.wav")
+        self.item_noise = load_sound("sfx_sounds_pause7_in.wav", category=self.SOUND_CATEGORY)
 
 
-class PlayerEquipment(AnimSprite):
+class PlayerEquipment(AnimSprite, ChangeNotifier):
     """
     Used to give player key items to use throughout gameplay.
     Derived classes are used to simplify each instance's creation.
+    ACTION is the name of the gameplay key binding that uses the item.
     """
-    USE_KEYS = [None]
+    ACTION = None
+    SOUND_CATEGORY = "player"
+    ammo = watched_value("ammo")
 
     def __init__(self, player_obj, sprite_list, damage, damage_type, noise, max_ammo):
         animation_speed = (30 / 60)
@@ -1704,7 +1946,7 @@ class PlayerEquipment(AnimSprite):
 
         self.rect = self.image.get_rect()
 
-        self.use_sound = load_sound(noise, 0.3)
+        self.use_sound = load_sound(noise, 0.3, self.SOUND_CATEGORY)
         self.set_center_positions()
 
         self.use_timer = -1
@@ -1721,7 +1963,8 @@ class PlayerEquipment(AnimSprite):
 
         self.is_equipped = False
         self.is_pressed = False
-        self.use_key = [None]
+        # Lets the save system find the player's equipment by action name
+        player_obj.equipment[self.ACTION] = self
 
     def set_center_positions(self):
         """ Updates the possible center positions based on the player's. """
@@ -1818,11 +2061,17 @@ class PlayerEquipment(AnimSprite):
         self.rect.center = self.center_positions[self.direction]
 
     def equip_item(self):
-        self.use_key = self.USE_KEYS
+        self.is_equipped = True
+
+    def press(self):
+        """ Starts using the item when its key is pressed, if it's equipped. """
+        if self.is_equipped and not self.is_pressed:
+            self.animate()
+            self.start_use()
 
 
 class Sword(PlayerEquipment):
-    USE_KEYS = [K_SPACE]
+    ACTION = "sword"
 
     def __init__(self, player_object):
         sprite_list = ["slash0.png", "slash1.png", "slash2.png", "slash3.png",
@@ -1835,7 +2084,7 @@ class Sword(PlayerEquipment):
 
 
 class Bow(PlayerEquipment):
-    USE_KEYS = [K_j, K_b]
+    ACTION = "bow"
 
     def __init__(self, player_object):
         sprite_list = ["slash0.png", "bow0.png", "bow0.png", "bow0.png", "bow0.png", "bow0.png"]
@@ -1845,7 +2094,7 @@ class Bow(PlayerEquipment):
         super().__init__(player_object, sprite_list, damage,
                          damage_type, "sfx_damage_hit1.wav", max_ammo)
         self.anim_speed = 15/60
-        self.no_ammo_sound = load_sound("sfx_wpn_noammo1.wav", 0.5)
+        self.no_ammo_sound = load_sound("sfx_wpn_noammo1.wav", 0.5, self.SOUND_CATEGORY)
         self.ammo = self.max_ammo
 
     def is_using(self):
@@ -1860,7 +2109,7 @@ class HookShot(PlayerEquipment):
     This class was originally going to be used in the game,
     but due to time constraints, was left out of final cut.
     """
-    USE_KEYS = [K_z]
+    ACTION = "hookshot"
 
     def __init__(self, player_object):
         sprite_list = ["slash0.png", "hookshot1.png", "hookshot1.png", "hookshot1.png"]
@@ -1876,7 +2125,7 @@ class HookShot(PlayerEquipment):
 
 
 class BombBag(PlayerEquipment):
-    USE_KEYS = [K_k]
+    ACTION = "bomb"
 
     def __init__(self, player_object):
         sprite_list = ["slash0.png", "place_bomb0.png", "place_bomb0.png", "place_bomb0.png", "place_bomb0.png"]
@@ -1886,7 +2135,7 @@ class BombBag(PlayerEquipment):
         super().__init__(player_object, sprite_list, damage, damage_type,
                          "sfx_damage_hit10.ogg", max_ammo)
         self.use_sound.set_volume(0.6)
-        self.no_ammo_sound = load_sound("sfx_wpn_noammo1.wav")
+        self.no_ammo_sound = load_sound("sfx_wpn_noammo1.wav", category=self.SOUND_CATEGORY)
         self.ammo = self.max_ammo
 
     def start_use(self):
@@ -1898,7 +2147,7 @@ class BombBag(PlayerEquipment):
 
 
 class FlameGlove(PlayerEquipment):
-    USE_KEYS = [K_f, K_l]
+    ACTION = "flame"
     def __init__(self, player_object):
         sprite_list = ["slash0.png", "place_bomb0.png", "place_bomb0.png", "place_bomb0.png", "place_bomb0.png"]
         damage = 8
@@ -1906,7 +2155,7 @@ class FlameGlove(PlayerEquipment):
         max_ammo = 10
         super().__init__(player_object, sprite_list, damage, damage_type,
                          "spell_fire_05.ogg", max_ammo)
-        self.no_ammo_sound = load_sound("misc_03.ogg")
+        self.no_ammo_sound = load_sound("misc_03.ogg", category=self.SOUND_CATEGORY)
         self.ammo = self.max_ammo
 
     def is_using(self):
@@ -1914,12 +2163,17 @@ class FlameGlove(PlayerEquipment):
 
 
 class Projectile(AnimSprite):
+    # Number of frames a projectile can exist before it's removed
+    MAX_LIFETIME = 4 * FPS
+    SOUND_CATEGORY = "player"
+
     def __init__(self, sprite_list, origin_object, animation_speed,
                  max_speed, animating, damage, damage_type):
         position = list(origin_object.rect.center)[:]
         super().__init__(position[:], sprite_list, animation_speed, max_speed, animating)
         self.damage = damage
         self.damage_type = damage_type
+        self.age = 0
 
         self.anim["a"] = []
         self.anim["s"] = []
@@ -1938,8 +2192,22 @@ class Projectile(AnimSprite):
     def move(self):
         pass
 
+    def update(self):
+        super().update()
+        # Removes projectiles that left the room or lasted too long, so they
+        # aren't moved and collision checked until the next room transition.
+        self.age += 1
+        if self.age > self.MAX_LIFETIME or not ROOM_RECT.colliderect(self.rect):
+            self.expire()
+
+    def expire(self):
+        self.kill()
+
 
 class FlameThrow(Projectile):
+    # Frames between tries to start the flame's loop again if it was cut off
+    SOUND_RETRY = round(0.5 * FPS)
+
     def __init__(self, origin_object):
         animation_speed = 6/60
         max_speed = 0.8
@@ -1952,8 +2220,10 @@ class FlameThrow(Projectile):
                             max_speed, animating, damage, damage_type)
         self.life_timer = 1.5 * FPS
         self.anim["s"] = self.anim["a"] = self.anim["w"] = self.anim["d"][:]
-        self.fire_sound = load_sound("spell_fire_03.ogg", 0.3)
-        self.fire_sound.play()
+        self.fire_sound = load_sound("spell_fire_03.ogg", 0.3, self.SOUND_CATEGORY, "key")
+        # Loops until the flame expires
+        self.fire_sound.play(-1)
+        self.sound_retry = self.SOUND_RETRY
         self.health = 3
 
     def has_hit(self):
@@ -1962,6 +2232,10 @@ class FlameThrow(Projectile):
             self.destruct()
 
     def destruct(self):
+        self.expire()
+
+    def expire(self):
+        self.fire_sound.stop()
         self.kill()
 
     def move(self):
@@ -1976,12 +2250,18 @@ class FlameThrow(Projectile):
 
     def update(self):
         super().update()
-        if self.fire_sound.get_num_channels() < 1:
-            self.fire_sound.play()
+        if not self.alive():
+            return
         self.life_timer -= 1
         if self.life_timer <= 0:
-            self.fire_sound.stop()
-            self.kill()
+            self.expire()
+        elif not self.fire_sound.is_playing():
+            # Tried again while the flame lasts, in case there was no free
+            # voice for it or another key sound took its voice
+            self.sound_retry -= 1
+            if self.sound_retry <= 0:
+                self.sound_retry = self.SOUND_RETRY
+                self.fire_sound.play(-1)
 
 
 class Arrow(Projectile):
@@ -2016,6 +2296,9 @@ class Arrow(Projectile):
 
 
 class BombPlaced(Projectile):
+    # Bombs hit by the sword explode immediately
+    TAGS = ("detonatable",)
+
     def __init__(self, origin_object):
         animation_speed = 7/FPS
         max_speed = 0
@@ -2054,7 +2337,7 @@ class BombExplode(Projectile):
         damage_type = "bomb"
         Projectile.__init__(self, sprite_list, origin_object, animation_speed,
                             max_speed, animating, damage, damage_type)
-        self.explode_sound = load_sound("8bit_bomb_explosion.wav")
+        self.explode_sound = load_sound("8bit_bomb_explosion.wav", category=self.SOUND_CATEGORY)
         self.explode_sound.play()
 
     def has_hit(self):
@@ -2074,13 +2357,20 @@ class BombExplode(Projectile):
 
 
 class UIIcon(pygame.sprite.Sprite):
+    """
+    Icon with a number under it, ex: arrow count. get_text is called for
+    the number whenever the HUD layer is redrawn.
+    """
+    # counter_ui sprites draw their count under the icon with draw()
+    TAGS = ("counter_ui",)
+
     def __init__(self, icon, icon_position, get_text):
         super().__init__()
         try:
-            self.font = pygame.font.Font(
+            self.font = assets.get_font(
                 os.path.join("Fonts", "Kenney Mini Square.ttf"), 10)
         except:
-            self.font = pygame.font.SysFont(
+            self.font = assets.get_sys_font(
                 "timesnewroman", 10)
 
         self.image = load_image(icon)
@@ -2100,7 +2390,11 @@ class UIIcon(pygame.sprite.Sprite):
         screen.blit(render, render_rect)
 
 
-class KeyCount(UIIcon):
+class KeyCount(UIIcon, ChangeNotifier):
+    TAGS = UIIcon.TAGS + ("key_counter",)
+    keys = watched_value("keys")
+    boss_key = watched_value("boss_key")
+
     def __init__(self):
         self.keys = 0
         get_text = self.get_keys
@@ -2139,16 +2433,67 @@ class KeyCount(UIIcon):
             self.keys = 0
 
 
-class Player(AnimSprite):
+class HUDLayer(TaggedGroup):
+    """
+    Group for the HUD sprites (hearts, labels and counters). The sprites are
+    drawn onto a cached transparent layer, which is only redrawn after a
+    sprite is added or removed, or when something the HUD watches sends a
+    change notification; every other frame is a single blit of the layer.
+    """
+    def __init__(self, *sprites):
+        self.layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.dirty = True
+        super().__init__(*sprites)
+
+    def watch(self, *notifiers):
+        """ Redraws the layer whenever any of the ChangeNotifiers change. """
+        for notifier in notifiers:
+            notifier.add_listener(self.mark_dirty)
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.dirty = True
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.dirty = True
+
+    def redraw(self):
+        self.layer.fill((0, 0, 0, 0))
+        self.update()
+        super().draw(self.layer)
+        for counter in self.get_tagged("counter_ui"):
+            counter.draw(self.layer)  # Draws ammo count for several equipment pieces
+        self.dirty = False
+
+    def draw(self, surface):
+        if self.dirty:
+            self.redraw()
+        surface.blit(self.layer, (0, 0))
+
+
+class Player(AnimSprite, ChangeNotifier):
     """ Player's class. """
-    # Original sprites for character during testing
-    IMAGES = {"s": load_image("zoeySprite.png"),
-              "w": load_image("zoeyBack.png"),
-              "a": load_image("zoeyLeft.png"),
-              "d": load_image("zoeyRight.png")}
+    # Original sprites for character during testing, loaded with the first player
+    IMAGES = None
     ALL_REGIONS = ["tundra", "mountains", "tower"]
+    SOUND_CATEGORY = "player"
+
+    # Values shown on the HUD send change notifications
+    health = watched_value("health")
+    max_health = watched_value("max_health")
+    potions = watched_value("potions")
+    gold = watched_value("gold")
 
     def __init__(self):
+        if Player.IMAGES is None:
+            Player.IMAGES = {"s": load_image("zoeySprite.png"),
+                             "w": load_image("zoeyBack.png"),
+                             "a": load_image("zoeyLeft.png"),
+                             "d": load_image("zoeyRight.png")}
         spr_list = load_sprite_sheet_format("Aristocrate-F-01 dark.png")
         self.IMAGES = {"s": spr_list[2],
                        "w": spr_list[0],
@@ -2188,13 +2533,13 @@ class Player(AnimSprite):
         self.inv_time_start = round(1 * FPS)
         self.launch_stop = self.inv_time_start - round(0.3 * FPS)
 
-        self.damage_sound2 = load_sound("retro_misc_02.ogg", 0.5)
+        self.damage_sound2 = load_sound("retro_misc_02.ogg", 0.5, self.SOUND_CATEGORY, "damage")
 
-        self.damage_sound3 = load_sound("retro_misc_03.ogg", 0.5)
+        self.damage_sound3 = load_sound("retro_misc_03.ogg", 0.5, self.SOUND_CATEGORY, "damage")
 
-        self.health_alarm = load_sound("sfx_alarm_loop6.wav", 0.3)
-        self.heal_sound1 = load_sound("Menu2A.wav")
-        self.heal_sound2 = load_sound("Item2A.wav")
+        self.health_alarm = load_sound("sfx_alarm_loop6.wav", 0.3, "ui", "key")
+        self.heal_sound1 = load_sound("Menu2A.wav", category=self.SOUND_CATEGORY)
+        self.heal_sound2 = load_sound("Item2A.wav", category=self.SOUND_CATEGORY)
 
         self.last_position = self.true_center[:]
         self.gold = 0
@@ -2204,6 +2549,8 @@ class Player(AnimSprite):
                             "mountains": k2,
                             "tower": k3}
         self.region = None
+        # Filled in by PlayerEquipment, action name: equipment
+        self.equipment = {}
 
     def set_animations(self, sprite_list):
         # self.anim = {"s": [Player.IMAGES["s"]],
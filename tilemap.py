@@ -0,0 +1,209 @@
+import pygame
+import array
+import os
+import struct
+import sys
+
+from sprite_classes import *
+from world_compiler import map_rooms, MAP_DIR
+
+# Optional tile based rooms. build_tilemap() cuts every room image into
+# TILE_SIZE tiles, keeps one copy of each different tile in a shared
+# tileset, and stores each room as grids of tile numbers (background,
+# collision and top layers). Tile 0 is always fully transparent.
+#
+# rooms.dat layout:
+#   header: magic, version, tile size, tileset columns, tile count, room count
+#   solid flags: one byte per tile, 1 if the tile has anything on the coll layer
+#   room table: room count * (room x, room y, grid offset)
+#   grids: per room, 3 layers of little endian uint16 tile numbers, row by row
+TILE_DIR = "tiles"
+LAYERS = ["background", "coll", "top"]
+# Layer name: file name ending in mapFiles
+LAYER_FILES = {"background": "", "coll": "coll", "top": "top"}
+TILESET_COLUMNS = 32
+
+TILEMAP_MAGIC = b"QDTM"
+TILEMAP_VERSION = 1
+HEADER = struct.Struct(">4sHHHII")
+ROOM_ENTRY = struct.Struct(">hhI")
+
+
+def build_tilemap(map_dir=MAP_DIR, tile_dir=TILE_DIR):
+    """ Builds the tileset and room grids from the room images. Returns the tile count. """
+    tile_bytes = [bytes(TILE_SIZE * TILE_SIZE * 4)]
+    tile_numbers = {tile_bytes[0]: 0}
+    solid = [0]
+    grids = {}
+    room_tiles = (SCREEN_WIDTH // TILE_SIZE) * (SCREEN_HEIGHT // TILE_SIZE)
+
+    for room in sorted(map_rooms(map_dir)):
+        room_name = "[" + str(room[0]) + "," + str(room[1]) + "]"
+        grid = array.array("H")
+        for layer in LAYERS:
+            path = os.path.join(map_dir, room_name + LAYER_FILES[layer] + ".png")
+            if not os.path.exists(path):
+                # Rooms without a top image get an empty layer
+                grid.extend([0] * room_tiles)
+                continue
+            image = pygame.image.load(path)
+            width, height = image.get_size()
+            for tile_y in range(0, height, TILE_SIZE):
+                for tile_x in range(0, width, TILE_SIZE):
+                    tile = image.subsurface((tile_x, tile_y, TILE_SIZE, TILE_SIZE))
+                    data = pygame.image.tostring(tile, "RGBA")
+                    if data not in tile_numbers:
+                        tile_numbers[data] = len(tile_bytes)
+                        tile_bytes.append(data)
+                        solid.append(0)
+                    number = tile_numbers[data]
+                    if layer == "coll" and any(data[3::4]):
+                        solid[number] = 1
+                    grid.append(number)
+        grids[room] = grid
+
+    rows = (len(tile_bytes) + TILESET_COLUMNS - 1) // TILESET_COLUMNS
+    tileset = pygame.Surface((TILESET_COLUMNS * TILE_SIZE, rows * TILE_SIZE), pygame.SRCALPHA)
+    tileset.fill((0, 0, 0, 0))
+    for number, data in enumerate(tile_bytes):
+        tile = pygame.image.fromstring(data, (TILE_SIZE, TILE_SIZE), "RGBA")
+        tileset.blit(tile, tileset_position(number), special_flags=pygame.BLEND_RGBA_ADD)
+
+    os.makedirs(tile_dir, exist_ok=True)
+    pygame.image.save(tileset, os.path.join(tile_dir, "tileset.png"))
+
+    room_order = sorted(grids)
+    offset = HEADER.size + len(tile_bytes) + ROOM_ENTRY.size * len(room_order)
+    table = []
+    for room in room_order:
+        table.append(ROOM_ENTRY.pack(room[0], room[1], offset))
+        offset += len(grids[room]) * 2
+    with open(os.path.join(tile_dir, "rooms.dat"), "wb") as tilemap_file:
+        tilemap_file.write(HEADER.pack(TILEMAP_MAGIC, TILEMAP_VERSION, TILE_SIZE,
+                                       TILESET_COLUMNS, len(tile_bytes), len(room_order)))
+        tilemap_file.write(bytes(solid))
+        tilemap_file.write(b"".join(table))
+        for room in room_order:
+            grid = grids[room]
+            if sys.byteorder == "big":
+                grid.byteswap()
+            tilemap_file.write(grid.tobytes())
+    return len(tile_bytes)
+
+
+def tileset_position(number):
+    return [(number % TILESET_COLUMNS) * TILE_SIZE, (number // TILESET_COLUMNS) * TILE_SIZE]
+
+
+class TileMap(object):
+    """
+    Rooms drawn from the shared tileset. Each layer of a room is drawn
+    onto its own surface the first time it's needed and kept after that.
+    """
+    def __init__(self, tile_dir=TILE_DIR):
+        self.tile_dir = tile_dir
+        with open(os.path.join(tile_dir, "rooms.dat"), "rb") as tilemap_file:
+            self.data = tilemap_file.read()
+        (magic, version, self.tile_size, self.columns,
+         tile_count, room_count) = HEADER.unpack_from(self.data)
+        if magic != TILEMAP_MAGIC or version != TILEMAP_VERSION:
+            raise ValueError("rooms.dat is from another version, rebuild it with tilemap.py")
+        position = HEADER.size
+        self.solid = self.data[position:position + tile_count]
+        position += tile_count
+        self.offsets = {}
+        for room_x, room_y, offset in ROOM_ENTRY.iter_unpack(
+                self.data[position:position + ROOM_ENTRY.size * room_count]):
+            self.offsets[(room_x, room_y)] = offset
+        self.room_size = SCREEN_WIDTH // self.tile_size, SCREEN_HEIGHT // self.tile_size
+        self.tiles = None
+        self.surfaces = {}
+
+    def load_tiles(self):
+        tileset = assets.get_image(os.path.join(self.tile_dir, "tileset.png"))
+        self.tiles = []
+        for row in range(tileset.get_height() // self.tile_size):
+            for column in range(self.columns):
+                self.tiles.append(tileset.subsurface(
+                    (column * self.tile_size, row * self.tile_size,
+                     self.tile_size, self.tile_size)))
+
+    def has_room(self, room_x, room_y):
+        return (room_x, room_y) in self.offsets
+
+    def get_grid(self, room_x, room_y, layer):
+        """ Returns the layer's tile numbers, row by row. """
+        room_tiles = self.room_size[0] * self.room_size[1]
+        start = self.offsets[(room_x, room_y)] + LAYERS.index(layer) * room_tiles * 2
+        grid = array.array("H")
+        grid.frombytes(self.data[start:start + room_tiles * 2])
+        if sys.byteorder == "big":
+            grid.byteswap()
+        return grid
+
+    def get_solid_grid(self, room_x, room_y):
+        """ Rows of True/False, True where a tile has collision. """
+        grid = self.get_grid(room_x, room_y, "coll")
+        width = self.room_size[0]
+        return [[self.solid[number] == 1 for number in grid[row:row + width]]
+                for row in range(0, len(grid), width)]
+
+    def get_surface(self, room_x, room_y, layer):
+        key = (room_x, room_y, layer)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if self.tiles is None:
+                self.load_tiles()
+            surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+            surface.fill((0, 0, 0, 0))
+            grid = self.get_grid(room_x, room_y, layer)
+            width = self.room_size[0]
+            for i, number in enumerate(grid):
+                if number != 0:
+                    surface.blit(self.tiles[number],
+                                 ((i % width) * self.tile_size, (i // width) * self.tile_size),
+                                 special_flags=pygame.BLEND_RGBA_ADD)
+            self.surfaces[key] = surface
+        return surface
+
+    def unload_room(self, room_x, room_y):
+        for layer in LAYERS:
+            self.surfaces.pop((room_x, room_y, layer), None)
+
+
+def is_stale(tile_dir=TILE_DIR, map_dir=MAP_DIR):
+    """ True if the tiles are missing or older than the room images they were built from. """
+    try:
+        built_time = min(os.path.getmtime(os.path.join(tile_dir, name))
+                         for name in ["rooms.dat", "tileset.png"])
+        # The folder's time changes when rooms are added or removed
+        source_times = [os.path.getmtime(map_dir)]
+        source_times += [entry.stat().st_mtime for entry in os.scandir(map_dir)
+                         if entry.name.endswith(".png")]
+    except OSError:
+        return True
+    return max(source_times) > built_time
+
+
+def load_tilemap(tile_dir=TILE_DIR, map_dir=MAP_DIR):
+    """
+    Returns a TileMap if the tiles have been built from the current room
+    images, else None (rooms use their PNGs).
+    """
+    if not os.path.exists(os.path.join(tile_dir, "rooms.dat")):
+        return None
+    if is_stale(tile_dir, map_dir):
+        print("Tile map is older than the images in", map_dir + ",",
+              "using the images until it's rebuilt with tilemap.py")
+        return None
+    try:
+        tilemap = TileMap(tile_dir)
+    except Exception as e:
+        print("Error: Couldn't load tile map,", e)
+        return None
+    return tilemap
+
+
+if __name__ == "__main__":
+    pygame.init()
+    print("Built", build_tilemap(), "tiles into", TILE_DIR)
@@ -0,0 +1,185 @@
+import json
+import os
+import pickle
+import struct
+
+# The world is defined by the json files in world/ (items, objects, enemy
+# spawns and regions, all keyed by "x,y" room numbers). They're compiled into
+# one index file so the game only reads the table of contents at startup
+# and each room's record the first time that room is needed.
+#
+# Index layout:
+#   header: magic, version, room count, size of the shared block
+#   shared block: pickled {"classes": [...], "hub_rooms": [...], "regions": {...},
+#                          "graph": {(x, y): {"region", "hub", "boss_region", "neighbours"}}}
+#   room table: room count * (room x, room y, record offset, record size)
+#   room records: pickled dicts of the room's items, objects and enemies,
+#                 classes stored as indexes into "classes"
+#
+# The graph is small and read whole at startup, so region, boss room and
+# neighbour lookups never touch the room records.
+WORLD_DIR = "world"
+MAP_DIR = "mapFiles"
+WORLD_INDEX_PATH = os.path.join(WORLD_DIR, "world.idx")
+SOURCE_FILES = ["items.json", "objects.json", "spawns.json", "regions.json"]
+
+INDEX_MAGIC = b"QDWI"
+INDEX_VERSION = 2
+HEADER = struct.Struct(">4sHII")
+ROOM_ENTRY = struct.Struct(">hhII")
+
+# Room transition direction: change in room number (see AllRooms.set_room_num)
+DIRECTIONS = {"up": (0, 1), "down": (0, -1), "left": (-1, 0), "right": (1, 0)}
+
+
+def room_key(room_name):
+    """ "6,9" -> (6, 9) """
+    room_x, room_y = room_name.split(",")
+    return int(room_x), int(room_y)
+
+
+def map_rooms(map_dir=MAP_DIR):
+    """ Every room with a background image, ex: [6,9].png """
+    rooms = []
+    for file_name in os.listdir(map_dir):
+        if file_name.startswith("[") and file_name.endswith("].png"):
+            rooms.append(room_key(file_name[1:-5]))
+    return rooms
+
+
+def load_sources(world_dir=WORLD_DIR):
+    sources = {}
+    for file_name in SOURCE_FILES:
+        with open(os.path.join(world_dir, file_name)) as source:
+            sources[file_name[:-5]] = json.load(source)
+    return sources
+
+
+def build_graph(rooms, regions):
+    """
+    Links every room to the rooms beside it and works out which region each
+    room is in: everything reachable from a region's entry without going
+    through a hub room. Rooms outside every region have a region of None.
+    """
+    hub_rooms = set(tuple(room) for room in regions["hub_rooms"])
+    graph = {}
+    for room in rooms:
+        neighbours = {}
+        for direction, (move_x, move_y) in DIRECTIONS.items():
+            target = (room[0] + move_x, room[1] + move_y)
+            if target in rooms:
+                neighbours[direction] = target
+        graph[room] = {"region": None, "hub": room in hub_rooms,
+                       "boss_region": None, "neighbours": neighbours}
+
+    for region, info in regions["regions"].items():
+        to_visit = [tuple(info["entry"])]
+        while to_visit:
+            room = to_visit.pop()
+            if room not in graph or room in hub_rooms or graph[room]["region"] is not None:
+                continue
+            graph[room]["region"] = region
+            to_visit += graph[room]["neighbours"].values()
+        if info["boss_room"] is not None:
+            graph[tuple(info["boss_room"])]["boss_region"] = region
+    return graph
+
+
+def compile_world(world_dir=WORLD_DIR, index_path=WORLD_INDEX_PATH, map_dir=MAP_DIR):
+    """ Builds the room index from the json files. Returns the number of rooms. """
+    sources = load_sources(world_dir)
+    classes = []
+    class_numbers = {}
+
+    def class_number(class_name):
+        if class_name not in class_numbers:
+            class_numbers[class_name] = len(classes)
+            classes.append(class_name)
+        return class_numbers[class_name]
+
+    def entry(data):
+        return [class_number(data[0])] + data[1:]
+
+    records = {}
+
+    def record(room):
+        if room not in records:
+            records[room] = {"items": {}, "objects": {}, "enemies": []}
+        return records[room]
+
+    for room in map_rooms(map_dir):
+        record(room)
+    for room_name, items in sources["items"].items():
+        record(room_key(room_name))["items"] = {
+            int(key): entry(data) for key, data in items.items()}
+    for room_name, objects in sources["objects"].items():
+        record(room_key(room_name))["objects"] = {
+            int(key): entry(data) for key, data in objects.items()}
+    for room_name, enemies in sources["spawns"].items():
+        record(room_key(room_name))["enemies"] = [entry(data) for data in enemies]
+
+    regions = sources["regions"]
+    graph = build_graph(set(records), regions)
+    shared = pickle.dumps({"classes": classes,
+                           "hub_rooms": [tuple(room) for room in regions["hub_rooms"]],
+                           "regions": regions["regions"],
+                           "graph": graph}, pickle.HIGHEST_PROTOCOL)
+    room_order = sorted(records)
+    blobs = [pickle.dumps(records[room], pickle.HIGHEST_PROTOCOL) for room in room_order]
+
+    offset = HEADER.size + len(shared) + ROOM_ENTRY.size * len(room_order)
+    table = []
+    for room, blob in zip(room_order, blobs):
+        table.append(ROOM_ENTRY.pack(room[0], room[1], offset, len(blob)))
+        offset += len(blob)
+
+    temp_path = index_path + ".tmp"
+    with open(temp_path, "wb") as index_file:
+        index_file.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(room_order), len(shared)))
+        index_file.write(shared)
+        index_file.write(b"".join(table))
+        index_file.write(b"".join(blobs))
+    os.replace(temp_path, index_path)
+    return len(room_order)
+
+
+def is_stale(world_dir=WORLD_DIR, index_path=WORLD_INDEX_PATH, map_dir=MAP_DIR):
+    """ True if the index is missing, from another version, or older than its sources. """
+    try:
+        index_time = os.path.getmtime(index_path)
+        with open(index_path, "rb") as index_file:
+            magic, version = HEADER.unpack(index_file.read(HEADER.size))[:2]
+    except (OSError, struct.error):
+        return True
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        return True
+    source_times = [os.path.getmtime(os.path.join(world_dir, name)) for name in SOURCE_FILES]
+    source_times.append(os.path.getmtime(map_dir))
+    return max(source_times) > index_time
+
+
+def ensure_compiled(world_dir=WORLD_DIR, index_path=WORLD_INDEX_PATH, map_dir=MAP_DIR):
+    if is_stale(world_dir, index_path, map_dir):
+        compile_world(world_dir, index_path, map_dir)
+
+
+def read_index(index_path=WORLD_INDEX_PATH):
+    """ Returns the shared block and {(x, y): (offset, size)} for every room. """
+    with open(index_path, "rb") as index_file:
+        magic, version, room_count, shared_size = HEADER.unpack(index_file.read(HEADER.size))
+        shared = pickle.loads(index_file.read(shared_size))
+        table = index_file.read(ROOM_ENTRY.size * room_count)
+    offsets = {}
+    for room_x, room_y, offset, size in ROOM_ENTRY.iter_unpack(table):
+        offsets[(room_x, room_y)] = (offset, size)
+    return shared, offsets
+
+
+def read_room(index_path, offset, size):
+    with open(index_path, "rb") as index_file:
+        index_file.seek(offset)
+        return pickle.loads(index_file.read(size))
+
+
+if __name__ == "__main__":
+    print("Compiled", compile_world(), "rooms into", WORLD_INDEX_PATH)